@@ -0,0 +1,27 @@
+"""Add Genie conversation ID to chats.
+
+Revision ID: 002_genie_conversation
+Revises: 001_initial
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '002_genie_conversation'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+  # Nullable, so existing rows need no backfill
+  op.add_column('chats', sa.Column('genie_conversation_id', sa.String(100), nullable=True))
+
+
+def downgrade() -> None:
+  op.drop_column('chats', 'genie_conversation_id')
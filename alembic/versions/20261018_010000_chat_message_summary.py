@@ -0,0 +1,73 @@
+"""Add message count and last message preview to chats.
+
+Revision ID: 003_chat_message_summary
+Revises: 002_genie_conversation
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '003_chat_message_summary'
+down_revision: Union[str, None] = '002_genie_conversation'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# server.db.models.PREVIEW_LENGTH when this migration was written
+PREVIEW_LENGTH = 120
+
+
+def upgrade() -> None:
+  op.add_column(
+    'chats', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0')
+  )
+  op.add_column('chats', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+  op.add_column(
+    'chats', sa.Column('last_message_preview', sa.String(PREVIEW_LENGTH), nullable=True)
+  )
+
+  # Backfill from the messages: count and latest message of each chat
+  op.execute(
+    f"""
+    UPDATE chats
+    SET message_count = latest.message_count,
+        last_message_at = latest.timestamp,
+        last_message_preview = left(latest.content, {PREVIEW_LENGTH})
+    FROM (
+      SELECT DISTINCT ON (chat_id)
+        chat_id, timestamp, content, count(*) OVER (PARTITION BY chat_id) AS message_count
+      FROM messages
+      ORDER BY chat_id, timestamp DESC, id DESC
+    ) AS latest
+    WHERE latest.chat_id = chats.id
+    """
+  )
+
+  # Cover the chat list, so its pages are index-only scans
+  op.drop_index('ix_chats_user_updated', table_name='chats')
+  op.create_index(
+    'ix_chats_user_updated',
+    'chats',
+    ['user_email', 'updated_at', 'id'],
+    postgresql_include=[
+      'title',
+      'agent_id',
+      'genie_conversation_id',
+      'created_at',
+      'message_count',
+      'last_message_at',
+      'last_message_preview',
+    ],
+  )
+
+
+def downgrade() -> None:
+  op.drop_index('ix_chats_user_updated', table_name='chats')
+  op.create_index('ix_chats_user_updated', 'chats', ['user_email', 'updated_at'])
+  op.drop_column('chats', 'last_message_preview')
+  op.drop_column('chats', 'last_message_at')
+  op.drop_column('chats', 'message_count')
@@ -0,0 +1 @@
+"""Performance tooling: fake Databricks workspace, load driver, and microbenchmarks."""
@@ -0,0 +1,104 @@
+"""Per-request overhead of workspace clients and auth, before and after the shared registry.
+
+Starts the fake workspace and times, for each approach, what a request pays
+on top of the API call itself:
+
+- auth: building a WorkspaceClient per request and authenticating, versus the
+  cached headers of the shared registry (server/services/workspace.py)
+- request: a GET with a new WorkspaceClient and httpx client per request (how
+  the Genie client and Agent Bricks service worked), versus the shared client,
+  cached headers and the shared connection pool
+
+Usage:
+    python -m benchmarks.client_overhead
+    python -m benchmarks.client_overhead --requests 200 --api-latency-ms 0
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+from .load_test import ROOT, _free_port, _wait_ready
+
+ME_PATH = '/api/2.0/preview/scim/v2/Me'
+
+
+async def _time_per_call(fn: Callable[[], Awaitable[None]], count: int) -> float:
+  """Average seconds per call, after one warm-up call."""
+  await fn()
+  start = time.perf_counter()
+  for _ in range(count):
+    await fn()
+  return (time.perf_counter() - start) / count
+
+
+async def _run(count: int) -> dict:
+  from databricks.sdk import WorkspaceClient
+  from server.services.workspace import workspace
+
+  async def auth_per_request():
+    WorkspaceClient().config.authenticate()
+
+  async def auth_shared():
+    workspace.auth_headers()
+
+  async def request_per_request():
+    w = WorkspaceClient()
+    async with httpx.AsyncClient(base_url=w.config.host, headers=w.config.authenticate()) as http:
+      (await http.get(ME_PATH)).raise_for_status()
+
+  async def request_shared():
+    async with workspace.http_session() as http:
+      response = await http.get(f'{workspace.host}{ME_PATH}', headers=workspace.auth_headers())
+      response.raise_for_status()
+
+  results = {
+    'auth: WorkspaceClient per request': await _time_per_call(auth_per_request, count),
+    'auth: shared registry': await _time_per_call(auth_shared, count),
+    'GET: client + pool per request': await _time_per_call(request_per_request, count),
+    'GET: shared client + pool': await _time_per_call(request_shared, count),
+  }
+  await workspace.aclose()
+  return results
+
+
+def main():
+  """Start the fake workspace, run the timings and print them."""
+  parser = argparse.ArgumentParser(description='Workspace client overhead per request')
+  parser.add_argument('--requests', type=int, default=50, help='Timed calls per case')
+  parser.add_argument('--api-latency-ms', type=float, default=5.0)
+  args = parser.parse_args()
+
+  port = _free_port()
+  fake = subprocess.Popen(
+    [
+      sys.executable, '-m', 'benchmarks.fake_workspace',
+      '--port', str(port),
+      '--api-latency-ms', str(args.api_latency_ms),
+    ],
+    cwd=ROOT,
+  )
+  try:
+    host = f'http://127.0.0.1:{port}'
+    os.environ['DATABRICKS_HOST'] = host
+    os.environ['DATABRICKS_TOKEN'] = 'dapi-overhead'
+    asyncio.run(_wait_ready(f'{host}{ME_PATH}'))
+    results = asyncio.run(_run(args.requests))
+  finally:
+    fake.terminate()
+    fake.wait()
+
+  print(f'\n{"case":<40} {"per request":>12}')
+  print('-' * 53)
+  for name, seconds in results.items():
+    print(f'{name:<40} {seconds * 1000:>9.3f} ms')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,538 @@
+"""Local fake of the Databricks workspace APIs used by the server.
+
+Implements just enough of the REST surface for the app to run end-to-end without
+a live workspace:
+- Serving endpoint streaming (/serving-endpoints/{name}/invocations) in both
+  agent format ({"input": ...}) and chat completion format ({"messages": ...})
+- Serving endpoint metadata (/api/2.0/serving-endpoints/{name})
+- Current user (/api/2.0/preview/scim/v2/Me) and SDK host metadata discovery
+- Genie start-conversation / create-message / get-message / query-result APIs,
+  plus statement result chunks (/api/2.0/sql/statements/{id}/result/chunks/{n})
+- Agent Bricks metadata (/api/2.0/tiles, /multi-agent-supervisors, /data-rooms)
+
+Latency, token rate and result sizes are configurable so the same workload can be
+replayed on a laptop to get a repeatable performance baseline.
+
+Usage:
+    python -m benchmarks.fake_workspace --port 8900 --ttft-ms 300 --tokens-per-second 80
+
+Endpoints whose name starts with "chat-" only accept chat completion payloads and
+reject agent payloads the same way foundation model endpoints do, which exercises
+the format auto-detection in DatabricksEndpointHandler.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Fixed prefix for MAS tiles so the server can resolve mas-<prefix>-endpoint names
+MAS_TILE_ID = '5c903a9d-0000-4000-8000-000000000001'
+MAS_ENDPOINT_NAME = f'mas-{MAS_TILE_ID.split("-")[0]}-endpoint'
+
+_WORDS = (
+  'the revenue for the quarter grew steadily across all regions while operating costs '
+  'remained flat which suggests that the new pricing model is working as intended and '
+  'customers in europe responded particularly well to the bundled offer — café owners '
+  'and small retailers led adoption'
+).split()
+
+# SQL templates Genie "generates"; the same question always maps to the same SQL
+_SQL_TEMPLATES = [
+  'SELECT month, region, SUM(revenue) AS revenue\nFROM sales.monthly\nGROUP BY month, region\n'
+  'ORDER BY month',
+  'SELECT product, COUNT(*) AS orders, AVG(amount) AS avg_amount\nFROM sales.orders\n'
+  'GROUP BY product\nORDER BY orders DESC',
+  'SELECT order_date, amount, customer_id\nFROM sales.orders\nWHERE amount > 100\n'
+  'ORDER BY order_date DESC',
+]
+
+_GENIE_STEPS = ['SUBMITTED', 'FETCHING_METADATA', 'ASKING_AI', 'EXECUTING_QUERY', 'COMPLETED']
+
+
+@dataclass
+class FakeWorkspaceSettings:
+  """Tunable latency and payload sizes for the fake workspace."""
+
+  # Fixed latency added to every non-streaming REST call
+  api_latency_ms: float = 20.0
+  # Time before the first token of a serving endpoint response
+  ttft_ms: float = 300.0
+  # Token emission rate for serving endpoint streams
+  tokens_per_second: float = 80.0
+  # Number of tokens in each serving endpoint answer
+  response_tokens: int = 120
+  # Probability that an agent-format answer includes a tool call round trip
+  tool_call_ratio: float = 0.3
+  # Time spent in each Genie status before moving to the next one
+  genie_step_ms: float = 400.0
+  # Number of rows in Genie query results
+  genie_rows: int = 250
+  # Rows per statement result chunk
+  genie_chunk_rows: int = 100
+  # Seed for deterministic payloads
+  seed: int = 7
+
+
+@dataclass
+class _GenieMessage:
+  """State of a fake Genie message."""
+
+  message_id: str
+  conversation_id: str
+  space_id: str
+  content: str
+  created: float
+  statement_id: str
+  sql: str
+  attachment_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+def _sse(payload: Dict[str, Any]) -> str:
+  return f'data: {json.dumps(payload)}\n\n'
+
+
+def _tokens(count: int, rng: random.Random) -> List[str]:
+  start = rng.randrange(len(_WORDS))
+  return [_WORDS[(start + i) % len(_WORDS)] + ' ' for i in range(count)]
+
+
+def _result_rows(sql: str, count: int, seed: int) -> tuple[List[Dict[str, str]], List[List[str]]]:
+  """Generate a deterministic result set for a SQL template."""
+  rng = random.Random(f'{seed}:{sql}')
+  regions = ['EMEA', 'AMER', 'APAC', 'LATAM']
+  products = ['Widget', 'Gadget', 'Gizmo', 'Doohickey', 'Sprocket']
+  if sql.startswith('SELECT month'):
+    columns = [('month', 'STRING'), ('region', 'STRING'), ('revenue', 'DOUBLE')]
+    rows = [
+      [
+        f'{2020 + (i // 48)}-{(i // 4) % 12 + 1:02d}',
+        regions[i % 4],
+        f'{rng.uniform(1e3, 1e6):.2f}',
+      ]
+      for i in range(count)
+    ]
+  elif sql.startswith('SELECT product'):
+    columns = [('product', 'STRING'), ('orders', 'LONG'), ('avg_amount', 'DOUBLE')]
+    rows = [
+      [f'{products[i % 5]} {i // 5}', str(rng.randint(1, 5000)), f'{rng.uniform(5, 500):.2f}']
+      for i in range(count)
+    ]
+  else:
+    columns = [('order_date', 'DATE'), ('amount', 'DECIMAL'), ('customer_id', 'INT')]
+    rows = [
+      [f'2024-{(i // 28) % 12 + 1:02d}-{i % 28 + 1:02d}', f'{rng.uniform(100, 9000):.2f}', str(i)]
+      for i in range(count)
+    ]
+  schema = [
+    {'name': name, 'type_name': type_name, 'type_text': type_name.lower(), 'position': i}
+    for i, (name, type_name) in enumerate(columns)
+  ]
+  return schema, rows
+
+
+def create_fake_workspace(settings: Optional[FakeWorkspaceSettings] = None) -> FastAPI:
+  """Build the fake workspace ASGI app.
+
+  Args:
+    settings: Latency and payload configuration (defaults if not provided)
+
+  Returns:
+    FastAPI application implementing the faked endpoints
+  """
+  settings = settings or FakeWorkspaceSettings()
+  app = FastAPI(title='Fake Databricks Workspace')
+  rng = random.Random(settings.seed)
+
+  genie_messages: Dict[str, _GenieMessage] = {}
+  statements: Dict[str, _GenieMessage] = {}
+
+  async def api_latency():
+    if settings.api_latency_ms > 0:
+      await asyncio.sleep(settings.api_latency_ms / 1000)
+
+  # ---------- Serving endpoints ----------
+
+  async def agent_stream(endpoint_name: str) -> AsyncGenerator[str, None]:
+    item_id = f'msg_{uuid.uuid4().hex[:8]}'
+    trace_id = f'tr-{uuid.uuid4().hex}'
+    await asyncio.sleep(settings.ttft_ms / 1000)
+
+    if rng.random() < settings.tool_call_ratio:
+      call_id = f'call_{uuid.uuid4().hex[:8]}'
+      yield _sse({
+        'type': 'response.output_item.done',
+        'item': {
+          'type': 'function_call',
+          'id': f'fc_{call_id}',
+          'call_id': call_id,
+          'name': 'sales_genie',
+          'arguments': json.dumps({'question': 'revenue by region'}),
+        },
+      })
+      await asyncio.sleep(settings.ttft_ms / 1000)
+      yield _sse({
+        'type': 'response.output_item.done',
+        'item': {
+          'type': 'function_call_output',
+          'call_id': call_id,
+          'output': json.dumps({'rows': 4, 'status': 'ok'}),
+        },
+      })
+
+    text = ''
+    delay = 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0
+    for token in _tokens(settings.response_tokens, rng):
+      text += token
+      yield _sse({'type': 'response.output_text.delta', 'item_id': item_id, 'delta': token})
+      if delay:
+        await asyncio.sleep(delay)
+
+    yield _sse({
+      'type': 'response.output_item.done',
+      'item': {
+        'type': 'message',
+        'id': item_id,
+        'role': 'assistant',
+        'content': [{'type': 'output_text', 'text': text}],
+      },
+      'databricks_output': {
+        'trace': {'info': {'trace_id': trace_id, 'request_id': trace_id}},
+      },
+    })
+
+  async def chat_completion_stream(endpoint_name: str) -> AsyncGenerator[str, None]:
+    chunk_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+    await asyncio.sleep(settings.ttft_ms / 1000)
+    base = {'id': chunk_id, 'object': 'chat.completion.chunk', 'model': endpoint_name}
+    yield _sse({**base, 'choices': [{'index': 0, 'delta': {'role': 'assistant'}}]})
+
+    delay = 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0
+    for token in _tokens(settings.response_tokens, rng):
+      # Foundation model endpoints occasionally return UTF-8 decoded as Latin-1
+      content = token.encode('utf-8').decode('latin-1')
+      yield _sse({**base, 'choices': [{'index': 0, 'delta': {'content': content}}]})
+      if delay:
+        await asyncio.sleep(delay)
+
+    yield _sse({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+    yield _sse({
+      'id': chunk_id,
+      'object': 'chat.completion.usage',
+      'usage': {'prompt_tokens': 42, 'completion_tokens': settings.response_tokens},
+    })
+
+  @app.post('/serving-endpoints/{endpoint_name}/invocations')
+  async def invocations(endpoint_name: str, request: Request):
+    body = await request.json()
+    is_chat_endpoint = endpoint_name.startswith('chat-')
+
+    if is_chat_endpoint and 'messages' not in body:
+      return JSONResponse(
+        {'error_code': 'BAD_REQUEST', 'message': "Model is missing inputs ['messages']"},
+        status_code=400,
+      )
+    if not is_chat_endpoint and 'input' not in body:
+      return JSONResponse(
+        {'error_code': 'BAD_REQUEST', 'message': "Model is missing inputs ['input']"},
+        status_code=400,
+      )
+
+    stream = chat_completion_stream if is_chat_endpoint else agent_stream
+    return StreamingResponse(stream(endpoint_name), media_type='text/event-stream')
+
+  @app.get('/api/2.0/serving-endpoints/{endpoint_name}')
+  async def get_serving_endpoint(endpoint_name: str):
+    await api_latency()
+    return {
+      'name': endpoint_name,
+      'state': {'ready': 'READY', 'config_update': 'NOT_UPDATING'},
+      'task': 'llm/v1/chat' if endpoint_name.startswith('chat-') else 'agent/v1/responses',
+    }
+
+  @app.get('/.well-known/databricks-config')
+  async def host_metadata(request: Request):
+    # Fetched by the SDK every time a WorkspaceClient/Config is constructed
+    await api_latency()
+    base = str(request.base_url).rstrip('/')
+    return {'oidc_endpoint': f'{base}/oidc', 'workspace_id': '1234567890', 'cloud': 'aws'}
+
+  @app.get('/api/2.0/preview/scim/v2/Me')
+  async def current_user():
+    await api_latency()
+    return {'id': '1', 'userName': 'load.tester@example.com', 'active': True}
+
+  # ---------- Genie ----------
+
+  def new_message(space_id: str, conversation_id: str, content: str) -> _GenieMessage:
+    digest = int(hashlib.sha1(content.strip().lower().encode()).hexdigest(), 16)
+    msg = _GenieMessage(
+      message_id=uuid.uuid4().hex,
+      conversation_id=conversation_id,
+      space_id=space_id,
+      content=content,
+      created=time.monotonic(),
+      statement_id=str(uuid.uuid4()),
+      sql=_SQL_TEMPLATES[digest % len(_SQL_TEMPLATES)],
+    )
+    genie_messages[msg.message_id] = msg
+    statements[msg.statement_id] = msg
+    return msg
+
+  def message_status(msg: _GenieMessage) -> str:
+    elapsed_ms = (time.monotonic() - msg.created) * 1000
+    step = int(elapsed_ms // settings.genie_step_ms) if settings.genie_step_ms > 0 else 99
+    return _GENIE_STEPS[min(step, len(_GENIE_STEPS) - 1)]
+
+  def message_json(msg: _GenieMessage) -> Dict[str, Any]:
+    status = message_status(msg)
+    payload: Dict[str, Any] = {
+      'id': msg.message_id,
+      'message_id': msg.message_id,
+      'conversation_id': msg.conversation_id,
+      'space_id': msg.space_id,
+      'content': msg.content,
+      'status': status,
+      'created_timestamp': int(msg.created * 1000),
+    }
+    if _GENIE_STEPS.index(status) >= _GENIE_STEPS.index('EXECUTING_QUERY'):
+      payload['attachments'] = [
+        {
+          'attachment_id': msg.attachment_id,
+          'query': {
+            'query': msg.sql,
+            'description': 'Here is the breakdown you asked for.',
+            'statement_id': msg.statement_id,
+            'query_result_metadata': {'row_count': settings.genie_rows},
+          },
+        }
+      ]
+    if status == 'COMPLETED':
+      payload['query_result'] = {'statement_id': msg.statement_id, 'row_count': settings.genie_rows}
+    return payload
+
+  def chunk_payload(msg: _GenieMessage, chunk_index: int) -> Dict[str, Any]:
+    _, rows = _result_rows(msg.sql, settings.genie_rows, settings.seed)
+    size = max(settings.genie_chunk_rows, 1)
+    start = chunk_index * size
+    data = {
+      'chunk_index': chunk_index,
+      'row_offset': start,
+      'row_count': len(rows[start:start + size]),
+      'data_array': rows[start:start + size],
+    }
+    if start + size < len(rows):
+      data['next_chunk_index'] = chunk_index + 1
+      data['next_chunk_internal_link'] = (
+        f'/api/2.0/sql/statements/{msg.statement_id}/result/chunks/{chunk_index + 1}'
+      )
+    return data
+
+  def statement_response(msg: _GenieMessage) -> Dict[str, Any]:
+    schema, _ = _result_rows(msg.sql, 0, settings.seed)
+    size = max(settings.genie_chunk_rows, 1)
+    return {
+      'statement_id': msg.statement_id,
+      'status': {'state': 'SUCCEEDED'},
+      'manifest': {
+        'format': 'JSON_ARRAY',
+        'schema': {'column_count': len(schema), 'columns': schema},
+        'total_chunk_count': max(1, -(-settings.genie_rows // size)),
+        'total_row_count': settings.genie_rows,
+        'truncated': False,
+      },
+      'result': chunk_payload(msg, 0),
+    }
+
+  def find_message(message_id: str) -> Optional[_GenieMessage]:
+    return genie_messages.get(message_id)
+
+  def not_found(what: str) -> JSONResponse:
+    return JSONResponse(
+      {'error_code': 'RESOURCE_DOES_NOT_EXIST', 'message': f'{what} does not exist'},
+      status_code=404,
+    )
+
+  @app.post('/api/2.0/genie/spaces/{space_id}/start-conversation')
+  async def start_conversation(space_id: str, request: Request):
+    await api_latency()
+    body = await request.json()
+    conversation_id = uuid.uuid4().hex
+    msg = new_message(space_id, conversation_id, body.get('content', ''))
+    return {
+      'conversation_id': conversation_id,
+      'message_id': msg.message_id,
+      'conversation': {'id': conversation_id, 'space_id': space_id},
+      'message': message_json(msg),
+    }
+
+  @app.post('/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages')
+  async def create_message(space_id: str, conversation_id: str, request: Request):
+    await api_latency()
+    body = await request.json()
+    msg = new_message(space_id, conversation_id, body.get('content', ''))
+    return message_json(msg)
+
+  @app.get('/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}')
+  async def get_message(space_id: str, conversation_id: str, message_id: str):
+    await api_latency()
+    msg = find_message(message_id)
+    if not msg:
+      return not_found(f'Message {message_id}')
+    return message_json(msg)
+
+  @app.get(
+    '/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}'
+    '/attachments/{attachment_id}/query-result'
+  )
+  async def get_attachment_query_result(
+    space_id: str, conversation_id: str, message_id: str, attachment_id: str
+  ):
+    await api_latency()
+    msg = find_message(message_id)
+    if not msg or msg.attachment_id != attachment_id:
+      return not_found(f'Attachment {attachment_id}')
+    return {'statement_response': statement_response(msg)}
+
+  @app.get(
+    '/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}'
+    '/query-result'
+  )
+  async def get_query_result(space_id: str, conversation_id: str, message_id: str):
+    await api_latency()
+    msg = find_message(message_id)
+    if not msg:
+      return not_found(f'Message {message_id}')
+    return {'statement_response': statement_response(msg)}
+
+  @app.get('/api/2.0/sql/statements/{statement_id}/result/chunks/{chunk_index}')
+  async def get_statement_chunk(statement_id: str, chunk_index: int):
+    await api_latency()
+    msg = statements.get(statement_id)
+    if not msg:
+      return not_found(f'Statement {statement_id}')
+    return chunk_payload(msg, chunk_index)
+
+  # ---------- Agent Bricks ----------
+
+  @app.get('/api/2.0/tiles')
+  async def list_tiles(filter: str = '', page_size: int = 100):
+    await api_latency()
+    tiles = [
+      {'tile_id': MAS_TILE_ID, 'name': 'Fake MAS', 'tile_type': 'MAS'},
+      {'tile_id': '0b0f263d-0000-4000-8000-000000000002', 'name': 'Fake KA', 'tile_type': 'KA'},
+    ]
+    if filter.startswith('tile_type='):
+      tile_type = filter.split('=', 1)[1]
+      tiles = [t for t in tiles if t['tile_type'] == tile_type]
+    return {'tiles': tiles[:page_size]}
+
+  @app.get('/api/2.0/multi-agent-supervisors/{tile_id}')
+  async def get_mas(tile_id: str):
+    await api_latency()
+    if tile_id != MAS_TILE_ID:
+      return not_found(f'MAS {tile_id}')
+    return {
+      'multi_agent_supervisor': {
+        'tile': {
+          'tile_id': MAS_TILE_ID,
+          'name': 'Fake MAS',
+          'description': 'Supervisor over a Genie space and a knowledge assistant',
+          'serving_endpoint_name': MAS_ENDPOINT_NAME,
+        },
+        'agents': [
+          {
+            'name': 'sales_genie',
+            'description': 'Sales data',
+            'agent_type': 'genie',
+            'genie_space': {'id': 'fake-space'},
+          },
+          {
+            'name': 'docs',
+            'description': 'Product docs',
+            'agent_type': 'ka',
+            'serving_endpoint': {'name': 'ka-0b0f263d-endpoint'},
+          },
+        ],
+        'status': {'endpoint_status': 'ONLINE'},
+      }
+    }
+
+  @app.get('/api/2.0/knowledge-assistants/{tile_id}')
+  async def get_ka(tile_id: str):
+    await api_latency()
+    return {
+      'knowledge_assistant': {
+        'tile': {'tile_id': tile_id, 'name': 'Fake KA'},
+        'knowledge_sources': [
+          {
+            'knowledge_source_id': 'ks-1',
+            'files_source': {'name': 'docs', 'files': {'path': '/Volumes/main/docs/files'}},
+            'indexed_row_count': 1200,
+            'state': 'READY',
+          }
+        ],
+        'status': {'endpoint_status': 'ONLINE'},
+      }
+    }
+
+  @app.get('/api/2.0/data-rooms/{space_id}')
+  async def get_data_room(space_id: str):
+    await api_latency()
+    return {
+      'space_id': space_id,
+      'id': space_id,
+      'display_name': 'Fake Sales Space',
+      'warehouse_id': 'fake-warehouse',
+      'table_identifiers': ['main.sales.monthly', 'main.sales.orders'],
+    }
+
+  return app
+
+
+def main():
+  """Run the fake workspace with uvicorn."""
+  import uvicorn
+
+  defaults = FakeWorkspaceSettings()
+  parser = argparse.ArgumentParser(description='Fake Databricks workspace for load testing')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8900)
+  parser.add_argument('--api-latency-ms', type=float, default=defaults.api_latency_ms)
+  parser.add_argument('--ttft-ms', type=float, default=defaults.ttft_ms)
+  parser.add_argument('--tokens-per-second', type=float, default=defaults.tokens_per_second)
+  parser.add_argument('--response-tokens', type=int, default=defaults.response_tokens)
+  parser.add_argument('--tool-call-ratio', type=float, default=defaults.tool_call_ratio)
+  parser.add_argument('--genie-step-ms', type=float, default=defaults.genie_step_ms)
+  parser.add_argument('--genie-rows', type=int, default=defaults.genie_rows)
+  parser.add_argument('--genie-chunk-rows', type=int, default=defaults.genie_chunk_rows)
+  parser.add_argument('--seed', type=int, default=defaults.seed)
+  args = parser.parse_args()
+
+  settings = FakeWorkspaceSettings(
+    api_latency_ms=args.api_latency_ms,
+    ttft_ms=args.ttft_ms,
+    tokens_per_second=args.tokens_per_second,
+    response_tokens=args.response_tokens,
+    tool_call_ratio=args.tool_call_ratio,
+    genie_step_ms=args.genie_step_ms,
+    genie_rows=args.genie_rows,
+    genie_chunk_rows=args.genie_chunk_rows,
+    seed=args.seed,
+  )
+  uvicorn.run(create_fake_workspace(settings), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,374 @@
+"""End-to-end load driver for server.app:app against the fake workspace.
+
+Starts the fake Databricks workspace and the app server as subprocesses, then runs
+concurrent, realistic chat sessions (list agents, list chats, multi-turn streaming
+conversations with serving endpoints, a MAS and a Genie space, reopen the chat)
+and reports requests/sec, latency percentiles per route and time-to-first-token
+(TTFT) per agent type.
+
+Usage:
+    python -m benchmarks.load_test --users 20 --turns 4
+    python -m benchmarks.load_test --users 50 --workers 4 --ttft-ms 150 --json out.json
+    python -m benchmarks.load_test --target http://127.0.0.1:8000  # already running server
+
+Chat storage is in-memory unless --pg-url is given (passed to the server as
+LAKEBASE_PG_URL) or --storage sqlite (a SQLite file in the temporary directory,
+shared by the workers).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from .fake_workspace import MAS_ENDPOINT_NAME
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Agents exposed to the app: (agent_id, kind, weight in the session mix)
+AGENT_MIX = [
+  ('agent-endpoint', 'agent', 4),
+  ('chat-foundation', 'chat_completion', 3),
+  (MAS_ENDPOINT_NAME, 'mas', 2),
+  ('fake-space', 'genie', 2),
+]
+
+QUESTIONS = [
+  'What was total revenue by region last quarter?',
+  'Which products had the most orders?',
+  'Show me large orders from this year',
+  'Summarize the main drivers of growth',
+  'How did Europe perform compared to the US?',
+  'List the top customers by spend',
+]
+
+_ROUTE_PATTERNS = [
+  (re.compile(r'^/api/chats/[^/]+$'), '/api/chats/{chat_id}'),
+]
+
+
+@dataclass
+class Stats:
+  """Collected latency samples."""
+
+  latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+  errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+  ttft: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+
+  def record(self, route: str, seconds: float, ok: bool):
+    self.latencies[route].append(seconds)
+    if not ok:
+      self.errors[route] += 1
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+  """Nearest-rank percentile."""
+  if not samples:
+    return 0.0
+  ordered = sorted(samples)
+  index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+  return ordered[index]
+
+
+def _route_name(method: str, path: str) -> str:
+  for pattern, name in _ROUTE_PATTERNS:
+    if pattern.match(path):
+      path = name
+      break
+  return f'{method} {path}'
+
+
+def _free_port() -> int:
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+def _write_app_config(config_dir: Path):
+  """Write an app.json pointing every agent type at the fake workspace."""
+  app_config = {
+    'app_name': 'load-test',
+    'enable_tracker': False,
+    'agents': [
+      {'endpoint_name': 'agent-endpoint', 'display_name': 'Agent endpoint'},
+      {'endpoint_name': 'chat-foundation', 'display_name': 'Foundation model'},
+      {'endpoint_name': MAS_ENDPOINT_NAME},
+      {'genie_space_id': 'fake-space', 'display_name': 'Fake Genie'},
+    ],
+  }
+  (config_dir / 'app.json').write_text(json.dumps(app_config, indent=2))
+
+
+async def _wait_ready(url: str, timeout: float = 60.0):
+  deadline = time.monotonic() + timeout
+  async with httpx.AsyncClient() as client:
+    while time.monotonic() < deadline:
+      try:
+        response = await client.get(url, timeout=2.0)
+        if response.status_code < 500:
+          return
+      except httpx.TransportError:
+        pass
+      await asyncio.sleep(0.2)
+  raise RuntimeError(f'Timed out waiting for {url}')
+
+
+class SessionDriver:
+  """Runs chat sessions for one virtual user."""
+
+  def __init__(self, client: httpx.AsyncClient, user: str, stats: Stats, args: argparse.Namespace):
+    self.client = client
+    self.headers = {'x-forwarded-user': user}
+    self.stats = stats
+    self.args = args
+    self.rng = random.Random(f'{args.seed}:{user}')
+
+  async def _request(self, method: str, path: str) -> Optional[httpx.Response]:
+    route = _route_name(method, path)
+    start = time.perf_counter()
+    try:
+      response = await self.client.request(method, path, headers=self.headers)
+      self.stats.record(route, time.perf_counter() - start, response.status_code < 400)
+      return response
+    except httpx.HTTPError:
+      self.stats.record(route, time.perf_counter() - start, False)
+      return None
+
+  async def _invoke(self, agent_id: str, kind: str, chat_id: Optional[str], history: List[dict]):
+    """Send one turn and consume the SSE stream, recording TTFT and total latency."""
+    route = 'POST /api/invoke_endpoint'
+    body = {'agent_id': agent_id, 'chat_id': chat_id, 'messages': history}
+    start = time.perf_counter()
+    first_token: Optional[float] = None
+    text = ''
+    ok = True
+    try:
+      async with self.client.stream(
+        'POST', '/api/invoke_endpoint', json=body, headers=self.headers
+      ) as response:
+        if response.status_code >= 400:
+          ok = False
+        async for line in response.aiter_lines():
+          if not line.startswith('data: '):
+            continue
+          data = line[6:].strip()
+          if not data or data == '[DONE]':
+            continue
+          try:
+            event = json.loads(data)
+          except json.JSONDecodeError:
+            continue
+          event_type = event.get('type')
+          if event_type == 'chat.created':
+            chat_id = event.get('chat_id')
+          elif event_type == 'error':
+            ok = False
+          elif event_type == 'response.output_text.delta' and event.get('delta'):
+            if first_token is None:
+              first_token = time.perf_counter() - start
+            text += event['delta']
+    except httpx.HTTPError:
+      ok = False
+
+    self.stats.record(route, time.perf_counter() - start, ok)
+    if first_token is not None:
+      self.stats.ttft[kind].append(first_token)
+    return chat_id, text
+
+  async def run(self):
+    await self._request('GET', '/api/config/agents')
+    await self._request('GET', '/api/chats')
+
+    agents = [(agent_id, kind) for agent_id, kind, _ in AGENT_MIX]
+    weights = [weight for _, _, weight in AGENT_MIX]
+
+    for _ in range(self.args.sessions):
+      agent_id, kind = self.rng.choices(agents, weights)[0]
+      chat_id: Optional[str] = None
+      history: List[dict] = []
+
+      for _ in range(self.args.turns):
+        history.append({'role': 'user', 'content': self.rng.choice(QUESTIONS)})
+        chat_id, answer = await self._invoke(agent_id, kind, chat_id, history)
+        history.append({'role': 'assistant', 'content': answer})
+        await self._request('GET', '/api/chats')
+        if self.args.think_ms:
+          await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.args.think_ms / 1000)
+
+      if chat_id:
+        await self._request('GET', f'/api/chats/{chat_id}')
+        if self.rng.random() < self.args.delete_ratio:
+          await self._request('DELETE', f'/api/chats/{chat_id}')
+
+
+def _print_report(stats: Stats, wall: float):
+  total = sum(len(v) for v in stats.latencies.values())
+  print()
+  print(f'Wall time: {wall:.2f}s, requests: {total}, throughput: {total / wall:.1f} req/s')
+  print()
+  header = (
+    f'{"route":<32} {"count":>7} {"errors":>7} {"req/s":>8} '
+    f'{"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}'
+  )
+  print(header)
+  print('-' * len(header))
+  for route in sorted(stats.latencies):
+    samples = stats.latencies[route]
+    print(
+      f'{route:<32} {len(samples):>7} {stats.errors.get(route, 0):>7} '
+      f'{len(samples) / wall:>8.1f} {_percentile(samples, 50) * 1000:>9.1f} '
+      f'{_percentile(samples, 95) * 1000:>9.1f} {_percentile(samples, 99) * 1000:>9.1f}'
+    )
+  print()
+  header = f'{"TTFT by agent type":<32} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}'
+  print(header)
+  print('-' * len(header))
+  for kind in sorted(stats.ttft):
+    samples = stats.ttft[kind]
+    print(
+      f'{kind:<32} {len(samples):>7} {_percentile(samples, 50) * 1000:>9.1f} '
+      f'{_percentile(samples, 95) * 1000:>9.1f} {_percentile(samples, 99) * 1000:>9.1f}'
+    )
+
+
+def _report_json(stats: Stats, wall: float) -> dict:
+  def summary(samples: List[float]) -> dict:
+    return {
+      'count': len(samples),
+      'p50_ms': _percentile(samples, 50) * 1000,
+      'p95_ms': _percentile(samples, 95) * 1000,
+      'p99_ms': _percentile(samples, 99) * 1000,
+    }
+
+  return {
+    'wall_seconds': wall,
+    'routes': {
+      route: {
+        **summary(samples),
+        'errors': stats.errors.get(route, 0),
+        'rps': len(samples) / wall,
+      }
+      for route, samples in stats.latencies.items()
+    },
+    'ttft': {kind: summary(samples) for kind, samples in stats.ttft.items()},
+  }
+
+
+def _start_processes(args: argparse.Namespace, workdir: Path) -> tuple[str, List[subprocess.Popen]]:
+  """Start the fake workspace and (unless --target is given) the app server."""
+  processes = []
+  fake_port = args.fake_port or _free_port()
+  fake_cmd = [
+    sys.executable, '-m', 'benchmarks.fake_workspace',
+    '--port', str(fake_port),
+    '--api-latency-ms', str(args.api_latency_ms),
+    '--ttft-ms', str(args.ttft_ms),
+    '--tokens-per-second', str(args.tokens_per_second),
+    '--response-tokens', str(args.response_tokens),
+    '--genie-step-ms', str(args.genie_step_ms),
+    '--genie-rows', str(args.genie_rows),
+  ]
+  processes.append(subprocess.Popen(fake_cmd, cwd=ROOT))
+
+  if args.target:
+    return args.target.rstrip('/'), processes
+
+  _write_app_config(workdir)
+  app_port = _free_port()
+  env = {
+    **os.environ,
+    'DATABRICKS_HOST': f'http://127.0.0.1:{fake_port}',
+    'DATABRICKS_TOKEN': 'dapi-load-test',
+    'ENV': 'production',
+    'APP_CONFIG_DIR': str(workdir),
+    # Empty value wins over .env.local, keeping storage local unless requested
+    'LAKEBASE_PG_URL': args.pg_url or '',
+    'CHAT_STORAGE': 'postgres' if args.pg_url else args.storage,
+    'CHAT_SQLITE_PATH': str(workdir / 'chats.db'),
+  }
+  app_cmd = [
+    sys.executable, '-m', 'uvicorn', 'server.app:app',
+    '--host', '127.0.0.1',
+    '--port', str(app_port),
+    '--workers', str(args.workers),
+    '--log-level', 'warning',
+    '--no-access-log',
+  ]
+  processes.append(subprocess.Popen(app_cmd, cwd=ROOT, env=env))
+  return f'http://127.0.0.1:{app_port}', processes
+
+
+async def _run(args: argparse.Namespace, base_url: str) -> tuple[Stats, float]:
+  await _wait_ready(f'{base_url}/api/health')
+  stats = Stats()
+  start = time.perf_counter()
+  limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+  async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+    drivers = [
+      SessionDriver(client, f'user{i}@example.com', stats, args) for i in range(args.users)
+    ]
+    await asyncio.gather(*[driver.run() for driver in drivers])
+  return stats, time.perf_counter() - start
+
+
+def main():
+  """Parse arguments, start the stack, run the workload and print the report."""
+  parser = argparse.ArgumentParser(description='Load test server.app:app against a fake workspace')
+  parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+  parser.add_argument('--sessions', type=int, default=2, help='Chats per user')
+  parser.add_argument('--turns', type=int, default=3, help='Messages per chat')
+  parser.add_argument('--think-ms', type=float, default=0, help='Pause between turns')
+  parser.add_argument('--delete-ratio', type=float, default=0.2, help='Share of chats deleted')
+  parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+  parser.add_argument('--target', help='Drive an already running server instead of starting one')
+  parser.add_argument('--pg-url', help='Use PostgreSQL chat storage (LAKEBASE_PG_URL)')
+  parser.add_argument(
+    '--storage',
+    choices=['memory', 'sqlite'],
+    default='memory',
+    help='Chat storage without --pg-url (SQLite in a temporary file)',
+  )
+  parser.add_argument('--fake-port', type=int, help='Port for the fake workspace')
+  parser.add_argument('--api-latency-ms', type=float, default=20.0)
+  parser.add_argument('--ttft-ms', type=float, default=300.0)
+  parser.add_argument('--tokens-per-second', type=float, default=80.0)
+  parser.add_argument('--response-tokens', type=int, default=120)
+  parser.add_argument('--genie-step-ms', type=float, default=400.0)
+  parser.add_argument('--genie-rows', type=int, default=250)
+  parser.add_argument('--seed', type=int, default=7)
+  parser.add_argument('--json', help='Write the report as JSON to this path')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory(prefix='load-test-') as workdir:
+    base_url, processes = _start_processes(args, Path(workdir))
+    try:
+      stats, wall = asyncio.run(_run(args, base_url))
+    finally:
+      for process in processes:
+        process.terminate()
+      for process in processes:
+        try:
+          process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+          process.kill()
+
+  _print_report(stats, wall)
+  if args.json:
+    Path(args.json).write_text(json.dumps(_report_json(stats, wall), indent=2))
+
+
+if __name__ == '__main__':
+  main()
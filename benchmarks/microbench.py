@@ -0,0 +1,522 @@
+"""Microbenchmarks for the server's pure-Python hot paths.
+
+Each benchmark builds realistic inputs once (see payloads.py) and times a single
+call with timeit. Results are compared against the committed baselines in
+benchmarks/baselines/microbench.json and printed as a table.
+
+Usage:
+    python -m benchmarks.microbench                    # run all, compare to baseline
+    python -m benchmarks.microbench -k mojibake        # only names containing "mojibake"
+    python -m benchmarks.microbench --save             # overwrite the baseline file
+    python -m benchmarks.microbench --fail-over 25     # exit 1 if anything is >25% slower
+
+Baselines are machine dependent: regenerate them with --save on the machine you
+compare on before making a change, then rerun after it.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+BASELINE_PATH = Path(__file__).parent / 'baselines' / 'microbench.json'
+
+# name -> factory returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+  """Register a benchmark factory under `name`."""
+
+  def decorator(factory: Callable[[], Callable[[], Any]]):
+    BENCHMARKS[name] = factory
+    return factory
+
+  return decorator
+
+
+def _rng() -> random.Random:
+  return random.Random(42)
+
+
+# =============================================================================
+# Streaming: mojibake repair and SSE formatting
+# =============================================================================
+
+
+@benchmark('fix_mojibake/ascii_chunk')
+def _fix_mojibake_ascii():
+  from server.services.agents.handlers.databricks_endpoint import fix_mojibake
+
+  text = 'Revenue grew 12% quarter over quarter '
+  return lambda: fix_mojibake(text)
+
+
+@benchmark('fix_mojibake/mojibake_chunk')
+def _fix_mojibake_broken():
+  from server.services.agents.handlers.databricks_endpoint import fix_mojibake
+
+  from benchmarks.payloads import mojibake
+
+  text = mojibake('Café sales — up 12% in Zürich ')
+  return lambda: fix_mojibake(text)
+
+
+@benchmark('fix_mojibake/mixed_emoji_chunk')
+def _fix_mojibake_mixed():
+  from server.services.agents.handlers.databricks_endpoint import fix_mojibake
+
+  from benchmarks.payloads import mojibake
+
+  text = mojibake('Café sales — up ') + '🚀 12% '
+  return lambda: fix_mojibake(text)
+
+
+@benchmark('fix_mojibake/clean_unicode_chunk')
+def _fix_mojibake_clean():
+  from server.services.agents.handlers.databricks_endpoint import fix_mojibake
+
+  text = 'Café owners in Zürich — 🚀 '
+  return lambda: fix_mojibake(text)
+
+
+def _repair_stream(text: str, chunk_chars: int):
+  from server.services.agents.handlers.databricks_endpoint import Utf8StreamRepairer
+
+  chunks = [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+  def run():
+    repairer = Utf8StreamRepairer()
+    for chunk in chunks:
+      repairer.feed(chunk)
+    repairer.flush()
+
+  return run
+
+
+@benchmark('Utf8StreamRepairer/ascii_chunk')
+def _repairer_ascii():
+  from server.services.agents.handlers.databricks_endpoint import Utf8StreamRepairer
+
+  repairer = Utf8StreamRepairer()
+  text = 'Revenue grew 12% quarter over quarter '
+  return lambda: repairer.feed(text)
+
+
+@benchmark('Utf8StreamRepairer/mojibake_chunk')
+def _repairer_broken():
+  from server.services.agents.handlers.databricks_endpoint import Utf8StreamRepairer
+
+  from benchmarks.payloads import mojibake
+
+  repairer = Utf8StreamRepairer()
+  text = mojibake('Café sales — up 12% in Zürich ')
+  return lambda: repairer.feed(text)
+
+
+@benchmark('Utf8StreamRepairer/clean_unicode_chunk')
+def _repairer_clean():
+  from server.services.agents.handlers.databricks_endpoint import Utf8StreamRepairer
+
+  repairer = Utf8StreamRepairer()
+  repairer.feed('Café ')  # detection happens once per stream
+  text = 'Café owners in Zürich — 🚀 '
+  return lambda: repairer.feed(text)
+
+
+@benchmark('Utf8StreamRepairer/mojibake_stream_200x7_chars_split')
+def _repairer_stream_split():
+  from benchmarks.payloads import mojibake
+
+  # 7-char chunks split most multi-byte sequences across chunk boundaries
+  return _repair_stream(mojibake('Café sales — up 12% in Zürich 🚀 ' * 45), 7)
+
+
+@benchmark('Utf8StreamRepairer/ascii_stream_200_chunks')
+def _repairer_stream_ascii():
+  from benchmarks.payloads import sentence
+
+  return _repair_stream(sentence(_rng(), 260), 7)
+
+
+@benchmark('convert_chat_completion_chunk/openai')
+def _convert_openai():
+  from server.services.agents.handlers.databricks_endpoint import convert_chat_completion_chunk
+
+  from benchmarks.payloads import chat_completion_chunk
+
+  chunk = chat_completion_chunk('Revenue grew 12% quarter over quarter ')
+  return lambda: convert_chat_completion_chunk(chunk)
+
+
+@benchmark('convert_chat_completion_chunk/gemini_list')
+def _convert_gemini():
+  from server.services.agents.handlers.databricks_endpoint import convert_chat_completion_chunk
+
+  from benchmarks.payloads import chat_completion_chunk
+
+  chunk = chat_completion_chunk(
+    [
+      {'type': 'text', 'text': 'Revenue grew '},
+      {'type': 'text', 'text': '12% quarter over quarter '},
+    ]
+  )
+  return lambda: convert_chat_completion_chunk(chunk)
+
+
+@benchmark('format_chunk_for_sse/agent_delta')
+def _format_agent_delta():
+  from server.services.agents.handlers.databricks_endpoint import format_chunk_for_sse
+
+  from benchmarks.payloads import agent_delta_event
+
+  chunk = agent_delta_event('Revenue grew 12% quarter over quarter ')
+  return lambda: format_chunk_for_sse(chunk, 'agent')
+
+
+@benchmark('format_chunk_for_sse/agent_done_with_trace')
+def _format_agent_done():
+  from server.services.agents.handlers.databricks_endpoint import format_chunk_for_sse
+
+  from benchmarks.payloads import agent_done_event
+
+  chunk = agent_done_event(_rng())
+  return lambda: format_chunk_for_sse(chunk, 'agent')
+
+
+@benchmark('format_chunk_for_sse/chat_completion')
+def _format_chat_completion():
+  from server.services.agents.handlers.databricks_endpoint import format_chunk_for_sse
+
+  from benchmarks.payloads import chat_completion_chunk
+
+  chunk = chat_completion_chunk('Revenue grew 12% quarter over quarter ')
+  return lambda: format_chunk_for_sse(chunk, 'chat_completion')
+
+
+# =============================================================================
+# Router helpers
+# =============================================================================
+
+
+@benchmark('_parse_json_field/arguments')
+def _parse_arguments():
+  from server.routers.agent import _parse_json_field
+
+  from benchmarks.payloads import json_arguments
+
+  value = json_arguments(_rng())
+  return lambda: _parse_json_field(value)
+
+
+@benchmark('_parse_json_field/tool_output_100_rows')
+def _parse_tool_output():
+  from server.routers.agent import _parse_json_field
+
+  from benchmarks.payloads import json_tool_output
+
+  value = json_tool_output(_rng(), rows=100)
+  return lambda: _parse_json_field(value)
+
+
+@benchmark('_parse_json_field/plain_text')
+def _parse_plain():
+  from server.routers.agent import _parse_json_field
+
+  from benchmarks.payloads import sentence
+
+  value = sentence(_rng(), 30)
+  return lambda: _parse_json_field(value)
+
+
+# =============================================================================
+# Tables and charts
+# =============================================================================
+
+
+def _extract_table(rows: int):
+  from server.services.agents.table_parser import extract_table_from_markdown
+
+  from benchmarks.payloads import agent_answer_with_table
+
+  text = agent_answer_with_table(_rng(), rows)
+  return lambda: extract_table_from_markdown(text)
+
+
+for _rows in (20, 200):
+  benchmark(f'extract_table_from_markdown/{_rows}_rows')(lambda rows=_rows: _extract_table(rows))
+
+
+@benchmark('extract_table_from_markdown/no_table_5kb')
+def _extract_no_table():
+  from server.services.agents.table_parser import extract_table_from_markdown
+
+  from benchmarks.payloads import sentence
+
+  rng = _rng()
+  text = '\n\n'.join(sentence(rng, 40) for _ in range(20))
+  return lambda: extract_table_from_markdown(text)
+
+
+def _extract_adversarial(kind: str):
+  from server.services.agents.table_parser import extract_tables_from_markdown
+
+  from benchmarks.payloads import adversarial_markdown
+
+  text = adversarial_markdown(kind, 1024 * 1024)
+  return lambda: extract_tables_from_markdown(text)
+
+
+# The previous regex scanner took ~17s on 64 KB of pipe_lines and grew quadratically
+for _kind in ('pipe_lines', 'single_line', 'many_tables'):
+  benchmark(f'extract_tables_from_markdown/adversarial_1mb_{_kind}')(
+    lambda kind=_kind: _extract_adversarial(kind)
+  )
+
+
+def _stream_tables(rows: int, delta_size: int):
+  from server.services.agents.table_parser import StreamingTableDetector
+
+  from benchmarks.payloads import agent_answer_with_table
+
+  text = agent_answer_with_table(_rng(), rows)
+  deltas = [text[i : i + delta_size] for i in range(0, len(text), delta_size)]
+
+  def run():
+    detector = StreamingTableDetector()
+    for delta in deltas:
+      detector.feed(delta)
+    return detector.close()
+
+  return run
+
+
+benchmark('StreamingTableDetector/200_rows_16b_deltas')(lambda: _stream_tables(200, 16))
+
+
+def _infer_chart(rows: int):
+  from server.services.agents.table_parser import _infer_chart_config
+
+  from benchmarks.payloads import table_rows
+
+  headers, data = table_rows(_rng(), rows)
+  return lambda: _infer_chart_config(headers, data)
+
+
+for _rows in (10, 100, 1000):
+  benchmark(f'_infer_chart_config/{_rows}_rows')(lambda rows=_rows: _infer_chart(rows))
+
+
+def _prepare_chart(rows: int, strings: bool = False):
+  from server.services.charts import frame_from_arrow, prepare_chart
+
+  from benchmarks.payloads import result_table
+
+  table = result_table(0, rows, strings)
+  return lambda: prepare_chart(frame_from_arrow(table))
+
+
+benchmark('prepare_chart/10k_rows')(lambda: _prepare_chart(10_000))
+benchmark('prepare_chart/10k_string_rows')(lambda: _prepare_chart(10_000, strings=True))
+benchmark('prepare_chart/1m_rows')(lambda: _prepare_chart(1_000_000))
+
+
+def _format_markdown(rows: int):
+  from server.services.agents.handlers.databricks_genie import _format_query_result_as_markdown
+
+  from benchmarks.payloads import query_result
+
+  columns, data = query_result(_rng(), rows)
+  return lambda: _format_query_result_as_markdown(columns, data)
+
+
+for _rows in (10, 100, 1000):
+  benchmark(f'_format_query_result_as_markdown/{_rows}_rows')(
+    lambda rows=_rows: _format_markdown(rows)
+  )
+
+
+def _genie_table_event(rows: int):
+  from server.services.agents.handlers.databricks_genie import _table_event
+  from server.services.genie import ResultData
+
+  from benchmarks.payloads import query_result
+
+  columns, data = query_result(_rng(), rows)
+  types = ['STRING', 'STRING', 'DOUBLE', 'LONG', 'DOUBLE']
+  response = {
+    'manifest': {
+      'schema': {'columns': [{'name': c, 'type_name': t} for c, t in zip(columns, types)]},
+      'total_row_count': rows,
+    },
+    'result': {'data_array': data},
+  }
+
+  result = ResultData.from_statement_response(response, preview_rows=rows)
+
+  def run():
+    table = {
+      'columns': result.column_names,
+      'types': types,
+      'values': result.typed_preview(),
+      'total_rows': result.row_count,
+    }
+    return json.dumps(_table_event(table))
+
+  return run
+
+
+for _rows in (10, 100):
+  benchmark(f'genie_table_event/{_rows}_rows')(lambda rows=_rows: _genie_table_event(rows))
+
+
+# =============================================================================
+# Chat serialization
+# =============================================================================
+
+
+def _chat_to_dict(count: int):
+  from benchmarks.payloads import chat_with_messages
+
+  chat = chat_with_messages(_rng(), count)
+  return chat.to_dict
+
+
+def _messages_to_dict(count: int):
+  from benchmarks.payloads import chat_with_messages
+
+  messages = chat_with_messages(_rng(), count).messages
+  return lambda: [msg.to_dict() for msg in messages]
+
+
+for _count in (10, 100, 1000):
+  benchmark(f'ChatModel.to_dict/{_count}_messages')(lambda count=_count: _chat_to_dict(count))
+  benchmark(f'MessageModel.to_dict/{_count}_messages')(
+    lambda count=_count: _messages_to_dict(count)
+  )
+
+
+def _chat_record_to_dict(count: int):
+  from server.services.chat import CompactUserScopedChatStorage
+
+  from benchmarks.payloads import chat_with_messages
+
+  async def fill():
+    user_storage = CompactUserScopedChatStorage().get_storage_for_user('user@example.com')
+    record = await user_storage.create('Revenue by region')
+    for msg in chat_with_messages(_rng(), count).messages:
+      await user_storage.add_message(record.id, msg)
+    return record
+
+  return asyncio.run(fill()).to_dict
+
+
+for _count in (10, 100, 1000):
+  benchmark(f'ChatRecord.to_dict/{_count}_messages')(
+    lambda count=_count: _chat_record_to_dict(count)
+  )
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+
+def _time_call(func: Callable[[], Any], repeat: int) -> float:
+  """Best per-call time in seconds over `repeat` autoranged runs."""
+  timer = timeit.Timer(func)
+  number, _ = timer.autorange()
+  return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+  if seconds is None:
+    return '-'
+  if seconds < 1e-6:
+    return f'{seconds * 1e9:.0f} ns'
+  if seconds < 1e-3:
+    return f'{seconds * 1e6:.2f} us'
+  if seconds < 1:
+    return f'{seconds * 1e3:.2f} ms'
+  return f'{seconds:.2f} s'
+
+
+def _load_baseline(path: Path) -> Dict[str, float]:
+  if not path.exists():
+    return {}
+  return json.loads(path.read_text()).get('results', {})
+
+
+def main():
+  """Run the selected benchmarks and print a comparison table."""
+  parser = argparse.ArgumentParser(description='Server microbenchmarks')
+  parser.add_argument('-k', '--filter', default='', help='Only run names containing this text')
+  parser.add_argument('--repeat', type=int, default=5, help='Timing repeats per benchmark')
+  parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+  parser.add_argument('--save', action='store_true', help='Write results to the baseline file')
+  parser.add_argument(
+    '--fail-over', type=float, help='Exit 1 if any benchmark is this many percent slower'
+  )
+  args = parser.parse_args()
+
+  # Handlers log on every call; keep the numbers about the code, not the log sink
+  logging.disable(logging.CRITICAL)
+
+  baseline = _load_baseline(args.baseline)
+  results: Dict[str, float] = {}
+  regressions = []
+
+  header = f'{"benchmark":<52} {"time":>11} {"baseline":>11} {"change":>8}'
+  print(header)
+  print('-' * len(header))
+
+  for name, factory in BENCHMARKS.items():
+    if args.filter not in name:
+      continue
+    seconds = _time_call(factory(), args.repeat)
+    results[name] = seconds
+
+    base = baseline.get(name)
+    change = ''
+    if base:
+      pct = (seconds - base) / base * 100
+      change = f'{pct:+.1f}%'
+      if args.fail_over is not None and pct > args.fail_over:
+        regressions.append(name)
+        change += ' !'
+    print(f'{name:<52} {_format_seconds(seconds):>11} {_format_seconds(base):>11} {change:>8}')
+
+  if args.save:
+    merged = {**_load_baseline(args.baseline), **results}
+    args.baseline.parent.mkdir(parents=True, exist_ok=True)
+    args.baseline.write_text(
+      json.dumps(
+        {
+          'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+          },
+          'results': dict(sorted(merged.items())),
+        },
+        indent=2,
+      )
+      + '\n'
+    )
+    print(f'\nSaved {len(results)} results to {args.baseline}')
+
+  if regressions:
+    print(f'\n{len(regressions)} regression(s) over {args.fail_over}%: {", ".join(regressions)}')
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
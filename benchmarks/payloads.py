@@ -0,0 +1,234 @@
+"""Realistic generated payloads shared by the benchmarks.
+
+Every generator is deterministic for a given seed so that runs are comparable
+against the committed baselines.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+_WORDS = (
+  'revenue grew steadily across all regions while operating costs remained flat which '
+  'suggests the new pricing model is working customers in europe responded well to the '
+  'bundled offer and small retailers led adoption during the second half of the year'
+).split()
+
+_REGIONS = ['EMEA', 'AMER', 'APAC', 'LATAM', 'ANZ']
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def sentence(rng: random.Random, words: int = 20) -> str:
+  """Random English-looking sentence."""
+  return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def mojibake(text: str) -> str:
+  """Encode text as UTF-8 and decode it as Latin-1, as some endpoints do."""
+  return text.encode('utf-8').decode('latin-1')
+
+
+def chat_completion_chunk(content: Any, chunk_id: str = 'chatcmpl-8f2a') -> Dict[str, Any]:
+  """OpenAI-style chat completion chunk."""
+  return {
+    'id': chunk_id,
+    'object': 'chat.completion.chunk',
+    'created': 1712133837,
+    'model': 'databricks-meta-llama-3-3-70b-instruct',
+    'choices': [{'index': 0, 'delta': {'content': content}, 'finish_reason': None}],
+  }
+
+
+def agent_delta_event(delta: str) -> Dict[str, Any]:
+  """Agent-format text delta event."""
+  return {'type': 'response.output_text.delta', 'item_id': 'msg_5f1c2a', 'delta': delta}
+
+
+def agent_done_event(rng: random.Random, text_words: int = 300, spans: int = 20) -> Dict[str, Any]:
+  """Final agent message event including a databricks_output trace."""
+  return {
+    'type': 'response.output_item.done',
+    'item': {
+      'type': 'message',
+      'id': 'msg_5f1c2a',
+      'role': 'assistant',
+      'content': [{'type': 'output_text', 'text': sentence(rng, text_words)}],
+    },
+    'databricks_output': {
+      'trace': {
+        'info': {'trace_id': 'tr-0d5a8c1e2b3f4a5b6c7d8e9f', 'state': 'OK'},
+        'data': {
+          'spans': [
+            {
+              'name': f'span_{i}',
+              'span_id': f'{i:016x}',
+              'attributes': {'mlflow.spanInputs': sentence(rng, 15)},
+            }
+            for i in range(spans)
+          ]
+        },
+      }
+    },
+  }
+
+
+def json_arguments(rng: random.Random, keys: int = 4) -> str:
+  """Tool call arguments as a JSON string."""
+  return json.dumps({f'arg_{i}': sentence(rng, 6) for i in range(keys)})
+
+
+def json_tool_output(rng: random.Random, rows: int = 100) -> str:
+  """Tool call output as a JSON string (Genie-like tabular payload)."""
+  return json.dumps(
+    {
+      'columns': ['month', 'region', 'revenue', 'orders'],
+      'rows': [
+        [
+          f'2024-{i % 12 + 1:02d}',
+          rng.choice(_REGIONS),
+          round(rng.uniform(1e3, 1e6), 2),
+          rng.randint(1, 900),
+        ]
+        for i in range(rows)
+      ],
+    }
+  )
+
+
+def query_result(
+  rng: random.Random, rows: int, time_series: bool = True
+) -> tuple[List[str], List[List[Any]]]:
+  """Genie-style query result: column names and string-valued rows."""
+  columns = ['month', 'region', 'revenue', 'orders', 'avg_order_value']
+  data = []
+  for i in range(rows):
+    first = f'{2020 + i // 60}-{i // 5 % 12 + 1:02d}' if time_series else f'Product {i}'
+    revenue = rng.uniform(1e3, 1e6)
+    orders = rng.randint(1, 900)
+    data.append(
+      [first, rng.choice(_REGIONS), f'{revenue:.2f}', str(orders), f'{revenue / orders:.2f}']
+    )
+  return columns, data
+
+
+def markdown_table(columns: List[str], rows: List[List[Any]]) -> str:
+  """Render rows as a GitHub-flavored markdown table."""
+  lines = ['| ' + ' | '.join(columns) + ' |', '| ' + ' | '.join('---' for _ in columns) + ' |']
+  lines.extend('| ' + ' | '.join(str(v) for v in row) + ' |' for row in rows)
+  return '\n'.join(lines)
+
+
+def agent_answer_with_table(rng: random.Random, rows: int) -> str:
+  """Agent answer with prose, a markdown table and a closing paragraph."""
+  columns, data = query_result(rng, rows)
+  return '\n\n'.join(
+    [
+      sentence(rng, 40),
+      '**Results:**\n' + markdown_table(columns, data),
+      sentence(rng, 30),
+    ]
+  )
+
+
+def adversarial_markdown(kind: str, size: int) -> str:
+  """About `size` characters of pipe-heavy markdown that defeats backtracking table regexes.
+
+  Kinds:
+    pipe_lines: rows like `| a | b |` with no alignment row, so no table
+    single_line: one long line of `a | ` cells and no newline
+    many_tables: small three-row tables separated by prose
+  """
+  if kind == 'pipe_lines':
+    unit = '| a | b |\n'
+  elif kind == 'single_line':
+    unit = 'a | '
+  elif kind == 'many_tables':
+    unit = 'Some text.\n\n| Region | Revenue |\n|---|---:|\n| EMEA | 1,000 |\n| AMER | 2,000 |\n\n'
+  else:
+    raise ValueError(f'Unknown adversarial markdown kind: {kind}')
+  return unit * (size // len(unit))
+
+
+def table_rows(
+  rng: random.Random, rows: int, monthly: bool = True
+) -> tuple[List[str], List[List[str]]]:
+  """Headers and string cells as parsed from a markdown table."""
+  headers = ['Month' if monthly else 'Region', 'Revenue', 'Orders']
+  data = [
+    [
+      f'{_MONTHS[i % 12]} {2020 + i // 12}' if monthly else f'{rng.choice(_REGIONS)}-{i}',
+      f'{rng.uniform(1e3, 1e6):,.2f}',
+      str(rng.randint(1, 900)),
+    ]
+    for i in range(rows)
+  ]
+  return headers, data
+
+
+def result_table(seed: int, rows: int, strings: bool = False):
+  """Arrow table like a large Genie result: one row per minute and region.
+
+  Columns are `ts`, `region`, `revenue` and `orders`, with native types, or
+  all strings (as a JSON_ARRAY result before typing) when `strings` is set.
+  """
+  import numpy as np
+  import pyarrow as pa
+
+  gen = np.random.default_rng(seed)
+  minutes = np.arange(rows) // len(_REGIONS)
+  ts = np.datetime64('2024-01-01T00:00:00', 's') + minutes.astype('timedelta64[m]')
+  revenue = 1e4 + 5e3 * np.sin(minutes / 720) + gen.normal(0, 500, rows)
+  columns = {
+    'ts': pa.array(ts),
+    'region': pa.array(np.array(_REGIONS)[np.arange(rows) % len(_REGIONS)]),
+    'revenue': pa.array(revenue.round(2)),
+    'orders': pa.array(gen.integers(1, 900, rows)),
+  }
+  if strings:
+    columns = {name: col.cast(pa.string()) for name, col in columns.items()}
+  return pa.table(columns)
+
+
+def chat_with_messages(rng: random.Random, count: int):
+  """Detached ChatModel with `count` alternating user/assistant messages."""
+  from server.db.models import ChatModel, MessageModel
+
+  start = datetime(2025, 1, 1, 9, 0, 0)
+  chat = ChatModel(
+    id='chat_0123456789ab',
+    user_email='user@example.com',
+    title='Revenue by region',
+    agent_id='mas-5c903a9d-endpoint',
+    created_at=start,
+    updated_at=start + timedelta(minutes=count),
+  )
+  messages = []
+  for i in range(count):
+    is_user = i % 2 == 0
+    trace_summary = None
+    if not is_user:
+      trace_summary = {
+        'trace_id': f'tr-{i:08x}',
+        'duration_ms': 0,
+        'status': 'OK',
+        'tools_called': [{'name': 'sales_genie', 'duration_ms': 0, 'status': 'OK'}],
+        'retrieval_calls': [],
+        'llm_calls': [],
+        'total_tokens': 0,
+        'spans_count': 1,
+      }
+    messages.append(
+      MessageModel(
+        id=f'msg_{i:012x}',
+        chat_id=chat.id,
+        role='user' if is_user else 'assistant',
+        content=sentence(rng, 12 if is_user else 120),
+        timestamp=start + timedelta(seconds=30 * i),
+        trace_id=trace_summary['trace_id'] if trace_summary else None,
+        trace_summary=trace_summary,
+        is_error=False,
+      )
+    )
+  chat.messages = messages
+  return chat
@@ -7,10 +7,18 @@ import { ChatInput } from "./ChatInput";
 import { FeedbackModal } from "@/components/modals/FeedbackModal";
 import { TraceModal } from "@/components/modals/TraceModal";
 import { FunctionCallNotification } from "@/components/notifications/FunctionCallNotification";
-import { Message } from "@/lib/types";
+import {
+  Message,
+  StreamTableCompleted,
+  Visualization,
+} from "@/lib/types";
 import { useUserInfo } from "@/hooks/useUserInfo";
 import { useAgents } from "@/hooks/useAgents";
-import { detectAndGenerateVisualizations } from "@/lib/tableDetector";
+import {
+  chartFromStreamedTable,
+  detectAndGenerateVisualizations,
+  visualizationsFromTableEvent,
+} from "@/lib/tableDetector";
 import { detectVisualizationsFromFunctionCalls } from "@/lib/functionOutputDetector";
 
 // Dev-only logger
@@ -45,7 +53,11 @@ export function ChatCore({
 }: ChatCoreProps) {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isLoading, setIsLoading] = useState(false);
+  const [progressText, setProgressText] = useState<string | undefined>();
   const [isLoadingHistory, setIsLoadingHistory] = useState(false);
+  // Cursor of the oldest loaded message when the chat has older ones
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
   const { userInfo } = useUserInfo();
   const { agents } = useAgents();
 
@@ -102,6 +114,8 @@ export function ChatCore({
   const abortControllerRef = useRef<AbortController | null>(null);
   const activeStreamChatIdRef = useRef<string | undefined>(undefined);
   const abortReasonRef = useRef<"user_stopped" | "chat_switched" | null>(null);
+  const historyAgentIdRef = useRef<string | undefined>(undefined);
+  const skipScrollRef = useRef(false);
 
   // Load chat messages when chatId changes
   useEffect(() => {
@@ -127,6 +141,7 @@ export function ChatCore({
       } else {
         devLog("New chat - resetting all state");
         setMessages([]);
+        setOlderCursor(null);
         setIsLoading(false);
         setFeedbackModal({
           isOpen: false,
@@ -138,8 +153,12 @@ export function ChatCore({
     }
   }, [chatId, currentSessionId]);
 
-  // Auto-scroll to bottom when new messages arrive
+  // Auto-scroll to bottom when new messages arrive (not when older ones are prepended)
   useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -162,8 +181,47 @@ export function ChatCore({
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
 
+  // Convert stored messages, regenerating visualizations for assistant messages
+  const toLoadedMessages = (rawMessages: any[]): Message[] => {
+    // Get the agent for this chat (will be selectedAgent or chat's agent_id)
+    const chatAgent = historyAgentIdRef.current
+      ? agents.find((a) => a.id === historyAgentIdRef.current)
+      : selectedAgent;
+
+    return rawMessages.map((msg: any) => {
+      const baseMessage = {
+        ...msg,
+        timestamp: new Date(msg.timestamp),
+        traceId: msg.trace_id,
+        traceSummary: msg.trace_summary,
+        isError: msg.is_error,
+      };
+
+      // Regenerate visualizations for assistant messages
+      if (msg.role === "assistant" && msg.content && !msg.is_error) {
+        // Priority 1: Detect from function call outputs
+        let visualizations = detectVisualizationsFromFunctionCalls(
+          msg.trace_summary?.function_calls,
+          chatAgent,
+        );
+
+        // Priority 2: Fallback to markdown table detection
+        if (visualizations.length === 0) {
+          visualizations = detectAndGenerateVisualizations(msg.content);
+        }
+
+        if (visualizations.length > 0) {
+          return { ...baseMessage, visualizations };
+        }
+      }
+
+      return baseMessage;
+    });
+  };
+
   const loadChatHistory = async (id: string) => {
     setMessages([]); // Clear messages immediately to avoid showing old content
+    setOlderCursor(null);
     setIsLoadingHistory(true);
     try {
       const response = await fetch(`/api/chats/${id}`);
@@ -190,43 +248,12 @@ export function ChatCore({
         onAgentChange(chat.agent_id);
       }
 
-      // Get the agent for this chat (will be selectedAgent or chat's agent_id)
-      const chatAgent = chat.agent_id
-        ? agents.find((a) => a.id === chat.agent_id)
-        : selectedAgent;
-
-      const loadedMessages = chat.messages.map((msg: any) => {
-        const baseMessage = {
-          ...msg,
-          timestamp: new Date(msg.timestamp),
-          traceId: msg.trace_id,
-          traceSummary: msg.trace_summary,
-          isError: msg.is_error,
-        };
-
-        // Regenerate visualizations for assistant messages
-        if (msg.role === "assistant" && msg.content && !msg.is_error) {
-          // Priority 1: Detect from function call outputs
-          let visualizations = detectVisualizationsFromFunctionCalls(
-            msg.trace_summary?.function_calls,
-            chatAgent,
-          );
-
-          // Priority 2: Fallback to markdown table detection
-          if (visualizations.length === 0) {
-            visualizations = detectAndGenerateVisualizations(msg.content);
-          }
-
-          if (visualizations.length > 0) {
-            return { ...baseMessage, visualizations };
-          }
-        }
-
-        return baseMessage;
-      });
+      historyAgentIdRef.current = chat.agent_id;
+      const loadedMessages = toLoadedMessages(chat.messages);
 
       devLog("Loaded", loadedMessages.length, "messages from chat history");
       setMessages(loadedMessages);
+      setOlderCursor(chat.has_more_messages ? chat.messages_cursor : null);
     } catch (error) {
       console.error("Failed to load chat history:", error);
       setMessages([]);
@@ -235,6 +262,28 @@ export function ChatCore({
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!chatId || !olderCursor || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const params = new URLSearchParams({ before: olderCursor });
+      const response = await fetch(`/api/chats/${chatId}/messages?${params}`);
+      if (!response.ok) {
+        console.error(`Failed to load older messages: ${response.status}`);
+        return;
+      }
+      const page = await response.json();
+      const olderMessages = toLoadedMessages(page.messages);
+      skipScrollRef.current = true;
+      setMessages((prev) => [...olderMessages, ...prev]);
+      setOlderCursor(page.older_cursor);
+    } catch (error) {
+      console.error("Failed to load older messages:", error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
   const sendMessage = async (content: string) => {
     if (!content.trim()) return;
 
@@ -253,11 +302,23 @@ export function ChatCore({
 
     setMessages((prev) => [...prev, userMessage]);
     setIsLoading(true);
+    setProgressText(undefined);
     setActiveFunctionCalls([]);
 
     const assistantMessageId = `temp_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
     let assistantMessageCreated = false;
     let streamedContent = "";
+    let tableVisualizations: Visualization[] = [];
+    // Markdown tables found by the server while the answer streams (table.* events)
+    const streamedTables: {
+      headers: string[];
+      rows: string[][];
+      chartConfig?: StreamTableCompleted["chart_config"];
+    }[] = [];
+    const streamedTableCharts = (): Visualization[] =>
+      streamedTables
+        .map((t) => t && chartFromStreamedTable(t.headers, t.rows, t.chartConfig))
+        .filter((viz): viz is Visualization => Boolean(viz));
     let activeChatId = chatId;
 
     try {
@@ -292,6 +353,21 @@ export function ChatCore({
       let buffer = "";
       let lastUpdateTime = 0;
       const UPDATE_INTERVAL = 50;
+      // Charts of streaming tables are rebuilt from all rows, so update them less often
+      let lastChartUpdateTime = 0;
+      const CHART_UPDATE_INTERVAL = 250;
+      const updateStreamedCharts = () => {
+        if (!assistantMessageCreated) return;
+        lastChartUpdateTime = Date.now();
+        const charts = streamedTableCharts();
+        setMessages((prev) =>
+          prev.map((msg) =>
+            msg.id === assistantMessageId
+              ? { ...msg, visualizations: charts.length > 0 ? charts : undefined }
+              : msg,
+          ),
+        );
+      };
 
       try {
         while (true) {
@@ -356,6 +432,46 @@ export function ChatCore({
                 continue;
               }
 
+              // Handle Genie progress - show the current step while waiting
+              if (
+                event.type === "genie.progress" ||
+                event.type === "genie.queue"
+              ) {
+                setProgressText(event.message);
+                continue;
+              }
+
+              // Handle structured query results - render without parsing markdown
+              if (event.type === "table") {
+                tableVisualizations = [
+                  ...tableVisualizations,
+                  ...visualizationsFromTableEvent(event),
+                ];
+                continue;
+              }
+
+              // Handle markdown tables detected while streaming - chart them progressively
+              if (event.type === "table.started") {
+                streamedTables[event.index] = { headers: event.headers, rows: [] };
+                continue;
+              }
+
+              if (event.type === "table.rows") {
+                streamedTables[event.index]?.rows.push(...event.rows);
+                if (Date.now() - lastChartUpdateTime >= CHART_UPDATE_INTERVAL) {
+                  updateStreamedCharts();
+                }
+                continue;
+              }
+
+              if (event.type === "table.completed") {
+                if (streamedTables[event.index]) {
+                  streamedTables[event.index].chartConfig = event.chart_config;
+                }
+                updateStreamedCharts();
+                continue;
+              }
+
               // Handle stream completion - update message with trace data
               if (event.type === "stream.completed") {
                 devLog("Stream completed:", event);
@@ -487,19 +603,28 @@ export function ChatCore({
             const currentMessage = prev.find((m) => m.id === assistantMessageId);
             const traceSummary = currentMessage?.traceSummary;
 
-            // Priority 1: Detect visualizations from function call outputs (Genie, KA, etc.)
-            let visualizations = detectVisualizationsFromFunctionCalls(
-              traceSummary?.function_calls,
-              selectedAgent,
-            );
+            // Priority 1: Structured table events (Genie)
+            let visualizations = tableVisualizations;
+
+            // Priority 2: Detect visualizations from function call outputs (Genie, KA, etc.)
+            if (visualizations.length === 0) {
+              visualizations = detectVisualizationsFromFunctionCalls(
+                traceSummary?.function_calls,
+                selectedAgent,
+              );
+            }
 
             if (visualizations.length > 0) {
               devLog(
-                `Detected ${visualizations.length} visualization(s) from function call outputs`,
+                `Detected ${visualizations.length} visualization(s) from table events or function call outputs`,
               );
             } else {
-              // Priority 2: Fallback to markdown table detection
-              visualizations = detectAndGenerateVisualizations(streamedContent);
+              // Priority 3: Fallback to markdown tables, as detected by the server
+              // while streaming, or parsed here if it sent none
+              visualizations = streamedTableCharts();
+              if (visualizations.length === 0) {
+                visualizations = detectAndGenerateVisualizations(streamedContent);
+              }
               if (visualizations.length > 0) {
                 devLog(
                   `Detected ${visualizations.length} visualization(s) from markdown tables`,
@@ -578,6 +703,7 @@ export function ChatCore({
       ]);
     } finally {
       setIsLoading(false);
+      setProgressText(undefined);
       abortControllerRef.current = null;
     }
   };
@@ -694,9 +820,23 @@ export function ChatCore({
           </div>
         ) : (
           <>
+            {olderCursor && (
+              <div className="flex justify-center pt-4">
+                <button
+                  onClick={loadOlderMessages}
+                  disabled={isLoadingOlder}
+                  className="inline-flex items-center gap-2 text-[0.75rem] text-[var(--color-accent-primary)] hover:underline disabled:opacity-60 tracking-wide"
+                  style={{ fontFamily: "var(--font-body)" }}
+                >
+                  {isLoadingOlder && <Loader2 className="h-3 w-3 animate-spin" />}
+                  Load earlier messages
+                </button>
+              </div>
+            )}
             <MessageList
               messages={messages}
               isLoading={isLoading}
+              loadingText={progressText}
               onFeedback={handleFeedback}
               onViewTrace={handleTrace}
               selectedAgentId={selectedAgentId}
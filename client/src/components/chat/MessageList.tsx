@@ -8,6 +8,8 @@ import { useAgents } from "@/hooks/useAgents";
 interface MessageListProps {
   messages: MessageType[];
   isLoading: boolean;
+  /** Replaces the default "AI is thinking..." text, e.g. with Genie progress */
+  loadingText?: string;
   onFeedback: (messageId: string, type: "positive" | "negative") => void;
   onViewTrace: (messageId: string) => void;
   selectedAgentId?: string;
@@ -17,6 +19,7 @@ interface MessageListProps {
 export function MessageList({
   messages,
   isLoading,
+  loadingText,
   onFeedback,
   onViewTrace,
   selectedAgentId,
@@ -66,7 +69,7 @@ export function MessageList({
             className="text-[0.8125rem] italic tracking-wide"
             style={{ fontFamily: "var(--font-body)" }}
           >
-            AI is thinking...
+            {loadingText ? `${loadingText}...` : "AI is thinking..."}
           </span>
         </div>
       )}
@@ -22,6 +22,7 @@ export interface Chat {
   title: string;
   timestamp: Date;
   agentId?: string; // Agent used for this chat
+  preview?: string; // Start of the last message
 }
 
 interface SidebarProps {
@@ -149,6 +150,17 @@ export function Sidebar({
                   >
                     {chat.title}
                   </h3>
+                  {chat.preview && (
+                    <p
+                      className={`text-[11px] truncate mt-0.5 ${
+                        currentChatId === chat.id
+                          ? "text-white/70"
+                          : "text-[var(--color-muted-foreground)]"
+                      }`}
+                    >
+                      {chat.preview}
+                    </p>
+                  )}
 
                   {/* Delete button - show on hover */}
                   {hoveredChat === chat.id && (
@@ -77,6 +77,7 @@ interface ChatData {
   title: string;
   agent_id?: string;
   updated_at: string;
+  last_message_preview?: string | null;
 }
 
 export function NavigationProvider({
@@ -128,6 +129,7 @@ export function NavigationProvider({
         title: chat.title,
         agentId: chat.agent_id,
         timestamp: new Date(chat.updated_at),
+        preview: chat.last_message_preview ?? undefined,
       }));
 
       setChats(chatList);
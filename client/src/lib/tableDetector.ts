@@ -3,7 +3,13 @@
  * Ported from server/services/agents/table_parser.py
  */
 
-import { Visualization, TableData, ChartData } from "./types";
+import {
+  Visualization,
+  TableData,
+  ChartData,
+  StreamTable,
+  StreamTableCompleted,
+} from "./types";
 
 /**
  * Strip markdown formatting from text.
@@ -65,6 +71,112 @@ export function detectAndGenerateVisualizations(
   return visualizations;
 }
 
+const NUMERIC_SQL_TYPES = new Set([
+  "BYTE",
+  "SHORT",
+  "INT",
+  "LONG",
+  "FLOAT",
+  "DOUBLE",
+  "DECIMAL",
+]);
+const TIME_SQL_TYPES = new Set(["DATE", "TIMESTAMP", "TIMESTAMP_NTZ"]);
+
+/**
+ * Generate visualizations from a structured `table` stream event.
+ * Column types come from the server, so no values are parsed here.
+ * Returns the table itself, plus the chart the server prepared from all rows
+ * or, for older servers, a chart of the preview rows when a numeric column
+ * follows the first one.
+ */
+export function visualizationsFromTableEvent(
+  event: StreamTable,
+): Visualization[] {
+  const { columns, rows } = event;
+  if (columns.length === 0 || rows.length === 0) return [];
+
+  const headers = columns.map((c) => c.name);
+  const table: TableData = {
+    headers,
+    rows: rows.map((row) => row.map((v) => (v === null ? "" : v))),
+  };
+  const visualizations: Visualization[] = [{ type: "table", data: table }];
+
+  if (event.chart) {
+    const chartData: ChartData = {
+      labels: event.chart.data.labels,
+      datasets: event.chart.data.datasets.map((dataset) => ({
+        ...dataset,
+        // Gaps (null) are skipped by the chart like NaN
+        data: dataset.data.map((v) => (v === null ? NaN : v)),
+      })),
+    };
+    visualizations.push({ type: event.chart.type, data: chartData });
+    return visualizations;
+  }
+
+  const yColumn = columns.findIndex(
+    (c, i) => i > 0 && NUMERIC_SQL_TYPES.has(c.type),
+  );
+  if (yColumn < 0 || rows.length < 2) return visualizations;
+
+  const firstHeader = headers[0].toLowerCase();
+  const isTimeSeries =
+    TIME_SQL_TYPES.has(columns[0].type) ||
+    ["month", "year", "date", "time", "quarter", "week", "day"].some((k) =>
+      firstHeader.includes(k),
+    );
+  const chartType = isTimeSeries ? "line" : "bar";
+
+  const chartData: ChartData = {
+    labels: rows.map((row) => String(row[0] ?? "")),
+    datasets: [
+      {
+        label: headers[yColumn],
+        data: rows.map((row) =>
+          typeof row[yColumn] === "number" ? (row[yColumn] as number) : 0,
+        ),
+        ...(chartType === "line" ? { tension: 0.3 } : {}),
+      },
+    ],
+  };
+  visualizations.push({ type: chartType, data: chartData });
+
+  return visualizations;
+}
+
+/**
+ * Generate a chart for a markdown table received through `table.*` stream events.
+ * Called with the rows received so far to chart large tables progressively;
+ * `chartConfig` is the server's inference, sent with `table.completed`.
+ */
+export function chartFromStreamedTable(
+  headers: string[],
+  rows: string[][],
+  chartConfig?: StreamTableCompleted["chart_config"],
+): Visualization | null {
+  if (headers.length < 2 || rows.length === 0) return null;
+
+  const cleanHeaders = headers.map(stripMarkdown);
+  const cleanRows = rows.map((row) => row.map(stripMarkdown));
+  const { chartType, xColumn, yColumn } = chartConfig
+    ? {
+        chartType: chartConfig.type,
+        xColumn: chartConfig.x_column,
+        yColumn: chartConfig.y_column,
+      }
+    : inferChartConfig(cleanHeaders, cleanRows);
+
+  const table: TableMatch = {
+    headers: cleanHeaders,
+    rows: cleanRows,
+    chartType,
+    xColumn,
+    yColumn,
+  };
+  return isPlottable(table) ? createChartVisualization(table) : null;
+}
+
 /**
  * Extract all markdown tables from text.
  */
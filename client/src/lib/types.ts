@@ -37,6 +37,64 @@ export interface StreamMessageDone {
   id: string;
 }
 
+// Structured query result (Genie), sent instead of parsing markdown tables
+export interface StreamTableColumn {
+  name: string;
+  type: string; // SQL type name, e.g. "STRING", "LONG", "DECIMAL", "DATE"
+}
+
+export interface StreamTable {
+  type: "table";
+  columns: StreamTableColumn[];
+  rows: (string | number | null)[][];
+  row_count: number;
+  result?: {
+    result_id: string;
+    url: string;
+  } | null;
+  chart?: StreamChart | null;
+}
+
+// Chart data prepared on the server from all fetched rows (server/services/charts.py)
+export interface StreamChart {
+  type: "line" | "bar";
+  data: {
+    labels: string[];
+    datasets: { label: string; data: (number | null)[]; tension?: number }[];
+  };
+  x: { name: string; kind: "numeric" | "date" | "categorical" };
+  source_rows: number;
+  points: number;
+  aggregated: boolean;
+  downsampled: boolean;
+}
+
+// Markdown tables detected while the answer streams (server/services/agents/table_parser.py)
+export interface StreamTableStarted {
+  type: "table.started";
+  index: number;
+  headers: string[];
+  start: number;
+}
+
+export interface StreamTableRows {
+  type: "table.rows";
+  index: number;
+  rows: string[][];
+}
+
+export interface StreamTableCompleted {
+  type: "table.completed";
+  index: number;
+  row_count: number;
+  chart_config: {
+    type: "line" | "bar";
+    x_column: number;
+    y_column: number;
+  } | null;
+  end: number;
+}
+
 export interface MASHandoff {
   specialist: string;
   request: any;
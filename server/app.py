@@ -16,9 +16,10 @@ from . import tracing  # noqa: F401
 from .config_loader import config_loader
 
 # Routers for organizing endpoints
-from .db import run_migrations
-from .routers import agent, chat, config, health
-from .services.chat import init_storage
+from .db import run_migrations, unit_of_work
+from .routers import agent, chat, config, genie, health
+from .services.chat import close_storage, init_storage
+from .services.workspace import workspace
 
 # Configure logging for Databricks Apps monitoring
 # Logs written to stdout/stderr will be available in Databricks Apps UI and /logz endpoint
@@ -32,6 +33,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+API_PREFIX = '/api'
+
 # Determine environment:
 # 1. If .env.local exists → local development (load it and default to development)
 # 2. If ENV is explicitly set → use that value
@@ -62,6 +65,36 @@ async def lifespan(app: FastAPI):
 
   # Shutdown: Cleanup if needed
   logger.info('👋 Shutting down application...')
+  await close_storage()
+  await workspace.aclose()
+
+
+class UnitOfWorkMiddleware:
+  """Run each API request in a storage unit of work (see server.db.unit_of_work).
+
+  A plain ASGI middleware so that the unit also spans streamed responses.
+  Writes still pending when the response ends are committed before its last
+  body message is sent, so the client never sees a complete response before
+  they are stored.
+  """
+
+  def __init__(self, app):
+    """Wrap the ASGI application."""
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    """Wrap API requests in a unit of work; pass everything else through."""
+    if scope['type'] != 'http' or not scope['path'].startswith(API_PREFIX):
+      await self.app(scope, receive, send)
+      return
+    async with unit_of_work() as unit:
+
+      async def send_after_commit(message):
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+          await unit.commit()
+        await send(message)
+
+      await self.app(scope, receive, send_after_commit)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -82,6 +115,8 @@ app.add_middleware(
   allow_headers=['*'],
 )
 
+app.add_middleware(UnitOfWorkMiddleware)
+
 # Add usage tracker (optional, based on config)
 # See https://pypi.org/project/dbdemos-tracker/ for details
 tracker_config = config_loader.app_config
@@ -103,13 +138,12 @@ if tracker_config.get('enable_tracker', False):
   except Exception as e:
     logger.warning(f'Failed to initialize tracker: {e}')
 
-API_PREFIX = '/api'
-
 # Include routers for modular endpoint organization
 app.include_router(health.router, prefix=API_PREFIX, tags=['health'])
 app.include_router(config.router, prefix=API_PREFIX, tags=['configuration'])
 app.include_router(agent.router, prefix=API_PREFIX, tags=['agents'])
 app.include_router(chat.router, prefix=API_PREFIX, tags=['chat'])
+app.include_router(genie.router, prefix=API_PREFIX, tags=['genie'])
 
 # Production: Serve Vite static build
 # Vite builds to 'out' directory (configured in vite.config.ts)
@@ -0,0 +1,41 @@
+"""Tests for the ASGI middleware of the app."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from .app import API_PREFIX, UnitOfWorkMiddleware
+from .db import database, defer_write
+
+
+def test_deferred_writes_commit_before_last_body_message(monkeypatch):
+  events = []
+
+  class Session:
+    async def execute(self, statement):
+      events.append(f'commit {statement}')
+
+  @asynccontextmanager
+  async def session_scope():
+    yield Session()
+
+  monkeypatch.setattr(database, 'session_scope', session_scope)
+
+  async def app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'data: 1\n\n', 'more_body': True})
+    defer_write(text('SELECT 1'))
+    await send({'type': 'http.response.body', 'body': b'data: [DONE]\n\n'})
+
+  async def send(message):
+    events.append(message['type'] + (' (more)' if message.get('more_body') else ''))
+
+  scope = {'type': 'http', 'path': f'{API_PREFIX}/invoke_endpoint'}
+  asyncio.run(UnitOfWorkMiddleware(app)(scope, None, send))
+  assert events == [
+    'http.response.start',
+    'http.response.body (more)',
+    'commit SELECT 1',
+    'http.response.body',
+  ]
@@ -13,6 +13,7 @@ In development mode, config is re-read from disk on every access (no caching).
 
 import json
 import logging
+import os
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -28,11 +29,13 @@ class ConfigLoader:
     """Initialize the config loader.
 
     Args:
-        config_dir: Path to config directory. Defaults to /config in project root.
+        config_dir: Path to config directory. Defaults to APP_CONFIG_DIR if set,
+            otherwise /config in project root.
     """
     if config_dir is None:
-      # Default to /config directory at project root
-      config_dir = Path(__file__).parent.parent / 'config'
+      # Default to /config directory at project root (APP_CONFIG_DIR overrides it,
+      # e.g. to point the load test harness at its own agents)
+      config_dir = Path(os.environ.get('APP_CONFIG_DIR') or Path(__file__).parent.parent / 'config')
 
     self.config_dir = config_dir
     self._app_config: Optional[Dict[str, Any]] = None
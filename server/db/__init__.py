@@ -1,7 +1,13 @@
 """Database layer - connection management and SQLAlchemy models."""
 
 from .database import (
+  UnitOfWork,
+  after_writes,
+  close_database,
   create_tables,
+  defer_write,
+  deferred_write_stats,
+  flush_writes,
   get_database_url,
   get_engine,
   get_lakebase_project_id,
@@ -9,9 +15,14 @@ from .database import (
   get_session_factory,
   init_database,
   is_postgres_configured,
+  open_pool,
+  open_raw_connection,
+  pool_stats,
+  read_scope,
   run_migrations,
   session_scope,
   test_database_connection,
+  unit_of_work,
 )
 from .models import Base, ChatModel, MessageModel
 
@@ -19,7 +30,13 @@ __all__ = [
   'Base',
   'ChatModel',
   'MessageModel',
+  'UnitOfWork',
+  'after_writes',
+  'close_database',
   'create_tables',
+  'defer_write',
+  'deferred_write_stats',
+  'flush_writes',
   'get_database_url',
   'get_engine',
   'get_lakebase_project_id',
@@ -27,7 +44,12 @@ __all__ = [
   'get_session_factory',
   'init_database',
   'is_postgres_configured',
+  'open_pool',
+  'open_raw_connection',
+  'pool_stats',
+  'read_scope',
   'run_migrations',
   'session_scope',
   'test_database_connection',
+  'unit_of_work',
 ]
@@ -1,27 +1,89 @@
 """Async database connection and session management.
 
 This module handles PostgreSQL database connections using async SQLAlchemy.
-Uses asyncpg driver for non-blocking database operations.
+Uses asyncpg driver for non-blocking database operations. The connection pool
+is configured from the environment (see pool.py).
 """
 
+import logging
 import os
 import ssl
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 from sqlalchemy.ext.asyncio import (
+  AsyncConnection,
   AsyncEngine,
   AsyncSession,
   async_sessionmaker,
   create_async_engine,
 )
+from sqlalchemy.sql import Executable
 
 from .models import Base
+from .pool import PoolMonitor, connect_options, engine_options, pool_settings
+
+logger = logging.getLogger(__name__)
 
 # Global engine and session factory
 _engine: Optional[AsyncEngine] = None
 _async_session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+# Same pool, connections in autocommit mode for read_scope()
+_read_engine: Optional[AsyncEngine] = None
+_pool_monitor: Optional[PoolMonitor] = None
+
+
+class UnitOfWork:
+  """Writes deferred during one request, run in a single transaction at its end."""
+
+  def __init__(self):
+    """Initialize with no pending statements."""
+    self.statements: List[Executable] = []
+    # Run after the statements are committed (see after_writes)
+    self.callbacks: List[Callable[[], Awaitable[None]]] = []
+
+  def take(self) -> List[Executable]:
+    """Remove and return the pending statements."""
+    statements, self.statements = self.statements, []
+    return statements
+
+  async def commit(self) -> bool:
+    """Run the pending statements in one transaction (one connection checkout).
+
+    A failed transaction is logged and counted (see deferred_write_stats)
+    rather than raised: the unit is usually committed at the end of a
+    request, where no caller could handle the error. The callbacks run
+    afterwards either way.
+
+    Returns:
+        False if the pending statements could not be committed
+    """
+    global _deferred_commits, _deferred_commit_failures
+    statements = self.take()
+    callbacks, self.callbacks = self.callbacks, []
+    try:
+      if statements:
+        async with session_scope() as session:
+          for statement in statements:
+            await session.execute(statement)
+        _deferred_commits += 1
+        logger.debug(f'Committed {len(statements)} deferred statements')
+      return True
+    except Exception as e:
+      _deferred_commit_failures += 1
+      logger.error(f'Failed to commit {len(statements)} deferred statements: {e}')
+      return False
+    finally:
+      for callback in callbacks:
+        await callback()
+
+
+_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('unit_of_work', default=None)
+# Deferred write transactions committed and failed since startup
+_deferred_commits = 0
+_deferred_commit_failures = 0
 
 
 def get_database_url() -> Optional[str]:
@@ -96,7 +158,7 @@ def init_database(database_url: Optional[str] = None) -> AsyncEngine:
   Raises:
       ValueError: If no database URL is available
   """
-  global _engine, _async_session_maker
+  global _engine, _async_session_maker, _read_engine, _pool_monitor
 
   url = database_url or get_database_url()
   if not url:
@@ -104,15 +166,25 @@ def init_database(database_url: Optional[str] = None) -> AsyncEngine:
 
   # Prepare URL for asyncpg (handles sslmode conversion)
   url, connect_args = _prepare_async_url(url)
+  settings = pool_settings()
 
   _engine = create_async_engine(
     url,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=3600,  # Recycle connections after 1 hour
+    **engine_options(settings),
     echo=False,  # Set to True for SQL logging
-    connect_args=connect_args,
+    connect_args={**connect_args, **connect_options(settings)},
+  )
+
+  if settings['pooler'] == 'transaction':
+    # Autocommit statements are prepared and executed in separate round trips,
+    # which a transaction pooler may send to different server connections
+    _read_engine = _engine
+  else:
+    _read_engine = _engine.execution_options(isolation_level='AUTOCOMMIT')
+  _pool_monitor = PoolMonitor(_engine, _read_engine, settings)
+  logger.info(
+    f'PostgreSQL pool: size={settings["size"]}, max_overflow={settings["max_overflow"]}, '
+    f'liveness check every {settings["check_interval"]}s, pooler={settings["pooler"] or "none"}'
   )
 
   _async_session_maker = async_sessionmaker(
@@ -125,6 +197,35 @@ def init_database(database_url: Optional[str] = None) -> AsyncEngine:
   return _engine
 
 
+async def open_pool():
+  """Open the pool's connections and start the background liveness checks.
+
+  Called once at startup, after init_database().
+  """
+  if _pool_monitor is None:
+    init_database()
+  opened = await _pool_monitor.warm_up()
+  logger.info(f'PostgreSQL pool warmed up with {opened} connections')
+  _pool_monitor.start()
+
+
+async def close_database():
+  """Stop the liveness checks and close all pooled connections (at shutdown)."""
+  global _engine, _async_session_maker, _read_engine, _pool_monitor
+  if _pool_monitor is not None:
+    await _pool_monitor.stop()
+  if _engine is not None:
+    await _engine.dispose()
+  _engine = _async_session_maker = _read_engine = _pool_monitor = None
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+  """Connection pool usage and counters, or None if the database is not initialized."""
+  if _pool_monitor is None:
+    return None
+  return _pool_monitor.stats()
+
+
 def get_engine() -> AsyncEngine:
   """Get the database engine, initializing if needed.
 
@@ -176,6 +277,11 @@ async def session_scope() -> AsyncGenerator[AsyncSession, None]:
   """
   session = await get_session()
   try:
+    # Writes deferred by the current unit of work go first, in the same transaction
+    unit = _unit_of_work.get()
+    if unit is not None:
+      for statement in unit.take():
+        await session.execute(statement)
     yield session
     await session.commit()
   except Exception:
@@ -185,6 +291,111 @@ async def session_scope() -> AsyncGenerator[AsyncSession, None]:
     await session.close()
 
 
+@asynccontextmanager
+async def unit_of_work() -> AsyncGenerator[UnitOfWork, None]:
+  """Defer writes made in this context and commit them together at its end.
+
+  Used around each API request: storage writes whose result the request
+  does not need (see defer_write) are queued instead of each opening a
+  session, and run in one transaction at flush_writes(), before any other
+  write, or when the request ends. Reads do not see writes still pending.
+  A route should flush before it reports success to the client; the commit
+  at the end is a fallback, whose failures are only logged and counted.
+
+  Yields:
+      The UnitOfWork collecting the deferred statements
+  """
+  unit = UnitOfWork()
+  token = _unit_of_work.set(unit)
+  try:
+    yield unit
+  finally:
+    _unit_of_work.reset(token)
+    await unit.commit()
+
+
+async def flush_writes() -> bool:
+  """Commit the writes deferred so far in the current unit of work, if any.
+
+  Returns:
+      False if they could not be committed (the error is logged)
+  """
+  unit = _unit_of_work.get()
+  if unit is None:
+    return True
+  return await unit.commit()
+
+
+def deferred_write_stats() -> Dict[str, int]:
+  """Deferred write transactions committed and failed since startup."""
+  return {'commits': _deferred_commits, 'failures': _deferred_commit_failures}
+
+
+async def after_writes(callback: Callable[[], Awaitable[None]]):
+  """Run callback once the writes deferred so far are committed.
+
+  Outside a unit of work writes are not deferred, so it runs right away.
+  """
+  unit = _unit_of_work.get()
+  if unit is None:
+    await callback()
+  else:
+    unit.callbacks.append(callback)
+
+
+def defer_write(statement: Executable) -> bool:
+  """Queue a write statement in the current unit of work.
+
+  Returns:
+      True if queued, False if no unit of work is active (run it now)
+  """
+  unit = _unit_of_work.get()
+  if unit is None:
+    return False
+  unit.statements.append(statement)
+  return True
+
+
+@asynccontextmanager
+async def read_scope() -> AsyncGenerator[AsyncConnection, None]:
+  """Provide a connection for read-only Core queries.
+
+  Unlike session_scope(), no ORM session is created and nothing is
+  committed: the connection is in autocommit mode, so each query is a
+  single round trip without BEGIN/COMMIT. Results are plain rows.
+
+  Yields:
+      SQLAlchemy AsyncConnection instance
+
+  Example:
+      async with read_scope() as conn:
+          rows = (await conn.execute(select(Model.id))).all()
+  """
+  if _read_engine is None:
+    init_database()
+  async with _read_engine.connect() as conn:
+    yield conn
+
+
+async def open_raw_connection():
+  """Open a dedicated asyncpg connection outside the pool (e.g. to LISTEN).
+
+  Returns:
+      asyncpg Connection, to be closed by the caller
+
+  Raises:
+      ValueError: If database is not configured
+  """
+  import asyncpg
+
+  url = get_database_url()
+  if not url:
+    raise ValueError('No database URL provided. Set LAKEBASE_PG_URL environment variable.')
+  url, connect_args = _prepare_async_url(url)
+  dsn = url.replace('postgresql+asyncpg://', 'postgresql://', 1)
+  return await asyncpg.connect(dsn, **connect_args)
+
+
 async def create_tables():
   """Create all database tables asynchronously.
 
@@ -0,0 +1,77 @@
+"""Tests for the request-scoped unit of work of deferred writes."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from . import database
+from .database import after_writes, defer_write, deferred_write_stats, flush_writes, unit_of_work
+
+
+class _Session:
+  def __init__(self, executed, fail):
+    self.executed = executed
+    self.fail = fail
+
+  async def execute(self, statement):
+    if self.fail:
+      raise ConnectionError('server closed the connection')
+    self.executed.append(str(statement))
+
+
+def _fake_sessions(monkeypatch, fail=False):
+  """Replace session_scope with one recording the executed statements."""
+  executed = []
+
+  @asynccontextmanager
+  async def session_scope():
+    yield _Session(executed, fail)
+
+  monkeypatch.setattr(database, 'session_scope', session_scope)
+  return executed
+
+
+def test_writes_are_deferred_until_flush(monkeypatch):
+  executed = _fake_sessions(monkeypatch)
+
+  async def run():
+    assert not defer_write(text('SELECT 0'))
+    async with unit_of_work():
+      assert defer_write(text('SELECT 1'))
+      assert defer_write(text('SELECT 2'))
+      assert executed == []
+      assert await flush_writes()
+      assert executed == ['SELECT 1', 'SELECT 2']
+      defer_write(text('SELECT 3'))
+    # The end of the unit commits what is left
+    assert executed == ['SELECT 1', 'SELECT 2', 'SELECT 3']
+
+  asyncio.run(run())
+
+
+def test_failed_commit_is_counted_not_raised(monkeypatch):
+  _fake_sessions(monkeypatch, fail=True)
+  called = []
+
+  async def callback():
+    called.append(True)
+
+  async def run():
+    before = deferred_write_stats()['failures']
+    async with unit_of_work():
+      defer_write(text('SELECT 1'))
+      await after_writes(callback)
+      assert not await flush_writes()
+      defer_write(text('SELECT 2'))
+    assert deferred_write_stats()['failures'] == before + 2
+
+  asyncio.run(run())
+  # Callbacks run even when the transaction failed
+  assert called == [True]
+
+
+def test_flush_outside_unit_of_work(monkeypatch):
+  executed = _fake_sessions(monkeypatch)
+  assert asyncio.run(flush_writes())
+  assert executed == []
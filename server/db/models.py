@@ -6,10 +6,13 @@ This module defines the database schema for persistent chat storage.
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Index, String, Text, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+# Characters of the last message kept in chats.last_message_preview
+PREVIEW_LENGTH = 120
+
 
 class Base(DeclarativeBase):
   """Base class for all SQLAlchemy models."""
@@ -26,12 +29,22 @@ class ChatModel(Base):
   user_email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
   title: Mapped[str] = mapped_column(String(255), default='New Chat')
   agent_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+  # Genie conversation used for follow-ups when the chat's agent is a Genie space
+  genie_conversation_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
   created_at: Mapped[datetime] = mapped_column(
     DateTime(timezone=True), default=func.now(), nullable=False
   )
   updated_at: Mapped[datetime] = mapped_column(
     DateTime(timezone=True), default=func.now(), onupdate=func.now(), nullable=False
   )
+  # Summary of the messages, updated with each insert so the chat list needs no join
+  message_count: Mapped[int] = mapped_column(
+    Integer, default=0, server_default='0', nullable=False
+  )
+  last_message_at: Mapped[Optional[datetime]] = mapped_column(
+    DateTime(timezone=True), nullable=True
+  )
+  last_message_preview: Mapped[Optional[str]] = mapped_column(String(PREVIEW_LENGTH), nullable=True)
 
   # Relationship to messages
   messages: Mapped[list['MessageModel']] = relationship(
@@ -42,18 +55,28 @@ class ChatModel(Base):
   )
 
   __table_args__ = (
-    Index('ix_chats_user_updated', 'user_email', 'updated_at'),
+    # Covers the chat list: pages are read from the index alone (index-only scan)
+    Index(
+      'ix_chats_user_updated',
+      'user_email',
+      'updated_at',
+      'id',
+      postgresql_include=[
+        'title',
+        'agent_id',
+        'genie_conversation_id',
+        'created_at',
+        'message_count',
+        'last_message_at',
+        'last_message_preview',
+      ],
+    ),
   )
 
   def to_dict(self) -> dict:
     """Convert to dictionary for JSON serialization (includes messages)."""
     return {
-      'id': self.id,
-      'user_email': self.user_email,
-      'title': self.title,
-      'agent_id': self.agent_id,
-      'created_at': self.created_at.isoformat() if self.created_at else None,
-      'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+      **self.to_dict_summary(),
       'messages': [msg.to_dict() for msg in self.messages] if self.messages else [],
     }
 
@@ -66,6 +89,9 @@ class ChatModel(Base):
       'agent_id': self.agent_id,
       'created_at': self.created_at.isoformat() if self.created_at else None,
       'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+      'message_count': self.message_count or 0,
+      'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+      'last_message_preview': self.last_message_preview,
     }
 
 
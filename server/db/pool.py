@@ -0,0 +1,197 @@
+"""PostgreSQL connection pool settings, liveness checks and statistics.
+
+Pool settings come from the environment:
+- PG_POOL_SIZE: connections kept open (default 5), all opened at startup
+- PG_POOL_MAX_OVERFLOW: extra connections under load, closed when returned (default 10)
+- PG_POOL_TIMEOUT: seconds to wait for a connection when all are in use (default 30)
+- PG_POOL_RECYCLE: seconds after which a connection is replaced (default 3600)
+- PG_POOL_CHECK_INTERVAL: seconds between background liveness checks of idle
+  connections (default 30); 0 pings the server on every checkout instead
+- PG_POOLER: 'transaction' when connecting through a transaction pooler such
+  as PgBouncer in transaction mode (default: direct connection or session pooler)
+
+A transaction pooler may run consecutive statements of one client connection
+on different server connections, so prepared statements cannot be cached and
+must not outlive a transaction. In that mode the statement caches of asyncpg
+and SQLAlchemy are disabled, prepared statements get unique names, and reads
+run in a transaction instead of in autocommit mode.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional, TypedDict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+POOLER_MODES = ('', 'session', 'transaction')
+
+
+class PoolSettings(TypedDict):
+  """Connection pool settings (see the module docstring for the variables)."""
+
+  size: int
+  max_overflow: int
+  timeout: float
+  recycle: int
+  check_interval: float
+  pooler: str
+
+
+def pool_settings() -> PoolSettings:
+  """Pool settings from the environment, with the defaults for unset variables."""
+  pooler = (os.environ.get('PG_POOLER') or '').strip().lower()
+  if pooler not in POOLER_MODES:
+    logger.warning(f'Unknown PG_POOLER={pooler!r}, expected session or transaction')
+    pooler = ''
+  return {
+    'size': int(os.environ.get('PG_POOL_SIZE') or 5),
+    'max_overflow': int(os.environ.get('PG_POOL_MAX_OVERFLOW') or 10),
+    'timeout': float(os.environ.get('PG_POOL_TIMEOUT') or 30),
+    'recycle': int(os.environ.get('PG_POOL_RECYCLE') or 3600),
+    'check_interval': float(os.environ.get('PG_POOL_CHECK_INTERVAL') or 30),
+    'pooler': pooler,
+  }
+
+
+def engine_options(settings: PoolSettings) -> Dict[str, Any]:
+  """Keyword arguments of create_async_engine() for the pool settings."""
+  return {
+    'pool_size': settings['size'],
+    'max_overflow': settings['max_overflow'],
+    'pool_timeout': settings['timeout'],
+    'pool_recycle': settings['recycle'],
+    # Without background checks, verify each connection before use (one round trip)
+    'pool_pre_ping': settings['check_interval'] <= 0,
+  }
+
+
+def connect_options(settings: PoolSettings) -> Dict[str, Any]:
+  """Connect arguments of asyncpg for the pool settings."""
+  if settings['pooler'] != 'transaction':
+    return {}
+  return {
+    'statement_cache_size': 0,
+    'prepared_statement_cache_size': 0,
+    'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+  }
+
+
+class PoolMonitor:
+  """Counts pool events, warms the pool up and checks idle connections in the background."""
+
+  def __init__(self, engine: AsyncEngine, ping_engine: AsyncEngine, settings: PoolSettings):
+    """Attach to an engine's pool.
+
+    Args:
+        engine: Engine whose pool is monitored
+        ping_engine: View of the same engine used for the pings (autocommit if possible)
+        settings: The pool settings the engine was created with
+    """
+    self.engine = engine
+    self.ping_engine = ping_engine
+    self.settings = settings
+    self.connects = 0
+    self.checkouts = 0
+    self.invalidations = 0
+    self.checks = 0
+    self.check_failures = 0
+    self.last_check: Optional[float] = None
+    self._task: Optional[asyncio.Task] = None
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'connect', self._on_connect)
+    event.listen(sync_engine, 'checkout', self._on_checkout)
+    event.listen(sync_engine, 'invalidate', self._on_invalidate)
+
+  def _on_connect(self, dbapi_connection, connection_record):
+    self.connects += 1
+
+  def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+    self.checkouts += 1
+
+  def _on_invalidate(self, dbapi_connection, connection_record, exception):
+    self.invalidations += 1
+
+  async def _ping(self):
+    async with self.ping_engine.connect() as conn:
+      await conn.exec_driver_sql('SELECT 1')
+
+  async def warm_up(self) -> int:
+    """Open pool_size connections at once, so that first requests do not connect.
+
+    Returns:
+        Number of connections that could be opened
+    """
+    results = await asyncio.gather(
+      *(self._ping() for _ in range(self.settings['size'])), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+      logger.warning(f'Pool warm-up: {len(errors)} connections failed: {errors[0]}')
+    return len(results) - len(errors)
+
+  async def check_idle(self):
+    """Ping each idle connection once.
+
+    The pool hands out idle connections in FIFO order, so consecutive
+    checkouts visit each of them. A dead connection makes SQLAlchemy
+    invalidate the pool, so the remaining ones are reconnected on next use
+    instead of failing a request.
+    """
+    self.checks += 1
+    self.last_check = time.time()
+    for _ in range(self.engine.sync_engine.pool.checkedin()):
+      try:
+        await self._ping()
+      except Exception as e:
+        self.check_failures += 1
+        logger.warning(f'Pool liveness check failed: {e}')
+        return
+
+  async def _run_checks(self):
+    interval = self.settings['check_interval']
+    while True:
+      await asyncio.sleep(interval)
+      try:
+        await self.check_idle()
+      except Exception as e:
+        logger.error(f'Pool liveness check error: {e}')
+
+  def start(self):
+    """Start the background liveness checks (unless PG_POOL_CHECK_INTERVAL is 0)."""
+    if self._task is None and self.settings['check_interval'] > 0:
+      self._task = asyncio.create_task(self._run_checks())
+
+  async def stop(self):
+    """Stop the background liveness checks."""
+    if self._task is not None:
+      self._task.cancel()
+      try:
+        await self._task
+      except asyncio.CancelledError:
+        pass
+      self._task = None
+
+  def stats(self) -> Dict[str, Any]:
+    """Current pool usage and event counters."""
+    pool = self.engine.sync_engine.pool
+    return {
+      'settings': dict(self.settings),
+      'size': pool.size(),
+      'checked_in': pool.checkedin(),
+      'checked_out': pool.checkedout(),
+      # Connections beyond pool_size (SQLAlchemy counts up from -pool_size)
+      'overflow': max(pool.overflow(), 0),
+      'connects': self.connects,
+      'checkouts': self.checkouts,
+      'invalidations': self.invalidations,
+      'liveness_checks': self.checks,
+      'liveness_failures': self.check_failures,
+      'last_liveness_check': int(self.last_check * 1000) if self.last_check else None,
+    }
@@ -3,7 +3,6 @@
 import asyncio
 import json
 import logging
-import uuid
 from datetime import datetime
 from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 
@@ -14,7 +13,10 @@ from pydantic import BaseModel
 
 from ..chat_storage import MessageModel, storage
 from ..config_loader import config_loader
+from ..db import flush_writes
 from ..services.agents.handlers import DatabricksEndpointHandler, DatabricksGenieHandler
+from ..services.agents.table_parser import StreamingTableDetector
+from ..services.chat import new_id
 from ..services.user import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -150,8 +152,8 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
     chat_id = chat.id
     logger.info(f'✅ Created new chat: {chat_id} for user: {user_email}')
   else:
-    # Verify chat exists
-    chat = await user_storage.get(chat_id)
+    # Verify chat exists (without loading its messages)
+    chat = await user_storage.get_summary(chat_id)
     if not chat:
       logger.error(f'Chat not found: {chat_id}')
       return create_error_stream(error=f'Chat not found: {chat_id}')
@@ -159,7 +161,7 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
   try:
     # Select the appropriate handler based on agent type
     if is_genie_agent:
-      handler = DatabricksGenieHandler(agent)
+      handler = DatabricksGenieHandler(agent, chat_storage=user_storage)
     else:
       handler = DatabricksEndpointHandler(agent)
 
@@ -175,6 +177,8 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
       trace_id: Optional[str] = None
       databricks_output: Optional[Dict[str, Any]] = None
       error_message: Optional[str] = None
+      # Emits table.started / table.rows / table.completed as markdown tables stream in
+      table_detector = StreamingTableDetector()
 
       try:
         # For Genie agents, pass chat_id so the handler can track conversations
@@ -212,6 +216,8 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
               delta_text = event.get('delta', '')
               if delta_text:
                 final_text += delta_text
+                for table_event in table_detector.feed(delta_text):
+                  yield f'data: {json.dumps(table_event)}\n\n'
 
             # Check for databricks_output at event level (for response.done events)
             event_db_output = event.get('databricks_output', {})
@@ -281,22 +287,29 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
         error_message = str(e)
         yield f'data: {json.dumps({"type": "error", "error": str(e)})}\n\n'
 
+      for table_event in table_detector.close():
+        yield f'data: {json.dumps(table_event)}\n\n'
+
       # Log final extraction results for debugging
       logger.info(f'🔍 Stream completed - trace_id: {trace_id}, has_databricks_output: {databricks_output is not None}, error: {error_message}')
 
       # After stream completes, save messages to storage
       trace_summary = None
+      saved = False
       try:
+        # The turn's messages are stored together in one storage call
+        messages = []
+
         # Save user message (the last one in the input)
         if options.messages:
           last_user_msg = options.messages[-1]
           user_message = MessageModel(
-            id=f'msg_{uuid.uuid4().hex[:12]}',
+            id=new_id('msg'),
             role=last_user_msg.get('role', 'user'),
             content=last_user_msg.get('content', ''),
             timestamp=datetime.now(),
           )
-          await user_storage.add_message(chat_id, user_message)
+          messages.append(user_message)
 
         # Build trace summary matching frontend TraceSummary type
         if function_calls or trace_id:
@@ -328,7 +341,7 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
         if final_text or function_calls or error_message:
           content = final_text if final_text else f'Sorry, I encountered an error: {error_message}'
           assistant_message = MessageModel(
-            id=f'msg_{uuid.uuid4().hex[:12]}',
+            id=new_id('msg'),
             role='assistant',
             content=content,
             timestamp=datetime.now(),
@@ -336,7 +349,14 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
             trace_summary=trace_summary,
             is_error=error_message is not None,
           )
-          await user_storage.add_message(chat_id, assistant_message)
+          messages.append(assistant_message)
+
+        if messages and not await user_storage.add_messages(chat_id, messages):
+          raise RuntimeError(f'chat {chat_id} no longer exists')
+        # Commit the turn's deferred writes before the client is told the turn is done
+        if not await flush_writes():
+          raise RuntimeError('the chat turn could not be committed')
+        saved = True
 
         logger.info(
           f'💾 Saved messages to chat {chat_id}: '
@@ -355,6 +375,8 @@ async def invoke_endpoint(request: Request, options: InvokeEndpointRequest):
         'trace_id': trace_id,
         'trace_summary': trace_summary,
         'is_error': error_message is not None,
+        # False if the turn could not be stored in the chat history
+        'saved': saved,
       }
       yield f'data: {json.dumps(completion_event)}\n\n'
       yield 'data: [DONE]\n\n'
@@ -0,0 +1,89 @@
+"""Tests for the agent invocation endpoint."""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import app
+from ..config_loader import config_loader
+from ..services.chat import get_storage, reset_storage
+from . import agent
+
+USER = 'user@example.com'
+
+
+class _FakeHandler:
+  """Endpoint handler answering with one text delta, running `during` while it streams."""
+
+  during = None
+
+  def __init__(self, agent_config):
+    pass
+
+  async def predict_stream(self, messages, endpoint_name):
+    yield f'data: {json.dumps({"type": "response.output_text.delta", "delta": "Hi"})}\n\n'
+    if self.during is not None:
+      await self.during()
+    yield 'data: [DONE]\n\n'
+
+
+@pytest.fixture
+def client(monkeypatch):
+  monkeypatch.setenv('CHAT_STORAGE', 'memory')
+  monkeypatch.delenv('LAKEBASE_PG_URL', raising=False)
+  monkeypatch.setattr(
+    config_loader, 'get_agent_by_id', lambda agent_id: {'id': agent_id, 'endpoint_name': 'ep'}
+  )
+  monkeypatch.setattr(agent, 'DatabricksEndpointHandler', _FakeHandler)
+  monkeypatch.setattr(_FakeHandler, 'during', None)
+  reset_storage()
+  with TestClient(app) as client:
+    yield client
+  reset_storage()
+
+
+def _invoke(client: TestClient, chat_id: str) -> list:
+  response = client.post(
+    '/api/invoke_endpoint',
+    headers={'x-forwarded-user': USER},
+    json={
+      'agent_id': 'agent',
+      'chat_id': chat_id,
+      'messages': [{'role': 'user', 'content': 'Hello'}],
+    },
+  )
+  assert response.status_code == 200
+  return [
+    json.loads(line[len('data: ') :])
+    for line in response.text.splitlines()
+    if line.startswith('data: {')
+  ]
+
+
+def _create_chat(client: TestClient) -> str:
+  user_storage = get_storage().get_storage_for_user(USER)
+  return client.portal.call(user_storage.create).id
+
+
+def test_turn_is_saved(client):
+  chat_id = _create_chat(client)
+  completed = _invoke(client, chat_id)[-1]
+  assert completed['type'] == 'stream.completed'
+  assert completed['saved'] is True
+
+  chat = client.get(f'/api/chats/{chat_id}', headers={'x-forwarded-user': USER}).json()
+  assert [m['content'] for m in chat['messages']] == ['Hello', 'Hi']
+
+
+def test_turn_of_chat_deleted_while_streaming_is_not_saved(client, monkeypatch):
+  chat_id = _create_chat(client)
+  user_storage = get_storage().get_storage_for_user(USER)
+
+  async def delete_chat():
+    await user_storage.delete(chat_id)
+
+  monkeypatch.setattr(_FakeHandler, 'during', staticmethod(delete_chat))
+  completed = _invoke(client, chat_id)[-1]
+  assert completed['type'] == 'stream.completed'
+  assert completed['saved'] is False
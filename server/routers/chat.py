@@ -5,50 +5,145 @@ Chat creation and message storage is handled by /invoke_endpoint.
 """
 
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import Response
 
 from ..chat_storage import storage
+from ..services.chat import decode_cursor, encode_cursor
+from ..services.genie import conversation_registry
 from ..services.user import get_current_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+CHATS_PAGE_SIZE = 100
+# Messages returned when a chat is opened (the latest ones)
+MESSAGES_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-@router.get('/chats')
-async def get_all_chats(request: Request):
-  """Get all chats for the current user sorted by updated_at (newest first).
 
-  Returns list of chat summary objects (without messages for performance).
-  Use GET /chats/{chat_id} to fetch full chat with messages.
+def _message_page(messages: list, limit: int, before, after) -> dict:
+  """Trim a page fetched with limit + 1 and build the cursors to the neighbouring pages.
+
+  older_cursor is passed as before= and newer_cursor as after=; each is None
+  when there is nothing further in that direction.
+  """
+  has_more = len(messages) > limit
+  if after is not None:
+    messages = messages[:limit]
+  elif has_more:
+    messages = messages[1:]
+  cursors = [encode_cursor(msg.timestamp, msg.id) for msg in (messages[:1] + messages[-1:])]
+  older = newer = None
+  if after is not None:
+    older = cursors[0] if cursors else encode_cursor(*after)
+    newer = cursors[-1] if has_more else None
+  else:
+    older = cursors[0] if has_more else None
+    if before is not None:
+      newer = cursors[-1] if cursors else encode_cursor(*before)
+  return {
+    'messages': [msg.to_dict() for msg in messages],
+    'older_cursor': older,
+    'newer_cursor': newer,
+  }
+
+
+@router.get('/chats')
+async def get_all_chats(
+  request: Request,
+  limit: int = Query(CHATS_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  before: Optional[str] = None,
+  after: Optional[str] = None,
+):
+  """Get a page of chats for the current user sorted by updated_at (newest first).
+
+  Returns list of chat summary objects (without messages for performance),
+  each with a cursor: pass the last one as before= for the next page, or
+  the first one as after= for newer chats.
+  Use GET /chats/{chat_id} to fetch the chat with its latest messages.
   """
   user_email = await get_current_user(request)
   user_storage = storage.get_storage_for_user(user_email)
 
-  logger.info(f'Fetching all chats for user: {user_email}')
-  chats = await user_storage.get_all()
+  try:
+    before_position = decode_cursor(before) if before else None
+    after_position = decode_cursor(after) if after else None
+  except ValueError as e:
+    return Response(content=str(e), status_code=400)
+
+  logger.info(f'Fetching chats for user: {user_email}')
+  chats = await user_storage.get_page_summaries(limit, before=before_position, after=after_position)
   logger.info(f'Retrieved {len(chats)} chats for user: {user_email}')
 
-  # Return summary (without messages) for list view performance
-  return [chat.to_dict_summary() for chat in chats]
+  # Summaries (without messages) for list view performance
+  return chats
 
 
 @router.get('/chats/{chat_id}')
-async def get_chat_by_id(request: Request, chat_id: str):
-  """Get specific chat by ID for the current user."""
+async def get_chat_by_id(
+  request: Request,
+  chat_id: str,
+  limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+  """Get specific chat by ID for the current user, with its latest messages.
+
+  has_more_messages tells whether older messages exist; fetch them from
+  GET /chats/{chat_id}/messages with before=messages_cursor.
+  """
   user_email = await get_current_user(request)
   user_storage = storage.get_storage_for_user(user_email)
 
   logger.info(f'Fetching chat {chat_id} for user: {user_email}')
 
-  chat = await user_storage.get(chat_id)
-  if not chat:
+  document = await user_storage.get_document(chat_id, limit)
+  if document is None:
+    logger.warning(f'Chat not found: {chat_id} for user: {user_email}')
+    return Response(content=f'Chat {chat_id} not found', status_code=404)
+
+  # JSON built by the database is passed through without decoding it
+  if isinstance(document, str):
+    logger.info(f'Retrieved chat {chat_id} as JSON ({len(document)} chars) for user: {user_email}')
+    return Response(content=document, media_type='application/json')
+
+  logger.info(
+    f'Retrieved chat {chat_id} with {len(document["messages"])} messages for user: {user_email}'
+  )
+  return document
+
+
+@router.get('/chats/{chat_id}/messages')
+async def get_chat_messages(
+  request: Request,
+  chat_id: str,
+  limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+  before: Optional[str] = None,
+  after: Optional[str] = None,
+):
+  """Get a page of a chat's messages in chronological order.
+
+  Without a cursor, returns the latest messages. before= pages towards older
+  messages, after= towards newer ones.
+  """
+  user_email = await get_current_user(request)
+  user_storage = storage.get_storage_for_user(user_email)
+
+  try:
+    before_position = decode_cursor(before) if before else None
+    after_position = decode_cursor(after) if after else None
+  except ValueError as e:
+    return Response(content=str(e), status_code=400)
+
+  messages = await user_storage.get_messages(
+    chat_id, limit + 1, before=before_position, after=after_position
+  )
+  if messages is None:
     logger.warning(f'Chat not found: {chat_id} for user: {user_email}')
     return Response(content=f'Chat {chat_id} not found', status_code=404)
 
-  logger.info(f'Retrieved chat {chat_id} with {len(chat.messages)} messages for user: {user_email}')
-  return chat.to_dict()
+  return _message_page(messages, limit, before_position, after_position)
 
 
 @router.delete('/chats/{chat_id}')
@@ -64,6 +159,7 @@ async def delete_chat_by_id(request: Request, chat_id: str):
     logger.warning(f'Chat not found for deletion: {chat_id} for user: {user_email}')
     return Response(content=f'Chat {chat_id} not found', status_code=404)
 
+  conversation_registry.discard(chat_id)
   logger.info(f'Chat deleted: {chat_id} for user: {user_email}')
   return {'success': True, 'deleted_chat_id': chat_id}
 
@@ -77,6 +173,7 @@ async def clear_all_chats(request: Request):
   logger.info(f'Clearing all chats for user: {user_email}')
 
   count = await user_storage.clear_all()
+  conversation_registry.discard_user(user_email)
 
   logger.info(f'Cleared {count} chats for user: {user_email}')
   return {'success': True, 'deleted_count': count}
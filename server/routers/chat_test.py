@@ -0,0 +1,70 @@
+"""Tests for the chat endpoints: keyset pages and their cursors."""
+
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import app
+from ..services.chat import get_storage, reset_storage
+
+USER = {'x-forwarded-user': 'user@example.com'}
+TIE = datetime(2026, 1, 2, 3, 4, 5)
+
+
+@pytest.fixture
+def client(monkeypatch):
+  monkeypatch.setenv('CHAT_STORAGE', 'memory')
+  monkeypatch.delenv('LAKEBASE_PG_URL', raising=False)
+  reset_storage()
+  with TestClient(app) as client:
+    yield client
+  reset_storage()
+
+
+def _create_chats(client: TestClient, count: int) -> list:
+  """IDs of new chats, all with the same updated_at."""
+  user_storage = get_storage().get_storage_for_user(USER['x-forwarded-user'])
+  ids = []
+  for _ in range(count):
+    chat = client.portal.call(user_storage.create)
+    chat.updated_at = TIE
+    ids.append(chat.id)
+  return ids
+
+
+@pytest.mark.parametrize(
+  'query',
+  [
+    'before=!!!',
+    'after=' + base64.urlsafe_b64encode(b'no separator').decode(),
+    'before=' + base64.urlsafe_b64encode(b'yesterday|chat_1').decode(),
+  ],
+)
+def test_bad_cursor_is_rejected(client, query):
+  response = client.get(f'/api/chats?{query}', headers=USER)
+  assert response.status_code == 400
+  assert 'Invalid cursor' in response.text
+
+  chat_id = _create_chats(client, 1)[0]
+  response = client.get(f'/api/chats/{chat_id}/messages?{query}', headers=USER)
+  assert response.status_code == 400
+
+
+def test_chat_pages_with_equal_updated_at(client):
+  expected = sorted(_create_chats(client, 5), reverse=True)
+
+  seen, cursor = [], None
+  while True:
+    query = f'&before={cursor}' if cursor else ''
+    page = client.get(f'/api/chats?limit=2{query}', headers=USER).json()
+    if not page:
+      break
+    seen.extend(chat['id'] for chat in page)
+    cursor = page[-1]['cursor']
+  assert seen == expected
+
+  # And back up from the oldest chat
+  newer = client.get(f'/api/chats?limit=2&after={cursor}', headers=USER).json()
+  assert [chat['id'] for chat in newer] == expected[-3:-1]
@@ -5,13 +5,13 @@ import logging
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
-from databricks.sdk import WorkspaceClient
 from databricks.sdk.errors import ResourceDoesNotExist
 from fastapi import APIRouter, Request
 
 from ..config_loader import config_loader
 from ..services.agents.agent_bricks_service import get_agent_bricks_service
 from ..services.user import get_current_user, get_workspace_url
+from ..services.workspace import workspace
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -87,8 +87,7 @@ def validate_agent_config(agent_config, index: int) -> Optional[dict]:
 def _validate_serving_endpoint_sync(endpoint_name: str) -> Tuple[bool, Optional[str], Optional[str]]:
   """Synchronous helper to validate serving endpoint."""
   try:
-    client = WorkspaceClient()
-    endpoint = client.serving_endpoints.get(endpoint_name)
+    endpoint = workspace.client.serving_endpoints.get(endpoint_name)
     state = endpoint.state.ready if endpoint.state else 'UNKNOWN'
     return True, state, None
   except ResourceDoesNotExist:
@@ -0,0 +1,144 @@
+"""Genie result endpoints.
+
+Serves the full result of a Genie query whose answer only showed a preview.
+Results are scoped to the user who asked the question. Chart data for a whole
+result can be prepared again with another number of points. Also exposes the
+queue and rate limit statistics of the Genie scheduler.
+"""
+
+import asyncio
+import io
+import logging
+import math
+from typing import Literal, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
+
+from ..services.charts import CHART_MAX_POINTS, frame_from_arrow, prepare_chart
+from ..services.genie import genie_scheduler, result_store
+from ..services.user import get_current_user
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# JSON pages are for UIs; CSV and Arrow default to the whole result
+DEFAULT_PAGE_ROWS = 1000
+MAX_PAGE_ROWS = 10000
+# Upper bound on the points a client may ask for when charting a result
+MAX_CHART_POINTS = 5000
+
+
+def _json_values(column: pa.ChunkedArray) -> list:
+  """Python values of a column for JSON, with NaN and infinities as None (like typed_preview)."""
+  values = column.to_pylist()
+  if pa.types.is_floating(column.type):
+    return [v if v is None or math.isfinite(v) else None for v in values]
+  return values
+
+
+@router.get('/genie/scheduler')
+async def get_genie_scheduler_stats():
+  """Get queue length, rate limit, backoff and wait time statistics per Genie space."""
+  return {'spaces': genie_scheduler.stats()}
+
+
+@router.get('/genie/results/{result_id}')
+async def get_genie_result(
+  request: Request,
+  result_id: str,
+  format: Literal['json', 'csv', 'arrow'] = 'json',
+  offset: int = Query(0, ge=0),
+  limit: Optional[int] = Query(None, ge=1),
+):
+  """Get a Genie query result as paginated JSON, CSV or Arrow IPC stream.
+
+  JSON returns `limit` rows (default 1000, max 10000) starting at `offset`
+  with `next_offset` set while more rows remain. CSV and Arrow return all rows
+  unless `offset`/`limit` are given.
+  """
+  user_email = await get_current_user(request)
+
+  result = result_store.get(result_id, owner=user_email)
+  if not result:
+    logger.warning(f'Genie result not found: {result_id} for user: {user_email}')
+    return Response(
+      content=f'Result {result_id} not found or expired, ask the question again',
+      status_code=404,
+    )
+
+  try:
+    table = await result_store.load(result)
+  except Exception as e:
+    logger.error(f'Failed to load Genie result {result_id}: {e}')
+    return Response(content=f'Failed to load result {result_id}: {e}', status_code=502)
+
+  if format == 'json':
+    limit = min(limit or DEFAULT_PAGE_ROWS, MAX_PAGE_ROWS)
+  page = table.slice(offset, limit) if limit else table.slice(offset)
+  logger.info(f'Serving Genie result {result_id} as {format}: {page.num_rows} rows from {offset}')
+
+  if format == 'csv':
+    buffer = io.BytesIO()
+    pa_csv.write_csv(page, buffer)
+    return Response(
+      content=buffer.getvalue(),
+      media_type='text/csv',
+      headers={'Content-Disposition': f'attachment; filename="{result_id}.csv"'},
+    )
+
+  if format == 'arrow':
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, page.schema) as writer:
+      writer.write_table(page)
+    return Response(
+      content=sink.getvalue().to_pybytes(),
+      media_type='application/vnd.apache.arrow.stream',
+      headers={'Content-Disposition': f'attachment; filename="{result_id}.arrow"'},
+    )
+
+  columns = [_json_values(col) for col in page.columns]
+  next_offset = offset + page.num_rows
+  return {
+    **result.handle(),
+    'row_count': table.num_rows,
+    'truncated': result.data.truncated,
+    'offset': offset,
+    'limit': limit,
+    'rows': [list(row) for row in zip(*columns)],
+    'next_offset': next_offset if next_offset < table.num_rows else None,
+  }
+
+
+@router.get('/genie/results/{result_id}/chart')
+async def get_genie_result_chart(
+  request: Request,
+  result_id: str,
+  max_points: int = Query(CHART_MAX_POINTS, ge=3, le=MAX_CHART_POINTS),
+):
+  """Get chart data prepared from all rows of a Genie query result.
+
+  Same shape as the `chart` of the streamed `table` event: labels and
+  datasets after aggregation and LTTB downsampling to `max_points`.
+  """
+  user_email = await get_current_user(request)
+
+  result = result_store.get(result_id, owner=user_email)
+  if not result:
+    logger.warning(f'Genie result not found: {result_id} for user: {user_email}')
+    return Response(
+      content=f'Result {result_id} not found or expired, ask the question again',
+      status_code=404,
+    )
+
+  try:
+    table = await result_store.load(result)
+  except Exception as e:
+    logger.error(f'Failed to load Genie result {result_id}: {e}')
+    return Response(content=f'Failed to load result {result_id}: {e}', status_code=502)
+
+  chart = await asyncio.to_thread(lambda: prepare_chart(frame_from_arrow(table), max_points))
+  logger.info(f'Serving chart of Genie result {result_id}: {chart and chart["points"]} points')
+  return {**result.handle(), 'chart': chart}
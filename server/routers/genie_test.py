@@ -0,0 +1,69 @@
+"""Tests for the Genie result endpoints."""
+
+import math
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ..services.genie import ResultData, result_store
+from .genie import router
+
+USER = {'x-forwarded-user': 'user@example.com'}
+
+
+def _client() -> TestClient:
+  app = FastAPI()
+  app.include_router(router, prefix='/api')
+  return TestClient(app)
+
+
+def _result(rows) -> str:
+  data = ResultData.from_statement_response(
+    {
+      'manifest': {
+        'schema': {
+          'columns': [
+            {'name': 'label', 'type_name': 'STRING'},
+            {'name': 'x', 'type_name': 'DOUBLE'},
+          ]
+        },
+        'total_row_count': len(rows),
+      },
+      'result': {'data_array': rows},
+    }
+  )
+  return result_store.add(USER['x-forwarded-user'], data).result_id
+
+
+def test_json_result_with_non_finite_floats():
+  result_id = _result(
+    [['a', '1.5'], ['b', 'NaN'], ['c', 'Infinity'], ['d', '-Infinity'], ['e', None]]
+  )
+  response = _client().get(f'/api/genie/results/{result_id}', headers=USER)
+  assert response.status_code == 200
+  assert response.json()['rows'] == [['a', 1.5], ['b', None], ['c', None], ['d', None], ['e', None]]
+
+
+def test_csv_result_keeps_non_finite_floats():
+  result_id = _result([['a', 'NaN']])
+  response = _client().get(f'/api/genie/results/{result_id}?format=csv', headers=USER)
+  assert response.status_code == 200
+  value = response.text.splitlines()[1].split(',')[1]
+  assert math.isnan(float(value))
+
+
+def test_json_result_pages():
+  result_id = _result([[str(i), str(i)] for i in range(5)])
+  client = _client()
+  page = client.get(f'/api/genie/results/{result_id}?limit=2', headers=USER).json()
+  assert (page['rows'], page['next_offset']) == ([['0', 0.0], ['1', 1.0]], 2)
+  page = client.get(f'/api/genie/results/{result_id}?offset=4&limit=2', headers=USER).json()
+  assert (page['rows'], page['next_offset']) == ([['4', 4.0]], None)
+
+
+def test_result_of_another_user_is_not_found():
+  result_id = _result([['a', '1']])
+  response = _client().get(
+    f'/api/genie/results/{result_id}', headers={'x-forwarded-user': 'other@example.com'}
+  )
+  assert response.status_code == 404
@@ -5,6 +5,9 @@ import time
 
 from fastapi import APIRouter
 
+from ..db import deferred_write_stats, pool_stats
+from ..services.chat import active_backend, cache_stats
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -32,3 +35,26 @@ async def health_check(is_dev: bool = False):
       'error': str(e),
       'timestamp': int(time.time() * 1000),
     }
+
+
+@router.get('/health/database')
+async def database_health():
+  """Chat storage backend, PostgreSQL connection pool and chat cache statistics.
+
+  backend is the storage in use, which is SQLite or memory after PostgreSQL
+  (or SQLite) failed to initialize, whatever CHAT_STORAGE says.
+
+  pool and cache are None unless the PostgreSQL backend is in use. pool holds
+  the pool settings, current usage (size, checked_in, checked_out, overflow)
+  and counters since startup (connects, checkouts, invalidations, liveness
+  checks). cache holds the hit ratios per kind of read and the cache size.
+  deferred_writes counts the transactions of writes deferred to the end of a
+  request (see server.db.unit_of_work) that were committed and that failed.
+  """
+  return {
+    'backend': active_backend(),
+    'pool': pool_stats(),
+    'cache': cache_stats(),
+    'deferred_writes': deferred_write_stats(),
+    'timestamp': int(time.time() * 1000),
+  }
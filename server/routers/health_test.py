@@ -0,0 +1,29 @@
+"""Tests for the health endpoints."""
+
+import asyncio
+
+from ..db import close_database
+from ..services.chat import close_storage, init_storage, reset_storage
+from .health import database_health
+
+
+def test_database_health_reports_fallback_backend(monkeypatch, tmp_path):
+  monkeypatch.setenv('CHAT_STORAGE', 'postgres')
+  # Nothing listens on port 1, so PostgreSQL storage fails to initialize
+  monkeypatch.setenv('LAKEBASE_PG_URL', 'postgresql://nobody@127.0.0.1:1/chats')
+  monkeypatch.setenv('CHAT_SQLITE_PATH', str(tmp_path / 'chats.db'))
+
+  async def run():
+    reset_storage()
+    try:
+      await init_storage()
+      return await database_health()
+    finally:
+      await close_storage()
+      await close_database()
+      reset_storage()
+
+  health = asyncio.run(run())
+  assert health['backend'] == 'sqlite'
+  assert health['pool'] is None
+  assert health['cache'] is None
@@ -17,6 +17,8 @@ from typing import Any, Dict, List, Optional, TypedDict
 import httpx
 from databricks.sdk import WorkspaceClient
 
+from ..workspace import workspace
+
 logger = logging.getLogger(__name__)
 
 # Cache TTL in seconds (5 minutes)
@@ -127,21 +129,31 @@ class AgentBricksService:
     """Initialize service with optional WorkspaceClient.
 
     Args:
-      w: WorkspaceClient instance. If None, creates one using env vars.
+      w: WorkspaceClient instance. If None, uses the shared workspace client
+        and its cached auth headers.
     """
-    self.w = w or WorkspaceClient()
+    self._w = w
     self._ka_tiles_cache: Optional[List[Dict[str, Any]]] = None
     # Cache for MAS agent details: endpoint_name -> CacheEntry
     self._agent_cache: Dict[str, CacheEntry] = {}
     self._cache_lock = threading.Lock()
 
+  @property
+  def w(self) -> WorkspaceClient:
+    """WorkspaceClient given at construction, or the shared one."""
+    return self._w or workspace.client
+
   def _get_headers(self) -> Dict[str, str]:
     """Get authentication headers."""
-    return self.w.config.authenticate()
+    if self._w is None:
+      return workspace.auth_headers()
+    return self._w.config.authenticate()
 
   def _get_base_url(self) -> str:
     """Get base URL for API calls."""
-    return self.w.config.host
+    if self._w is None:
+      return workspace.host
+    return self._w.config.host
 
   # ---------- Cache management ----------
 
@@ -237,7 +249,9 @@ class AgentBricksService:
   ) -> Dict[str, Any]:
     """Make async GET request to Databricks API."""
     url = f'{self._get_base_url()}{path}'
-    response = await client.get(url, params=params or {}, timeout=20.0)
+    response = await client.get(
+      url, params=params or {}, headers=self._get_headers(), timeout=20.0
+    )
     if response.status_code >= 400:
       self._handle_response_error(response, 'GET', path)
     return response.json()
@@ -427,9 +441,7 @@ class AgentBricksService:
         f"Endpoint '{endpoint_name}' must contain 'mas' in the name."
       )
 
-    headers = self._get_headers()
-
-    async with httpx.AsyncClient(headers=headers) as client:
+    async with workspace.http_session() as client:
       # Get tile_id from endpoint name
       tile_id = await self._async_get_tile_id_from_endpoint(client, endpoint_name)
       if not tile_id:
@@ -512,9 +524,7 @@ class AgentBricksService:
     Raises:
       ValueError: If mas_id is not found or has no serving_endpoint_name
     """
-    headers = self._get_headers()
-
-    async with httpx.AsyncClient(headers=headers) as client:
+    async with workspace.http_session() as client:
       mas = await self._async_mas_get(client, mas_id)
       if not mas:
         raise ValueError(f"MAS with tile_id '{mas_id}' not found")
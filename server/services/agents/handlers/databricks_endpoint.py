@@ -14,6 +14,7 @@ Chat completion responses are converted to agent format for unified frontend han
 import asyncio
 import json
 import logging
+import re
 from typing import Any, AsyncGenerator, Dict, List, Optional
 
 from mlflow.deployments import get_deploy_client
@@ -31,6 +32,18 @@ _endpoint_format_cache: Dict[str, str] = {}
 # =============================================================================
 
 
+# Runs of chars in the Latin-1 extended range (0x80-0xFF), i.e. likely mojibake bytes
+_LATIN1_RUN = re.compile(r'[\u0080-\u00ff]+')
+
+
+def _fix_latin1_run(match: re.Match) -> str:
+  segment = match.group(0)
+  try:
+    return segment.encode('latin-1').decode('utf-8')
+  except (UnicodeDecodeError, UnicodeEncodeError):
+    return segment
+
+
 def fix_mojibake(text: str) -> str:
   """Fix UTF-8 content that was incorrectly decoded as Latin-1.
 
@@ -38,8 +51,10 @@ def fix_mojibake(text: str) -> str:
   Example: "â€"" (3 Latin-1 chars) should be "—" (em dash in UTF-8).
 
   Handles mixed content (mojibake + emojis) by fixing only the broken parts.
+  Stateless: a character split across two chunks cannot be repaired here, use
+  `Utf8StreamRepairer` for streams.
   """
-  if not text:
+  if not text or text.isascii():
     return text
 
   # Try the simple approach first (works if no high Unicode chars like emojis)
@@ -49,21 +64,116 @@ def fix_mojibake(text: str) -> str:
     pass
 
   # Fallback: fix mojibake patterns while preserving high Unicode chars (emojis etc)
-  # Mojibake chars are in the 0x80-0xFF range (Latin-1 extended)
-  import re
+  return _LATIN1_RUN.sub(_fix_latin1_run, text)
+
+
+def _incomplete_utf8_tail(data: bytes) -> int:
+  """Length of a truncated multi-byte UTF-8 sequence at the end of `data` (0 if none)."""
+  for i in range(1, min(3, len(data)) + 1):
+    byte = data[-i]
+    if byte & 0xC0 == 0x80:
+      # Continuation byte, keep looking for the lead byte
+      continue
+    if byte >= 0xF0:
+      needed = 4
+    elif byte >= 0xE0:
+      needed = 3
+    elif byte >= 0xC0:
+      needed = 2
+    else:
+      needed = 1
+    return i if needed > i else 0
+  return 0
+
+
+class Utf8StreamRepairer:
+  """Incremental mojibake repair for one streamed response.
+
+  Unlike `fix_mojibake`, keeps a truncated UTF-8 sequence at the end of a chunk
+  and completes it with the next one, so characters split across chunks are
+  repaired too. Whether the stream is mojibake is decided once, on the first
+  non-ASCII run, and then stays fixed: clean streams pass through untouched.
+  Pure ASCII chunks skip all work.
+
+  Usage:
+    repairer = Utf8StreamRepairer()
+    for delta in deltas:
+      text = repairer.feed(delta)
+    text = repairer.flush()
+  """
 
-  def fix_segment(match: re.Match) -> str:
-    segment = match.group(0)
-    try:
-      return segment.encode('latin-1').decode('utf-8')
-    except (UnicodeDecodeError, UnicodeEncodeError):
-      return segment
+  __slots__ = ('_mojibake', '_pending')
 
-  # Match sequences of chars in Latin-1 extended range (likely mojibake)
-  return re.sub(r'[\u0080-\u00ff]+', fix_segment, text)
+  def __init__(self):
+    """Initialize with an undetected stream and no pending bytes."""
+    # None until detected, then True (repair) or False (passthrough)
+    self._mojibake: Optional[bool] = None
+    # Latin-1 chars of an incomplete UTF-8 sequence held from the previous chunk
+    self._pending = ''
 
+  def feed(self, text: str) -> str:
+    """Repair one chunk. May return less (or more) text than given."""
+    if not self._pending and text.isascii():
+      return text
+    if self._mojibake is False:
+      return text
 
-def convert_chat_completion_chunk(chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    text = self._pending + text
+    self._pending = ''
+
+    # Whole chunk at once when it has no chars above Latin-1 (the common case)
+    try:
+      data = text.encode('latin-1')
+      tail = _incomplete_utf8_tail(data)
+      fixed = data[: len(data) - tail].decode('utf-8')
+    except (UnicodeDecodeError, UnicodeEncodeError):
+      pass
+    else:
+      if self._mojibake is None and not fixed.isascii():
+        self._mojibake = True
+      if tail:
+        self._pending = text[-tail:]
+      return fixed
+
+    undetected = self._mojibake is None
+    parts = []
+    pos = 0
+
+    for match in _LATIN1_RUN.finditer(text):
+      start, end = match.span()
+      data = match.group(0).encode('latin-1')
+      tail = _incomplete_utf8_tail(data) if end == len(text) else 0
+
+      try:
+        fixed = data[: len(data) - tail].decode('utf-8')
+      except UnicodeDecodeError:
+        if undetected:
+          # Not mojibake: stop repairing this stream
+          self._mojibake = False
+          return text
+        fixed = match.group(0)[: len(data) - tail]
+
+      if undetected and fixed:
+        self._mojibake = True
+        undetected = False
+      parts.append(text[pos:start])
+      parts.append(fixed)
+      if tail:
+        self._pending = match.group(0)[-tail:]
+      pos = end
+
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+  def flush(self) -> str:
+    """Return any held chars at end of stream (an unfinished sequence is kept as is)."""
+    pending, self._pending = self._pending, ''
+    return pending
+
+
+def convert_chat_completion_chunk(
+  chunk: Dict[str, Any], repairer: Optional[Utf8StreamRepairer] = None
+) -> Optional[Dict[str, Any]]:
   """Convert OpenAI chat completion chunk to agent format.
 
   OpenAI format:
@@ -76,6 +186,8 @@ def convert_chat_completion_chunk(chunk: Dict[str, Any]) -> Optional[Dict[str, A
   Agent format:
     {"type": "response.output_text.delta", "delta": "text"}
 
+  If a stream `repairer` is given it is used instead of `fix_mojibake`.
+
   Returns None if chunk should be skipped (no content).
   """
   # Skip non-chunk objects (e.g., final usage stats)
@@ -107,24 +219,34 @@ def convert_chat_completion_chunk(chunk: Dict[str, Any]) -> Optional[Dict[str, A
   if not content:
     return None
 
+  delta = repairer.feed(content) if repairer else fix_mojibake(content)
+  if not delta:
+    # Everything held back by the repairer until the next chunk
+    return None
+
   return {
     'type': 'response.output_text.delta',
-    'delta': fix_mojibake(content),
+    'delta': delta,
   }
 
 
-def format_chunk_for_sse(chunk: Dict[str, Any], endpoint_format: str) -> Optional[str]:
+def format_chunk_for_sse(
+  chunk: Dict[str, Any],
+  endpoint_format: str,
+  repairer: Optional[Utf8StreamRepairer] = None,
+) -> Optional[str]:
   """Format a chunk for SSE output, converting if needed.
 
   Args:
     chunk: Raw chunk from endpoint
     endpoint_format: "agent" or "chat_completion"
+    repairer: Per-stream UTF-8 repairer for chat completion deltas
 
   Returns:
     SSE-formatted string or None if chunk should be skipped
   """
   if endpoint_format == 'chat_completion':
-    converted = convert_chat_completion_chunk(chunk)
+    converted = convert_chat_completion_chunk(chunk, repairer)
     if converted is None:
       return None
     return f'data: {json.dumps(converted)}\n\n'
@@ -246,6 +368,14 @@ class DatabricksEndpointHandler(BaseDeploymentHandler):
 
     # Start streaming in thread pool
     loop.run_in_executor(None, consume_sync_generator)
+    repairer = Utf8StreamRepairer()
+
+    def flush_repairer() -> str:
+      # Chars held back by the repairer, sent before the stream ends either way
+      tail = repairer.flush()
+      if not tail:
+        return ''
+      return f'data: {json.dumps({"type": "response.output_text.delta", "delta": tail})}\n\n'
 
     # Yield formatted chunks
     try:
@@ -253,20 +383,29 @@ class DatabricksEndpointHandler(BaseDeploymentHandler):
         msg_type, data, fmt = await queue.get()
 
         if msg_type == 'chunk':
-          formatted = format_chunk_for_sse(data, fmt)
+          formatted = format_chunk_for_sse(data, fmt, repairer)
           if formatted:
             yield formatted
 
         elif msg_type == 'error':
+          tail = flush_repairer()
+          if tail:
+            yield tail
           yield f'data: {json.dumps({"type": "error", "error": data})}\n\n'
           yield 'data: [DONE]\n\n'
           break
 
         elif msg_type == 'done':
+          tail = flush_repairer()
+          if tail:
+            yield tail
           yield 'data: [DONE]\n\n'
           break
 
     except Exception as e:
       logger.error(f'Error in async stream: {e}')
+      tail = flush_repairer()
+      if tail:
+        yield tail
       yield f'data: {json.dumps({"type": "error", "error": str(e)})}\n\n'
       yield 'data: [DONE]\n\n'
@@ -0,0 +1,114 @@
+"""Tests for the incremental mojibake repair of streamed endpoint responses."""
+
+import asyncio
+import json
+
+import pytest
+
+from . import databricks_endpoint
+from .databricks_endpoint import Utf8StreamRepairer, _incomplete_utf8_tail, fix_mojibake
+
+# 2-, 3- and 4-byte UTF-8 sequences
+CHARS = ['é', '—', '😀']
+
+
+def _mojibake(text: str) -> str:
+  """UTF-8 text as an endpoint that decoded its bytes as Latin-1 returns it."""
+  return text.encode('utf-8').decode('latin-1')
+
+
+def _stream(repairer: Utf8StreamRepairer, chunks) -> str:
+  return ''.join(repairer.feed(chunk) for chunk in chunks) + repairer.flush()
+
+
+@pytest.mark.parametrize('char', CHARS)
+def test_split_sequence_at_every_byte_boundary(char):
+  broken = _mojibake(f'a{char}b')
+  for split in range(1, len(broken)):
+    repairer = Utf8StreamRepairer()
+    assert _stream(repairer, [broken[:split], broken[split:]]) == f'a{char}b'
+
+
+@pytest.mark.parametrize('char', CHARS)
+def test_sequence_fed_one_byte_at_a_time(char):
+  repairer = Utf8StreamRepairer()
+  out = [repairer.feed(c) for c in _mojibake(f'{char}{char}')]
+  # Nothing is emitted until a sequence is complete
+  assert all(part in ('', char) for part in out)
+  assert ''.join(out) + repairer.flush() == f'{char}{char}'
+
+
+@pytest.mark.parametrize('char', CHARS)
+def test_incomplete_tail_length(char):
+  data = char.encode('utf-8')
+  for cut in range(1, len(data)):
+    assert _incomplete_utf8_tail(b'x' + data[:cut]) == cut
+  assert _incomplete_utf8_tail(b'x' + data) == 0
+  assert _incomplete_utf8_tail(b'') == 0
+
+
+def test_ascii_passes_through():
+  repairer = Utf8StreamRepairer()
+  chunk = 'plain ascii'
+  assert repairer.feed(chunk) is chunk
+  # An ASCII chunk does not decide whether the stream is mojibake
+  assert repairer._mojibake is None
+  assert repairer.flush() == ''
+
+
+def test_mojibake_detected_once_per_stream():
+  repairer = Utf8StreamRepairer()
+  assert repairer.feed(_mojibake('café ')) == 'café '
+  assert repairer._mojibake is True
+  # Later chunks are repaired too, even next to chars above Latin-1
+  assert repairer.feed(_mojibake('naïve') + ' 😀') == 'naïve 😀'
+
+
+def test_clean_stream_is_left_alone():
+  repairer = Utf8StreamRepairer()
+  # 'é' alone is not valid UTF-8 once encoded as Latin-1, so this is not mojibake
+  assert repairer.feed('café 😀') == 'café 😀'
+  assert repairer._mojibake is False
+  # Once decided, even chars that look like mojibake pass through
+  assert repairer.feed(_mojibake('—')) == _mojibake('—')
+
+
+def test_flush_returns_dangling_tail():
+  repairer = Utf8StreamRepairer()
+  broken = _mojibake('ok —')
+  assert repairer.feed(broken[:-1]) == 'ok '
+  assert repairer.flush() == broken[-3:-1]
+  # Flushing empties the buffer
+  assert repairer.flush() == ''
+
+
+def test_fix_mojibake_keeps_emojis():
+  assert fix_mojibake(_mojibake('—') + ' 😀') == '— 😀'
+  assert fix_mojibake('ascii') == 'ascii'
+
+
+class _FailingClient:
+  """Deploy client whose stream breaks off after one chunk."""
+
+  def __init__(self, content: str):
+    self.content = content
+
+  def predict_stream(self, endpoint, inputs):
+    yield {'object': 'chat.completion.chunk', 'choices': [{'delta': {'content': self.content}}]}
+    raise RuntimeError('connection reset')
+
+
+def test_stream_error_flushes_dangling_tail(monkeypatch):
+  broken = _mojibake('ok —')
+  monkeypatch.setattr(
+    databricks_endpoint, 'get_deploy_client', lambda target: _FailingClient(broken[:-1])
+  )
+  monkeypatch.setitem(databricks_endpoint._endpoint_format_cache, 'ep', 'chat_completion')
+  handler = databricks_endpoint.DatabricksEndpointHandler({'id': 'a', 'endpoint_name': 'ep'})
+
+  async def collect():
+    return [event async for event in handler.predict_stream([], 'ep')]
+
+  events = [json.loads(e[len('data: ') :]) for e in asyncio.run(collect())[:-1]]
+  assert [e.get('delta') for e in events[:-1]] == ['ok ', broken[-3:-1]]
+  assert events[-1] == {'type': 'error', 'error': 'connection reset'}
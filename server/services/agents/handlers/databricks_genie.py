@@ -1,33 +1,115 @@
 """Handler for Databricks Genie spaces.
 
-Uses the Databricks SDK to interact with Genie spaces via their API.
+Uses the Genie REST API to interact with Genie spaces.
 Genie spaces allow natural language queries over structured data.
 
 Flow:
 1. User sends a message
-2. Handler calls start_conversation_and_wait / create_message_and_wait
-3. SDK handles polling internally until the message is completed
-4. Returns the text response and any query results as markdown tables
+2. Handler starts a conversation (or sends a follow-up) without waiting
+3. Handler polls the message with adaptive backoff, streaming status changes
+   as `genie.progress` events and the generated SQL as a `genie.sql` event
+4. Streams a preview of the query result as a typed `table` event, then the
+   text response; the full result is registered in the result store and
+   served by GET /api/genie/results/{id}
+
+The streamed text only links the full result; the final message item carries
+the preview as a markdown table for consumers that only read text (it is also
+what chat history stores).
+
+The `table` event also carries chart data prepared on the server from all
+fetched rows (column kinds, axes, aggregation and LTTB downsampling, see
+server/services/charts.py), so clients do not chart raw rows.
+
+Results are also cached by space and normalized SQL: when the generated SQL of
+a question was answered recently, polling stops as soon as the SQL is known and
+the cached rows are returned instead of waiting for the warehouse. Genie adds
+its text attachments (the written answer) only when the message completes, so
+a cached answer has the query description as its text and omits them. The
+Genie message itself is not cancelled: it keeps running and is recorded in the
+conversation as usual.
+
+Questions are sent through the Genie scheduler, which applies the space's rate
+limit, orders waiting questions fairly across users and backs off when the
+workspace throttles; while waiting, clients get `genie.queue` events with the
+queue position.
+
+Polling runs on the event loop, so a pending Genie question does not hold a
+worker thread. Heartbeat comments keep proxies from closing idle streams.
 """
 
 import asyncio
+import contextlib
 import json
 import logging
-from datetime import timedelta
+import time
 from typing import Any, AsyncGenerator, Dict, List, Optional
 
-from databricks.sdk import WorkspaceClient
-
+from ...charts import CHART_MAX_POINTS, frame_from_arrow, prepare_chart
+from ...chat.base import BaseChatStorage
+from ...genie import (
+  TERMINAL_STATUSES,
+  GenieAPIError,
+  GenieClient,
+  ResultData,
+  conversation_registry,
+  genie_scheduler,
+  result_cache,
+  result_store,
+)
 from .base import BaseDeploymentHandler
 
 logger = logging.getLogger(__name__)
 
-# Store Genie conversation IDs mapped to our chat IDs
-_genie_conversations: Dict[str, str] = {}
-
-
-def _format_query_result_as_markdown(columns: List[str], rows: List[List[Any]]) -> str:
-  """Format SQL query results as a markdown table."""
+# Polling: start fast (most steps take well under a second), back off while
+# the status is unchanged, and go back to fast polling when it moves.
+POLL_INITIAL_SECONDS = 0.25
+POLL_MAX_SECONDS = 2.0
+POLL_BACKOFF = 1.5
+MESSAGE_TIMEOUT_SECONDS = 180
+
+# Send an SSE comment when nothing else was sent for this long
+HEARTBEAT_SECONDS = 10.0
+HEARTBEAT = ': keep-alive\n\n'
+
+# Rows of a query result shown in the answer (the full result is linked)
+PREVIEW_ROWS = 100
+
+# Default for the `genie_result_cache_ttl_seconds` agent setting (0 disables the cache)
+RESULT_CACHE_TTL_SECONDS = 300
+
+# Times a question rejected with 429 / RESOURCE_EXHAUSTED is queued again
+THROTTLE_RETRIES = 3
+
+# User-facing descriptions of Genie message statuses
+STATUS_MESSAGES = {
+  'SUBMITTED': 'Submitting question',
+  'FETCHING_METADATA': 'Reading table metadata',
+  'FILTERING_CONTEXT': 'Selecting relevant tables',
+  'ASKING_AI': 'Generating SQL',
+  'PENDING_WAREHOUSE': 'Waiting for the SQL warehouse',
+  'EXECUTING_QUERY': 'Running query',
+  'COMPLETED': 'Fetching results',
+}
+
+
+def _sse(event: Dict[str, Any]) -> str:
+  return f'data: {json.dumps(event)}\n\n'
+
+
+def _format_query_result_as_markdown(
+  columns: List[str],
+  rows: List[List[Any]],
+  total_rows: Optional[int] = None,
+  result_url: Optional[str] = None,
+) -> str:
+  """Format SQL query results as a markdown table.
+
+  Args:
+    columns: Column names
+    rows: Row values (only the first PREVIEW_ROWS are shown)
+    total_rows: Row count of the full result, if more than `rows`
+    result_url: Where the full result can be downloaded
+  """
   if not columns or not rows:
     return ''
 
@@ -35,98 +117,279 @@ def _format_query_result_as_markdown(columns: List[str], rows: List[List[Any]])
   header = '| ' + ' | '.join(str(c) for c in columns) + ' |'
   separator = '| ' + ' | '.join('---' for _ in columns) + ' |'
 
-  # Rows (limit to 100 for readability)
-  display_rows = rows[:100]
+  # Rows (limit for readability)
+  display_rows = rows[:PREVIEW_ROWS]
   row_lines = []
   for row in display_rows:
     row_lines.append('| ' + ' | '.join(str(v) if v is not None else '' for v in row) + ' |')
 
   table = '\n'.join([header, separator] + row_lines)
 
-  if len(rows) > 100:
-    table += f'\n\n*Showing 100 of {len(rows)} rows*'
+  footer = _format_result_footer(len(display_rows), total_rows, result_url)
+  if footer:
+    table += f'\n\n{footer}'
 
   return table
 
 
-def _safe_get_attr(obj: Any, attr: str, default: Any = None) -> Any:
-  """Safely get an attribute from an object."""
-  try:
-    val = getattr(obj, attr, default)
-    return val if val is not None else default
-  except Exception:
-    return default
+def _format_result_footer(
+  shown_rows: int, total_rows: Optional[int], result_url: Optional[str]
+) -> str:
+  """Row count note with a download link, empty when all rows are shown."""
+  total = max(total_rows or 0, shown_rows)
+  if total <= shown_rows:
+    return ''
+  footer = f'*Showing {shown_rows} of {total:,} rows*'
+  if result_url:
+    footer += f' - [Download all rows as CSV]({result_url}?format=csv)'
+  return footer
+
+
+def _table_event(table: Dict[str, Any]) -> Dict[str, Any]:
+  """Typed `table` SSE event for a query result preview.
+
+  Rows are arrays in column order with numbers decoded, so clients can chart
+  them without parsing markdown.
+  """
+  return {
+    'type': 'table',
+    'columns': [
+      {'name': name, 'type': type_name}
+      for name, type_name in zip(table['columns'], table['types'])
+    ],
+    'rows': table['values'],
+    'row_count': table['total_rows'],
+    'result': table.get('result'),
+    'chart': table.get('chart'),
+  }
+
+
+def _find_query_attachment(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+  """Return the first attachment of a message that carries a SQL query."""
+  for attachment in message.get('attachments') or []:
+    if (attachment.get('query') or {}).get('query'):
+      return attachment
+  return None
 
 
 class DatabricksGenieHandler(BaseDeploymentHandler):
   """Handler for Databricks Genie space interactions.
 
-  Uses the Genie API to send natural language queries and retrieve results.
-  The SDK's _and_wait methods handle polling automatically.
+  Uses the non-waiting Genie API and polls message status on the event loop.
+  The Genie conversation of each chat is kept in chat storage (through the
+  conversation registry) so follow-ups continue the same conversation.
   """
 
-  def __init__(self, agent_config: Dict[str, Any]):
-    """Initialize handler with agent configuration."""
+  def __init__(
+    self, agent_config: Dict[str, Any], chat_storage: Optional[BaseChatStorage] = None
+  ):
+    """Initialize handler with agent configuration.
+
+    Args:
+      agent_config: The agent configuration dict from agents.json
+      chat_storage: Storage of the current user, used to persist the chat's
+        Genie conversation. Without it the mapping is only cached in-process.
+    """
     super().__init__(agent_config)
     self.genie_space_id = agent_config.get('genie_space_id')
+    self.chat_storage = chat_storage
+    self.result_cache_ttl = float(
+      agent_config.get('genie_result_cache_ttl_seconds', RESULT_CACHE_TTL_SECONDS)
+    )
+    self.chart_max_points = int(agent_config.get('genie_chart_max_points', CHART_MAX_POINTS))
 
     if not self.genie_space_id:
       raise ValueError(f'Agent {agent_config.get("id")} has no genie_space_id configured')
 
-  def _start_conversation_sync(self, client: WorkspaceClient, content: str) -> Dict[str, Any]:
-    """Start a new Genie conversation. SDK handles polling."""
+    rate_per_minute = float(agent_config.get('genie_rate_limit_per_minute', 0))
+    genie_scheduler.configure(
+      self.genie_space_id,
+      rate_per_minute,
+      float(agent_config.get('genie_rate_limit_burst', rate_per_minute)),
+    )
+
+  async def _send_message(
+    self, genie: GenieClient, conversation_id: Optional[str], content: str
+  ) -> Dict[str, str]:
+    """Send the question and return its conversation_id and message_id.
+
+    Follow-ups go to the existing conversation; if that fails (e.g. the
+    conversation expired) a new conversation is started instead. Throttling
+    errors are raised so the question can be queued again.
+    """
+    if conversation_id:
+      logger.info(f'Sending follow-up in Genie conversation {conversation_id}')
+      try:
+        message = await genie.create_message(self.genie_space_id, conversation_id, content)
+        return {
+          'conversation_id': message.get('conversation_id') or conversation_id,
+          'message_id': message.get('message_id') or message.get('id', ''),
+        }
+      except GenieAPIError as followup_err:
+        if followup_err.throttled:
+          raise
+        logger.warning(f'Follow-up failed, starting new conversation: {followup_err}')
+      except Exception as followup_err:
+        logger.warning(f'Follow-up failed, starting new conversation: {followup_err}')
+
     logger.info(f'Starting Genie conversation in space {self.genie_space_id}')
+    started = await genie.start_conversation(self.genie_space_id, content)
+    message = started.get('message') or {}
+    return {
+      'conversation_id': started.get('conversation_id') or message.get('conversation_id', ''),
+      'message_id': started.get('message_id') or message.get('id', ''),
+    }
 
-    # start_conversation_and_wait handles all polling and returns the final GenieMessage
-    msg = client.genie.start_conversation_and_wait(
-      space_id=self.genie_space_id,
-      content=content,
-      timeout=timedelta(minutes=3),
-    )
+  async def _poll_message(
+    self, genie: GenieClient, conversation_id: str, message_id: str
+  ) -> AsyncGenerator[tuple, None]:
+    """Poll a message until it reaches a terminal status.
 
-    conversation_id = _safe_get_attr(msg, 'conversation_id', '')
-    message_id = _safe_get_attr(msg, 'message_id', '')
-    logger.info(f'Genie conversation completed: conv={conversation_id}, msg={message_id}')
+    Yields:
+      ('status', status) when the status changes, ('sql', attachment) once when
+      the generated SQL appears, ('heartbeat', None) while waiting, and finally
+      ('message', message) with the terminal message.
+    """
+    deadline = time.monotonic() + MESSAGE_TIMEOUT_SECONDS
+    interval = POLL_INITIAL_SECONDS
+    last_status = None
+    sql_sent = False
+    last_event = time.monotonic()
+
+    while True:
+      message = await genie.get_message(self.genie_space_id, conversation_id, message_id)
+      status = message.get('status', 'UNKNOWN')
+
+      if status != last_status:
+        logger.debug(f'Genie message {message_id} status: {status}')
+        last_status = status
+        interval = POLL_INITIAL_SECONDS
+        last_event = time.monotonic()
+        yield ('status', status)
+      else:
+        interval = min(interval * POLL_BACKOFF, POLL_MAX_SECONDS)
 
-    return self._extract_result(client, msg, conversation_id, message_id)
+      if not sql_sent:
+        attachment = _find_query_attachment(message)
+        if attachment:
+          sql_sent = True
+          last_event = time.monotonic()
+          yield ('sql', attachment)
 
-  def _send_followup_sync(self, client: WorkspaceClient, conversation_id: str, content: str) -> Dict[str, Any]:
-    """Send a follow-up message in an existing Genie conversation."""
-    logger.info(f'Sending follow-up in Genie conversation {conversation_id}')
+      if status in TERMINAL_STATUSES:
+        yield ('message', message)
+        return
 
-    # create_message_and_wait handles all polling and returns the final GenieMessage
-    msg = client.genie.create_message_and_wait(
-      space_id=self.genie_space_id,
-      conversation_id=conversation_id,
-      content=content,
-      timeout=timedelta(minutes=3),
-    )
+      if time.monotonic() > deadline:
+        raise TimeoutError(f'Genie did not answer within {MESSAGE_TIMEOUT_SECONDS} seconds')
 
-    message_id = _safe_get_attr(msg, 'message_id', '')
-    logger.info(f'Genie follow-up completed: conv={conversation_id}, msg={message_id}')
+      if time.monotonic() - last_event >= HEARTBEAT_SECONDS:
+        last_event = time.monotonic()
+        yield ('heartbeat', None)
 
-    return self._extract_result(client, msg, conversation_id, message_id)
+      await asyncio.sleep(interval)
 
-  def _extract_result(self, client: WorkspaceClient, msg: Any, conversation_id: str, message_id: str) -> Dict[str, Any]:
-    """Extract text, SQL, and table data from a Genie message response."""
-    text_parts = []
-    sql_query = None
-    table_data = None
-    query_attachment_id = None
+  async def _table_from_data(self, data: Optional[ResultData]) -> Optional[Dict[str, Any]]:
+    """Preview of a query result, registered in the result store for this user.
+
+    Chart data is prepared from all rows fetched so far, in a worker thread
+    since large results take a noticeable amount of CPU.
+    """
+    if data is None or not data.preview:
+      return None
+
+    handle = None
+    if self.chat_storage is not None:
+      handle = result_store.add(self.chat_storage.user_email, data).handle()
+
+    logger.info(f'Query result has {data.row_count} rows x {len(data.columns)} columns')
+    try:
+      chart = await asyncio.to_thread(
+        lambda: prepare_chart(frame_from_arrow(data.fetched_table()), self.chart_max_points)
+      )
+    except Exception as e:
+      logger.warning(f'Could not prepare chart data: {e}')
+      chart = None
+    return {
+      'columns': data.column_names,
+      'types': [(col.get('type_name') or 'STRING').upper() for col in data.columns],
+      'rows': data.preview,
+      'values': data.typed_preview(),
+      'total_rows': data.row_count,
+      'result': handle,
+      'chart': chart,
+    }
 
-    # Log the full message object for debugging
-    logger.debug(f'Genie message object type: {type(msg).__name__}')
-    logger.debug(f'Genie message attrs: {[a for a in dir(msg) if not a.startswith("_")]}')
+  async def _fetch_table(
+    self,
+    genie: GenieClient,
+    conversation_id: str,
+    message_id: str,
+    attachment_id: Optional[str],
+    sql_query: str,
+  ) -> Optional[Dict[str, Any]]:
+    """Fetch the first chunk of a completed message's query result.
+
+    The result is registered in the result store so the remaining chunks can
+    be fetched on demand, and handed to the result cache; only a preview of
+    the rows is returned here.
+    """
+    try:
+      # Try the newer attachment-based API first
+      if attachment_id:
+        logger.info(f'Fetching query results via attachment API: attachment={attachment_id}')
+        query_result = await genie.get_attachment_query_result(
+          self.genie_space_id, conversation_id, message_id, attachment_id
+        )
+      else:
+        # Fallback to deprecated API
+        logger.info('Fetching query results via legacy API')
+        query_result = await genie.get_message_query_result(
+          self.genie_space_id, conversation_id, message_id
+        )
+    except Exception as e:
+      logger.warning(f'Could not fetch Genie query results: {e}')
+      return None
 
-    # Get status
-    status_val = _safe_get_attr(msg, 'status', None)
-    status = status_val.value if status_val and hasattr(status_val, 'value') else str(status_val or 'UNKNOWN')
+    data = ResultData.from_statement_response(
+      query_result.get('statement_response') or {}, preview_rows=PREVIEW_ROWS
+    )
+    if data is not None:
+      result_cache.put(self.genie_space_id, sql_query, data, self.result_cache_ttl)
+    return await self._table_from_data(data)
+
+  async def _cached_result(
+    self, attachment: Dict[str, Any], data: ResultData, conversation_id: str
+  ) -> Dict[str, Any]:
+    """Build the answer for a query whose result is in the result cache.
+
+    The answer is built as soon as the SQL is known, so its text is only the
+    query description: unlike _extract_result(), it omits the message's text
+    attachments, which Genie adds when the message completes. The message is
+    left running; GenieClient has no call to cancel it.
+    """
+    query = attachment.get('query') or {}
+    return {
+      'conversation_id': conversation_id,
+      'text': str(query.get('description') or ''),
+      'sql': str(query['query']),
+      'table': await self._table_from_data(data),
+      'status': 'COMPLETED',
+    }
+
+  async def _extract_result(
+    self, genie: GenieClient, message: Dict[str, Any], conversation_id: str, message_id: str
+  ) -> Dict[str, Any]:
+    """Extract text, SQL, and table data from a terminal Genie message."""
+    status = message.get('status', 'UNKNOWN')
     logger.info(f'Genie message status: {status}')
 
-    if status == 'FAILED':
+    if status != 'COMPLETED':
       error_msg = 'The query could not be completed.'
-      msg_error = _safe_get_attr(msg, 'error', None)
-      if msg_error:
+      msg_error = message.get('error')
+      if isinstance(msg_error, dict):
+        error_msg = msg_error.get('error', str(msg_error))
+      elif msg_error:
         error_msg = str(msg_error)
       return {
         'conversation_id': conversation_id,
@@ -136,97 +399,42 @@ class DatabricksGenieHandler(BaseDeploymentHandler):
         'status': status,
       }
 
-    # Extract attachments (text, query, results)
-    attachments = _safe_get_attr(msg, 'attachments', None)
-    if attachments:
-      for attachment in attachments:
-        logger.debug(f'Attachment type: {type(attachment).__name__}, attrs: {[a for a in dir(attachment) if not a.startswith("_")]}')
-
-        # Text attachment
-        text_obj = _safe_get_attr(attachment, 'text', None)
-        if text_obj:
-          text_content = _safe_get_attr(text_obj, 'content', None)
-          if text_content:
-            text_parts.append(str(text_content))
-
-        # Query attachment (contains SQL)
-        query_obj = _safe_get_attr(attachment, 'query', None)
-        if query_obj:
-          # Get the SQL query string
-          sql = _safe_get_attr(query_obj, 'query', None)
-          if sql:
-            sql_query = str(sql)
-
-          # Get query description
-          desc = _safe_get_attr(query_obj, 'description', None)
-          if desc:
-            text_parts.append(str(desc))
-
-          # Get the attachment ID for fetching query results
-          att_id = _safe_get_attr(attachment, 'id', None)
-          if att_id:
-            query_attachment_id = str(att_id)
-            logger.debug(f'Found query attachment ID: {query_attachment_id}')
-
-    # Build final text
+    text_parts = []
+    sql_query = None
+    query_attachment_id = None
+
+    for attachment in message.get('attachments') or []:
+      # Text attachment
+      text_content = (attachment.get('text') or {}).get('content')
+      if text_content:
+        text_parts.append(str(text_content))
+
+      # Query attachment (contains SQL)
+      query_obj = attachment.get('query')
+      if query_obj:
+        if query_obj.get('query'):
+          sql_query = str(query_obj['query'])
+        if query_obj.get('description'):
+          text_parts.append(str(query_obj['description']))
+        att_id = attachment.get('attachment_id') or attachment.get('id')
+        if att_id:
+          query_attachment_id = str(att_id)
+          logger.debug(f'Found query attachment ID: {query_attachment_id}')
+
     final_text = '\n\n'.join(text_parts) if text_parts else ''
 
-    # Try to get query results if we have a SQL query
+    table_data = None
     if sql_query and message_id:
-      try:
-        # Try the newer attachment-based API first
-        if query_attachment_id:
-          logger.info(f'Fetching query results via attachment API: attachment={query_attachment_id}')
-          query_result = client.genie.get_message_attachment_query_result(
-            space_id=self.genie_space_id,
-            conversation_id=conversation_id,
-            message_id=message_id,
-            attachment_id=query_attachment_id,
-          )
-        else:
-          # Fallback to deprecated API
-          logger.info('Fetching query results via legacy API')
-          query_result = client.genie.get_message_query_result(
-            space_id=self.genie_space_id,
-            conversation_id=conversation_id,
-            message_id=message_id,
-          )
-
-        logger.debug(f'Query result type: {type(query_result).__name__}')
-
-        # Extract statement_response
-        stmt = _safe_get_attr(query_result, 'statement_response', None)
-        if stmt:
-          # Extract columns from manifest > schema > columns
-          columns = []
-          manifest = _safe_get_attr(stmt, 'manifest', None)
-          if manifest:
-            schema = _safe_get_attr(manifest, 'schema', None)
-            if schema:
-              schema_columns = _safe_get_attr(schema, 'columns', None)
-              if schema_columns:
-                columns = [_safe_get_attr(col, 'name', f'col_{i}') for i, col in enumerate(schema_columns)]
-
-          # Extract rows from result > data_array
-          rows = []
-          result_obj = _safe_get_attr(stmt, 'result', None)
-          if result_obj:
-            data_array = _safe_get_attr(result_obj, 'data_array', None)
-            if data_array:
-              rows = [list(row) for row in data_array]
-
-          if columns and rows:
-            table_data = {'columns': columns, 'rows': rows}
-            logger.info(f'Extracted {len(rows)} rows x {len(columns)} columns from query result')
-
-      except Exception as e:
-        logger.warning(f'Could not fetch Genie query results: {e}')
-        import traceback
-        logger.debug(traceback.format_exc())
+      table_data = await self._fetch_table(
+        genie, conversation_id, message_id, query_attachment_id, sql_query
+      )
 
     # If no text was extracted, provide a default response
     if not final_text and not table_data:
-      final_text = 'I processed your request but could not generate a response. Please try rephrasing your question.'
+      final_text = (
+        'I processed your request but could not generate a response. '
+        'Please try rephrasing your question.'
+      )
 
     return {
       'conversation_id': conversation_id,
@@ -241,8 +449,8 @@ class DatabricksGenieHandler(BaseDeploymentHandler):
   ) -> AsyncGenerator[str, None]:
     """Stream response from Genie space.
 
-    Since the Genie API is request/response (not streaming), we simulate
-    streaming by sending progress events followed by the final response.
+    The Genie API is request/response, so status changes are streamed as
+    `genie.progress` events while waiting, followed by the final response.
 
     Args:
       messages: List of messages with 'role' and 'content' keys
@@ -259,40 +467,94 @@ class DatabricksGenieHandler(BaseDeploymentHandler):
         break
 
     if not user_message:
-      yield f'data: {json.dumps({"type": "error", "error": "No user message found"})}\n\n'
+      yield _sse({'type': 'error', 'error': 'No user message found'})
       yield 'data: [DONE]\n\n'
       return
 
     # Send a "thinking" indicator
-    yield f'data: {json.dumps({"type": "response.output_text.delta", "delta": ""})}\n\n'
+    yield _sse({'type': 'response.output_text.delta', 'delta': ''})
 
     try:
-      client = WorkspaceClient()
-
-      # Check if we have an existing conversation for this chat
-      chat_id = endpoint_name  # chat_id is passed through endpoint_name for Genie
-      existing_conversation_id = _genie_conversations.get(chat_id) if chat_id else None
-
-      # Run the sync Genie call in a thread pool
-      if existing_conversation_id:
+      async with GenieClient() as genie:
+        # Check if we have an existing conversation for this chat
+        chat_id = endpoint_name  # chat_id is passed through endpoint_name for Genie
+        existing_conversation_id = None
+        if chat_id:
+          existing_conversation_id = await conversation_registry.get(self.chat_storage, chat_id)
+
+        user = self.chat_storage.user_email if self.chat_storage else 'anonymous'
+        for attempt in range(THROTTLE_RETRIES + 1):
+          # Wait for the space's rate limit; retries go first in this user's queue
+          turns = genie_scheduler.wait_turn(self.genie_space_id, user, priority=attempt > 0)
+          async with contextlib.aclosing(turns):
+            async for position in turns:
+              yield _sse({
+                'type': 'genie.queue',
+                'position': position,
+                'message': f'Waiting for Genie ({position} ahead in queue)'
+                if position
+                else 'Waiting for Genie',
+              })
+          try:
+            ids = await self._send_message(genie, existing_conversation_id, user_message)
+            break
+          except GenieAPIError as e:
+            if not e.throttled:
+              raise
+            genie_scheduler.report_throttled(self.genie_space_id, e.retry_after)
+            if attempt == THROTTLE_RETRIES:
+              raise
+            logger.warning(f'Genie space {self.genie_space_id} throttled, queueing again: {e}')
+        genie_scheduler.report_success(self.genie_space_id)
+        conversation_id, message_id = ids['conversation_id'], ids['message_id']
+
+        # Store conversation ID for follow-ups
+        if chat_id and conversation_id and conversation_id != existing_conversation_id:
+          await conversation_registry.set(self.chat_storage, chat_id, conversation_id)
+
+        message: Dict[str, Any] = {}
+        result = None
+        poller = self._poll_message(genie, conversation_id, message_id)
         try:
-          result = await asyncio.to_thread(
-            self._send_followup_sync, client, existing_conversation_id, user_message
-          )
-        except Exception as followup_err:
-          # If follow-up fails, try starting a new conversation
-          logger.warning(f'Follow-up failed, starting new conversation: {followup_err}')
-          result = await asyncio.to_thread(
-            self._start_conversation_sync, client, user_message
-          )
-      else:
-        result = await asyncio.to_thread(
-          self._start_conversation_sync, client, user_message
-        )
-
-      # Store conversation ID for follow-ups
-      if chat_id and result.get('conversation_id'):
-        _genie_conversations[chat_id] = result['conversation_id']
+          async for kind, payload in poller:
+            if kind == 'status':
+              yield _sse({
+                'type': 'genie.progress',
+                'status': payload,
+                'message': STATUS_MESSAGES.get(payload, payload.replace('_', ' ').capitalize()),
+              })
+            elif kind == 'sql':
+              query = payload['query']
+              yield _sse({
+                'type': 'genie.sql',
+                'sql': query.get('query'),
+                'description': query.get('description'),
+              })
+              cached = None
+              if self.result_cache_ttl > 0:
+                cached = result_cache.get(self.genie_space_id, query['query'])
+              if cached is not None:
+                logger.info(f'Answering Genie message {message_id} from the result cache')
+                result = await self._cached_result(payload, cached, conversation_id)
+                break
+            elif kind == 'heartbeat':
+              yield HEARTBEAT
+            else:
+              message = payload
+        finally:
+          await poller.aclose()
+
+        if result is None:
+          logger.info(f'Genie message finished: conv={conversation_id}, msg={message_id}')
+          result = await self._extract_result(genie, message, conversation_id, message_id)
+
+      # Send the rows as structured data; clients render and chart them from here
+      table = result.get('table')
+      if table:
+        if table.get('result'):
+          # Let clients fetch the full result instead of parsing the preview
+          yield _sse({'type': 'genie.result', **table['result']})
+        yield _sse(_table_event(table))
 
       # Build the response text
       response_parts = []
@@ -305,23 +567,33 @@ class DatabricksGenieHandler(BaseDeploymentHandler):
       if result.get('sql'):
         response_parts.append(f'\n**SQL Query:**\n```sql\n{result["sql"]}\n```')
 
-      # Add table results if present
-      if result.get('table'):
-        table = result['table']
+      # The streamed text only links the full result; the markdown table is
+      # added to the final message for text-only consumers and chat history
+      streamed_parts = list(response_parts)
+      if table:
+        result_url = (table.get('result') or {}).get('url')
+        footer = _format_result_footer(len(table['rows']), table.get('total_rows'), result_url)
+        if footer:
+          streamed_parts.append(f'\n{footer}')
         markdown_table = _format_query_result_as_markdown(
           table.get('columns', []),
           table.get('rows', []),
+          total_rows=table.get('total_rows'),
+          result_url=result_url,
         )
         if markdown_table:
           response_parts.append(f'\n**Results:**\n{markdown_table}')
 
       full_response = '\n'.join(response_parts)
+      streamed_response = '\n'.join(streamed_parts)
 
       if not full_response:
         full_response = 'I was unable to process your request. Please try a different question.'
+      if not streamed_response:
+        streamed_response = full_response
 
       # Stream the response as a single delta (since Genie is not truly streaming)
-      yield f'data: {json.dumps({"type": "response.output_text.delta", "delta": full_response})}\n\n'
+      yield _sse({'type': 'response.output_text.delta', 'delta': streamed_response})
 
       # Send completion event
       done_event = {
@@ -333,12 +605,12 @@ class DatabricksGenieHandler(BaseDeploymentHandler):
           'content': [{'type': 'output_text', 'text': full_response}],
         },
       }
-      yield f'data: {json.dumps(done_event)}\n\n'
+      yield _sse(done_event)
       yield 'data: [DONE]\n\n'
 
     except Exception as e:
       logger.error(f'Genie handler error: {e}')
       import traceback
       logger.error(traceback.format_exc())
-      yield f'data: {json.dumps({"type": "error", "error": f"Genie error: {str(e)}"})}\n\n'
+      yield _sse({'type': 'error', 'error': f'Genie error: {str(e)}'})
       yield 'data: [DONE]\n\n'
@@ -1,7 +1,220 @@
-"""Parse markdown tables and extract structured data for visualization."""
+"""Parse markdown tables and extract structured data for visualization.
 
+Tables are found by a single pass over the lines of the text (GitHub-flavored
+markdown rules): a row of cells, an alignment row such as `|---|:--:|` with the
+same number of cells, then body rows until a line without a cell separator.
+Cells are split on pipes that are not backslash-escaped and padded or cut to
+the header's width. Tables inside fenced code blocks are ignored.
+
+The scan is linear in the size of the text, so long answers full of pipes
+cannot make it backtrack the way a regular expression over the whole text can.
+"""
+
+import logging
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..charts import infer_row_kinds, pick_axes
+
+logger = logging.getLogger(__name__)
+
+# Cell separators when a row contains backslashes: pipes not preceded by one
+_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+# One cell of an alignment row: dashes with optional colons
+_ALIGNMENT_CELL = re.compile(r':?-+:?')
+_FENCE_MARKERS = ('```', '~~~')
+
+
+def _split_cells(line: str) -> Optional[List[str]]:
+  """Cells of a stripped table row, or None if it has only escaped pipes."""
+  escaped = '\\' in line
+  cells = _CELL_SPLIT.split(line) if escaped else line.split('|')
+  if len(cells) == 1:
+    return None
+  # Leading and trailing pipes are optional and do not start a cell
+  if line[0] == '|':
+    cells = cells[1:]
+  if line[-1] == '|' and not line.endswith('\\|'):
+    cells = cells[:-1]
+  if escaped:
+    return [cell.strip().replace('\\|', '|') for cell in cells]
+  return [cell.strip() for cell in cells]
+
+
+def _alignment_width(line: str) -> Optional[int]:
+  """Number of cells if a stripped line is an alignment row such as `|---|:--:|`."""
+  if '-' not in line or line.strip('|:- \t'):
+    return None
+  cells = _split_cells(line)
+  if not cells or not all(_ALIGNMENT_CELL.fullmatch(cell) for cell in cells):
+    return None
+  return len(cells)
+
+
+class StreamingTableDetector:
+  """Find markdown tables in text that arrives in pieces, e.g. streamed deltas.
+
+  feed() takes each piece and returns table events for the lines it completed;
+  close() ends the text. Only the unfinished last line is buffered, so a call
+  costs O(len(delta)) whatever has been fed before.
+
+  Events, with `index` counting the tables of the text:
+    {'type': 'table.started', 'index': 0, 'headers': [...], 'start': 120}
+    {'type': 'table.rows', 'index': 0, 'rows': [[...], ...]}  # rows completed by this call
+    {'type': 'table.completed', 'index': 0, 'row_count': 12, 'chart_config': {...}, 'end': 480}
+
+  Completed tables with at least one row are collected in `tables`, in the
+  format returned by extract_tables_from_markdown.
+  """
+
+  def __init__(self):
+    """Initialize a detector for a new text."""
+    self.tables: List[Dict[str, Any]] = []
+    self._partial: List[str] = []  # pieces of the unfinished last line
+    self._offset = 0  # offset of the next line in the text
+    self._fence: Optional[str] = None
+    # Pending header row (start offset, stripped line); blank lines between it
+    # and the alignment row are tolerated, as agents often emit them
+    self._header: Optional[Tuple[int, str]] = None
+    # Table being read; its body ends at the first line without a pipe
+    self._table: Optional[Dict[str, Any]] = None
+    self._rows_sent = 0
+    self._started = 0
+    self._events: List[Dict[str, Any]] = []
+
+  def feed(self, delta: str) -> List[Dict[str, Any]]:
+    """Consume the next piece of text and return the events it produced."""
+    lines = delta.split('\n')
+    if len(lines) == 1:
+      if delta:
+        self._partial.append(delta)
+      return []
+    self._partial.append(lines[0])
+    lines[0] = ''.join(self._partial)
+    last = lines.pop()
+    self._partial = [last] if last else []
+    self._scan(lines)
+    return self._flush()
+
+  def close(self) -> List[Dict[str, Any]]:
+    """End the text: parse the last line and complete an open table."""
+    if self._partial:
+      self._scan([''.join(self._partial)])
+      self._partial = []
+    if self._table is not None:
+      self._finish()
+    return self._flush()
+
+  def _flush(self) -> List[Dict[str, Any]]:
+    if self._table is not None and len(self._table['rows']) > self._rows_sent:
+      self._send_rows()
+    events, self._events = self._events, []
+    return events
+
+  def _send_rows(self):
+    rows = self._table['rows']
+    self._events.append({
+      'type': 'table.rows',
+      'index': self._started - 1,
+      'rows': rows[self._rows_sent :],
+    })
+    self._rows_sent = len(rows)
+
+  def _finish(self):
+    table = self._table
+    if len(table['rows']) > self._rows_sent:
+      self._send_rows()
+    if table['rows']:
+      table['chart_config'] = _infer_chart_config(table['headers'], table['rows'])
+      self.tables.append(table)
+    self._events.append({
+      'type': 'table.completed',
+      'index': self._started - 1,
+      'row_count': len(table['rows']),
+      'chart_config': table['chart_config'],
+      'end': table['end'],
+    })
+    self._table = None
+
+  def _scan(self, lines: List[str]):
+    """Advance the scanner over complete lines."""
+    offset = self._offset
+    for line in lines:
+      start, end = offset, offset + len(line)
+      offset = end + 1
+      stripped = line.strip()
+
+      marker = stripped[:3]
+      if self._fence or marker in _FENCE_MARKERS:
+        if marker in _FENCE_MARKERS:
+          if self._table is not None:
+            self._finish()
+          self._header = None
+          self._fence = None if self._fence == marker else self._fence or marker
+        continue
+
+      if '|' not in stripped:
+        if self._table is not None:
+          self._finish()
+        if stripped:
+          self._header = None
+        continue
+
+      table = self._table
+      if table is not None:
+        cells = _split_cells(stripped)
+        if cells is not None:
+          width = len(table['headers'])
+          if len(cells) != width:
+            cells = (cells + [''] * width)[:width]
+          table['rows'].append(cells)
+          table['end'] = end
+          continue
+        self._finish()
+
+      header = self._header
+      if header is not None:
+        width = _alignment_width(stripped)
+        if width is not None:
+          headers = _split_cells(header[1])
+          if headers and len(headers) == width:
+            self._start_table(headers, header[0], end)
+            continue
+
+      self._header = (start, stripped)
+    self._offset = offset
+
+  def _start_table(self, headers: List[str], start: int, end: int):
+    self._table = {'headers': headers, 'rows': [], 'chart_config': None, 'start': start, 'end': end}
+    self._header = None
+    self._rows_sent = 0
+    self._started += 1
+    self._events.append({
+      'type': 'table.started',
+      'index': self._started - 1,
+      'headers': headers,
+      'start': start,
+    })
+
+
+def extract_tables_from_markdown(text: str) -> List[Dict[str, Any]]:
+  """Extract every markdown table from text, in order of appearance.
+
+  Returns:
+    List of dictionaries with structure:
+    {
+      'headers': ['Column1', 'Column2', ...],
+      'rows': [['value1', 'value2', ...], ...],
+      'chart_config': {...},  # see extract_table_from_markdown
+      'start': 120,  # offset of the header row in `text`
+      'end': 480     # offset just past the last row
+    }
+  """
+  detector = StreamingTableDetector()
+  detector.feed(text)
+  detector.close()
+  logger.debug(f'Found {len(detector.tables)} markdown tables in {len(text)} chars')
+  return detector.tables
 
 
 def extract_table_from_markdown(text: str) -> Optional[Dict[str, Any]]:
@@ -16,105 +229,25 @@ def extract_table_from_markdown(text: str) -> Optional[Dict[str, Any]]:
         'type': 'bar' | 'line',
         'x_column': 0,  # index of x-axis column
         'y_column': 1   # index of y-axis column
-      }
+      },
+      'start': 120,  # character offsets of the table in `text`
+      'end': 480
     }
   """
-  import logging
-
-  logger = logging.getLogger(__name__)
-
-  # Regex to match markdown table - handle blank lines and spacing
-  # Matches:
-  # | header | header |
-  # (optional blank lines)
-  # |--------|--------|
-  # | data   | data   |
-  # The separator line can have multiple columns: |---|---| (non-capturing group)
-  table_pattern = r'\|(.+)\|[\s\n]*\|(?:[\-\s:]+\|)+[\s\n]+((?:\|.+\|[\s\n]*)+)'
-
-  logger.info(f'Searching for table in text (first 500 chars): {text[:500]}')
-  match = re.search(table_pattern, text, re.MULTILINE | re.DOTALL)
-  if not match:
-    logger.warning('Regex did not match - no table found')
-    # Try to debug - show what lines start with |
-    table_lines = [line for line in text.split('\n') if line.strip().startswith('|')]
-    logger.info(f'Lines starting with |: {table_lines[:10]}')
-    return None
-
-  logger.info(f'✅ Table match found! Header: {match.group(1)[:50]}...')
-
-  # Extract headers
-  header_line = match.group(1)
-  headers = [h.strip() for h in header_line.split('|') if h.strip()]
-
-  # Extract rows
-  rows_text = match.group(2)
-  rows = []
-  for line in rows_text.strip().split('\n'):
-    if line.strip():
-      cells = [c.strip() for c in line.split('|') if c.strip()]
-      if cells:
-        rows.append(cells)
-
-  if not headers or not rows:
-    return None
-
-  # Infer chart configuration
-  chart_config = _infer_chart_config(headers, rows)
-
-  return {'headers': headers, 'rows': rows, 'chart_config': chart_config}
+  tables = extract_tables_from_markdown(text)
+  return tables[0] if tables else None
 
 
 def _infer_chart_config(headers: List[str], rows: List[List[str]]) -> Dict[str, Any]:
-  """Infer the best chart type and configuration based on data.
+  """Infer the chart type and axes of a table from the values of all its rows.
 
-  Logic:
-  - If first column is categorical (text) and second is numeric -> bar chart
-  - If first column looks like dates/months/years -> line chart
-  - Default to bar chart with first two columns
+  Column kinds and axes follow server/services/charts.py: x is the first date
+  column (line chart), else a leading numeric time column such as `year`
+  (line chart), else the first text column (bar chart); y is the first other
+  numeric column.
   """
   if len(headers) < 2 or not rows:
     return {'type': 'bar', 'x_column': 0, 'y_column': 1}
 
-  # Check if first column contains time-related words
-  first_header = headers[0].lower()
-  time_keywords = ['month', 'year', 'date', 'time', 'quarter', 'week', 'day']
-  is_time_series = any(keyword in first_header for keyword in time_keywords)
-
-  # Check if first row's first column looks like a date/month
-  first_value = rows[0][0].lower() if rows else ''
-  month_keywords = [
-    'jan',
-    'feb',
-    'mar',
-    'apr',
-    'may',
-    'jun',
-    'jul',
-    'aug',
-    'sep',
-    'oct',
-    'nov',
-    'dec',
-  ]
-  looks_like_date = any(keyword in first_value for keyword in month_keywords)
-
-  # Determine chart type
-  chart_type = 'line' if (is_time_series or looks_like_date) else 'bar'
-
-  # Find first numeric column (usually second column)
-  y_column = 1
-  for i, row in enumerate(rows):
-    if len(row) > 1:
-      try:
-        # Try to parse as number
-        float(row[1].replace(',', ''))
-        y_column = 1
-        break
-      except ValueError:
-        # Try next column
-        if len(row) > 2:
-          y_column = 2
-        break
-
-  return {'type': chart_type, 'x_column': 0, 'y_column': y_column}
+  x_column, y_columns, chart_type = pick_axes(headers, infer_row_kinds(rows, len(headers)))
+  return {'type': chart_type, 'x_column': x_column, 'y_column': y_columns[0] if y_columns else 1}
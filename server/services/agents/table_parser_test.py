@@ -0,0 +1,168 @@
+"""Tests for the markdown table scanner."""
+
+import random
+import time
+
+from .table_parser import StreamingTableDetector, extract_tables_from_markdown
+
+SALES = (
+  'Revenue by region — last quarter:\n'
+  '\n'
+  '| Region | Revenue |\n'
+  '|:-------|--------:|\n'
+  '| EU     | 1200    |\n'
+  '| US     | 3400    |\n'
+  '\n'
+  'And by product:\n'
+  'Product | Units\n'
+  '--- | ---\n'
+  'Widget | 10\n'
+  'Gadget | 7\n'
+)
+
+
+def _stream(chunks):
+  """Events and tables of a text fed in the given chunks."""
+  detector = StreamingTableDetector()
+  events = []
+  for chunk in chunks:
+    events.extend(detector.feed(chunk))
+  events.extend(detector.close())
+  return events, detector.tables
+
+
+def _rows(events, index):
+  batches = [e['rows'] for e in events if e['type'] == 'table.rows' and e['index'] == index]
+  return [row for rows in batches for row in rows]
+
+
+def test_tables_and_offsets():
+  tables = extract_tables_from_markdown(SALES)
+  assert [t['headers'] for t in tables] == [['Region', 'Revenue'], ['Product', 'Units']]
+  assert tables[0]['rows'] == [['EU', '1200'], ['US', '3400']]
+  assert tables[1]['rows'] == [['Widget', '10'], ['Gadget', '7']]
+  assert SALES[tables[0]['start'] : tables[0]['end']] == (
+    '| Region | Revenue |\n|:-------|--------:|\n| EU     | 1200    |\n| US     | 3400    |'
+  )
+  assert SALES[tables[1]['start'] : tables[1]['end']].endswith('Gadget | 7')
+  assert tables[0]['chart_config'] == {'type': 'bar', 'x_column': 0, 'y_column': 1}
+
+
+def test_split_at_every_position_matches_whole_text():
+  expected = extract_tables_from_markdown(SALES)
+  for split in range(len(SALES) + 1):
+    _, tables = _stream([SALES[:split], SALES[split:]])
+    assert tables == expected, split
+
+
+def test_random_chunks_match_whole_text():
+  expected_events, expected = _stream([SALES])
+  rng = random.Random(7)
+  for _ in range(50):
+    chunks, pos = [], 0
+    while pos < len(SALES):
+      size = rng.randint(1, 9)
+      chunks.append(SALES[pos : pos + size])
+      pos += size
+    events, tables = _stream(chunks)
+    assert tables == expected
+    # Rows may arrive in other batches, but in the same order
+    assert _rows(events, 0) == _rows(expected_events, 0)
+    assert _rows(events, 1) == _rows(expected_events, 1)
+
+
+def test_event_sequence():
+  detector = StreamingTableDetector()
+  assert detector.feed('Intro\n| a | b |\n|---|') == []
+  started = detector.feed('---|\n| 1 | 2 |\n| 3 |')
+  assert started == [
+    {'type': 'table.started', 'index': 0, 'headers': ['a', 'b'], 'start': 6},
+    {'type': 'table.rows', 'index': 0, 'rows': [['1', '2']]},
+  ]
+  assert detector.feed(' 4 |\n') == [{'type': 'table.rows', 'index': 0, 'rows': [['3', '4']]}]
+  completed = detector.feed('\nDone.')
+  assert [e['type'] for e in completed] == ['table.completed']
+  assert completed[0]['index'] == 0
+  assert completed[0]['row_count'] == 2
+  assert completed[0]['end'] == len('Intro\n| a | b |\n|---|---|\n| 1 | 2 |\n| 3 | 4 |')
+  assert detector.close() == []
+
+
+def test_open_table_completed_on_close():
+  detector = StreamingTableDetector()
+  events = detector.feed('| a | b |\n|---|---|\n| 1 | 2 |')
+  assert [e['type'] for e in events] == ['table.started']
+  events = detector.close()
+  assert [e['type'] for e in events] == ['table.rows', 'table.completed']
+  assert events[1]['row_count'] == 1
+
+
+def test_fenced_blocks_are_skipped():
+  text = (
+    '```markdown\n| a | b |\n|---|---|\n| 1 | 2 |\n```\n'
+    '~~~\n| c | d |\n|---|---|\n~~~\n'
+    '| x | y |\n|---|---|\n| 3 | 4 |\n'
+  )
+  tables = extract_tables_from_markdown(text)
+  assert [t['headers'] for t in tables] == [['x', 'y']]
+
+
+def test_fence_ends_a_table():
+  tables = extract_tables_from_markdown('| a | b |\n|---|---|\n| 1 | 2 |\n```\n| 3 | 4 |\n```\n')
+  assert tables[0]['rows'] == [['1', '2']]
+
+
+def test_escaped_pipes():
+  tables = extract_tables_from_markdown(
+    '| expr | meaning |\n|---|---|\n| `a \\| b` | a or b |\n| x | y \\|\n'
+  )
+  assert tables[0]['rows'] == [['`a | b`', 'a or b'], ['x', 'y |']]
+
+
+def test_rows_padded_or_cut_to_header_width():
+  tables = extract_tables_from_markdown('| a | b | c |\n|---|---|---|\n| 1 |\n| 1 | 2 | 3 | 4 |\n')
+  assert tables[0]['rows'] == [['1', '', ''], ['1', '2', '3']]
+
+
+def test_blank_line_between_header_and_alignment_is_tolerated():
+  tables = extract_tables_from_markdown('| a | b |\n\n|---|---|\n| 1 | 2 |\n')
+  assert tables[0]['headers'] == ['a', 'b']
+
+
+def test_alignment_row_of_other_width_is_not_a_table():
+  assert extract_tables_from_markdown('| a | b |\n|---|\n| 1 | 2 |\n') == []
+
+
+def test_table_without_rows_is_not_collected():
+  events, tables = _stream(['| a | b |\n|---|---|\nText\n'])
+  assert tables == []
+  assert [e['type'] for e in events] == ['table.started', 'table.completed']
+  assert events[1]['row_count'] == 0
+
+
+def _seconds(text: str) -> float:
+  begin = time.perf_counter()
+  extract_tables_from_markdown(text)
+  return time.perf_counter() - begin
+
+
+def test_pipe_rows_without_alignment_row_take_linear_time():
+  # A regex over the whole text used to backtrack here: ~17 s for 64 KB
+  text = '| a | b |\n' * (64 * 1024 // 10)
+  assert extract_tables_from_markdown(text) == []
+  small = min(_seconds(text) for _ in range(3))
+  assert small < 0.5
+  # Ten times the text, ten times the work (with ample room for timer noise)
+  assert min(_seconds(text * 10) for _ in range(3)) < max(small * 30, 0.5)
+
+
+def test_one_long_line_of_pipes():
+  assert extract_tables_from_markdown('a | ' * 100_000) == []
+
+
+def test_adjacent_tables_are_not_merged():
+  text = '| a | b |\n|---|---|\n| 1 | 2 |\n\n| c | d | e |\n|---|---|---|\n| 3 | 4 | 5 |\n'
+  tables = extract_tables_from_markdown(text)
+  assert [t['headers'] for t in tables] == [['a', 'b'], ['c', 'd', 'e']]
+  assert [t['rows'] for t in tables] == [[['1', '2']], [['3', '4', '5']]]
+  assert text[tables[0]['end'] : tables[1]['start']] == '\n\n'
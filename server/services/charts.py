@@ -0,0 +1,429 @@
+"""Chart data preparation for query results and markdown tables.
+
+Turns tabular results into chart-ready series on the server, instead of the
+browser charting raw rows:
+
+1. Every column gets a kind (numeric, date or categorical) from its dtype or,
+   for strings, from the values: numbers may carry `,`, `$` or `%`, dates are
+   matched against a few common formats. Missing-value markers such as
+   `n/a` or `-` count as empty cells. Large columns are classified on an
+   evenly spaced sample; only the columns used by the chart are then
+   converted in full, vectorized with pandas.
+2. Axes are picked: x is the first date column, else a leading numeric time
+   column (e.g. `year`), else the first categorical column; y are the other
+   numeric columns.
+3. Rows are aggregated per x value (summed). Categories beyond
+   CHART_MAX_CATEGORIES are summed into "Other"; a time axis with a
+   low-cardinality category column is split into one series per category.
+4. Line charts longer than `max_points` are downsampled with
+   Largest-Triangle-Three-Buckets, which keeps the visual shape of a series
+   (peaks and dips) with far fewer points.
+
+Usage:
+    chart = prepare_chart(frame_from_arrow(table), max_points=500)
+    # {'type': 'line', 'data': {'labels': [...], 'datasets': [...]}, ...} or None
+"""
+
+import logging
+import math
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+NUMERIC = 'numeric'
+DATE = 'date'
+CATEGORICAL = 'categorical'
+
+# Default number of points sent for a line chart
+CHART_MAX_POINTS = 500
+# Bars shown for a categorical axis (the rest are summed into "Other")
+CHART_MAX_CATEGORIES = 30
+# Numeric columns (or categories of a split) charted as separate series
+CHART_MAX_SERIES = 5
+
+# Share of non-empty values that must parse for a string column to be numeric/date
+KIND_MIN_SHARE = 0.9
+# String columns are classified on this many evenly spaced values
+INFER_SAMPLE_ROWS = 1000
+# Characters allowed around numbers in formatted values, e.g. "$1,234.5" or "12%"
+_NUMBER_NOISE = r'[,$%\s]'
+# Candidate formats for date strings, tried in order. Arrow's %b also matches
+# full month names ("January"), which are shortened for pandas when parsing.
+_DATE_FORMATS = (
+  'ISO8601',
+  '%Y-%m',
+  '%b %Y',
+  '%b %d, %Y',
+  '%d %b %Y',
+  '%m/%d/%Y',
+  '%d/%m/%Y',
+  '%Y/%m/%d',
+)
+_DIGIT = re.compile(r'\d')
+_MONTH_NAME = r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b'
+# Cell texts that mean "no value", ignored like empty cells when inferring kinds
+_MISSING_VALUES = frozenset({'n/a', 'na', 'null', 'none', 'nan', '-', '--', '\u2014'})
+# Column names that make a numeric column a time axis
+_TIME_KEYWORDS = ('year', 'quarter', 'month', 'week', 'day', 'date', 'time', 'hour')
+
+
+# =============================================================================
+# Column kinds
+# =============================================================================
+
+
+def _is_number(value: str) -> bool:
+  try:
+    return math.isfinite(float(_strip_number_noise(value)))
+  except ValueError:
+    return False
+
+
+def _strip_number_noise(value: str) -> str:
+  return value.replace(',', '').replace('$', '').replace('%', '').replace(' ', '')
+
+
+def _is_iso_date(value: str) -> bool:
+  # Cheap check first: ISO dates start with a four-digit year and a dash
+  if value[4:5] != '-' or not value[:4].isdigit():
+    return False
+  try:
+    datetime.fromisoformat(value)
+    return True
+  except ValueError:
+    return False
+
+
+def _mostly(values: List[str], predicate: Callable[[str], Any]) -> bool:
+  """Whether at least KIND_MIN_SHARE of the values match, stopping at the first excess miss."""
+  allowed_misses = len(values) - math.ceil(KIND_MIN_SHARE * len(values))
+  misses = 0
+  for value in values:
+    if not predicate(value):
+      misses += 1
+      if misses > allowed_misses:
+        return False
+  return True
+
+
+def _string_kind(values: List[str]) -> Tuple[str, Optional[str]]:
+  """Kind and date format of non-empty, stripped strings.
+
+  Numbers and ISO dates are checked in Python, stopping at the first values
+  that rule them out. The other date formats are parsed with Arrow's
+  vectorized strptime, which costs about as much for a thousand values as
+  Python's strptime for a handful.
+  """
+  if not values:
+    return CATEGORICAL, None
+  if _mostly(values, _is_number):
+    return NUMERIC, None
+  if not _mostly(values, _DIGIT.search):
+    return CATEGORICAL, None
+  if _mostly(values, _is_iso_date):
+    return DATE, 'ISO8601'
+  array = pa.array(values, pa.string())
+  allowed_nulls = len(values) - math.ceil(KIND_MIN_SHARE * len(values))
+  for date_format in _DATE_FORMATS[1:]:
+    parsed = pc.strptime(array, format=date_format, unit='s', error_is_null=True)
+    if parsed.null_count <= allowed_nulls:
+      return DATE, date_format
+  return CATEGORICAL, None
+
+
+def _sample_rows(rows: Sequence[Any]) -> Sequence[Any]:
+  """At most INFER_SAMPLE_ROWS evenly spaced items."""
+  if len(rows) <= INFER_SAMPLE_ROWS:
+    return rows
+  step = (len(rows) - 1) / (INFER_SAMPLE_ROWS - 1)
+  return [rows[round(i * step)] for i in range(INFER_SAMPLE_ROWS)]
+
+
+def _sample(values: Sequence[Any]) -> List[str]:
+  """Non-empty stripped strings of at most INFER_SAMPLE_ROWS evenly spaced values."""
+  values = _sample_rows(values)
+  stripped = (str(value).strip() for value in values if value is not None)
+  return [value for value in stripped if value and value.lower() not in _MISSING_VALUES]
+
+
+def _parse_numbers(values: pd.Series) -> pd.Series:
+  """Floats from formatted number strings (NaN where a value does not parse)."""
+  return pd.to_numeric(
+    values.astype(str).str.replace(_NUMBER_NOISE, '', regex=True), errors='coerce'
+  )
+
+
+def _parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+  """Naive timestamps from date strings (NaT where a value does not parse)."""
+  if date_format == 'ISO8601':
+    parsed = pd.to_datetime(values, format='ISO8601', errors='coerce', utc=True)
+    return parsed.dt.tz_localize(None)
+  if '%b' in date_format:
+    values = values.str.replace(_MONTH_NAME, r'\1', regex=True, case=False)
+  return pd.to_datetime(values, format=date_format, errors='coerce')
+
+
+def _column_kind(values: pd.Series) -> Tuple[str, Optional[str]]:
+  """Kind of a column and, for date strings, their format."""
+  if pd.api.types.is_bool_dtype(values):
+    return CATEGORICAL, None
+  if pd.api.types.is_numeric_dtype(values):
+    return NUMERIC, None
+  if pd.api.types.is_datetime64_any_dtype(values):
+    return DATE, None
+  if len(values) > INFER_SAMPLE_ROWS:
+    values = values.iloc[np.linspace(0, len(values) - 1, INFER_SAMPLE_ROWS).astype(np.int64)]
+  return _string_kind(_sample(values.dropna().tolist()))
+
+
+def infer_column_kinds(frame: pd.DataFrame) -> List[str]:
+  """Kind (numeric, date or categorical) of every column of a frame."""
+  return [_column_kind(frame.iloc[:, i])[0] for i in range(frame.shape[1])]
+
+
+def infer_row_kinds(rows: Sequence[Sequence[str]], width: int) -> List[str]:
+  """Kind of every column of string rows, such as the cells of a markdown table."""
+  rows = _sample_rows(rows)
+  return [_string_kind(_sample([row[i] for row in rows if i < len(row)]))[0] for i in range(width)]
+
+
+# =============================================================================
+# Axes
+# =============================================================================
+
+
+def _is_time_name(name: Any) -> bool:
+  name = str(name).lower()
+  return any(keyword in name for keyword in _TIME_KEYWORDS)
+
+
+def pick_axes(names: Sequence[str], kinds: Sequence[str]) -> Tuple[int, List[int], str]:
+  """Choose the x column, the y columns and the chart type ('line' or 'bar').
+
+  The y list is empty when there is nothing numeric to chart. A text x
+  column named like a time unit (e.g. `month` with values "Jan", "Feb") is
+  charted as a line, in the order of the rows.
+  """
+  chart_type = 'bar'
+  if DATE in kinds:
+    x, chart_type = kinds.index(DATE), 'line'
+  elif kinds and kinds[0] == NUMERIC and _is_time_name(names[0]) and kinds.count(NUMERIC) > 1:
+    x, chart_type = 0, 'line'
+  elif CATEGORICAL in kinds:
+    x = kinds.index(CATEGORICAL)
+    if _is_time_name(names[x]):
+      chart_type = 'line'
+  else:
+    x = 0
+  y = [i for i, kind in enumerate(kinds) if kind == NUMERIC and i != x]
+  return x, y[:CHART_MAX_SERIES], chart_type
+
+
+# =============================================================================
+# Downsampling
+# =============================================================================
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+  """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+  The first and last points are always kept. The points in between are split
+  into threshold - 2 buckets, and each bucket keeps the point forming the
+  largest triangle with the point kept from the previous bucket and the
+  average of the next bucket. Bucket averages are computed in one vectorized
+  pass; the loop only runs once per bucket.
+
+  Args:
+    x: Increasing x values (floats)
+    y: Values to preserve the shape of (floats, no NaN)
+    threshold: Number of points to keep
+  """
+  n = len(x)
+  if threshold >= n or threshold < 3:
+    return np.arange(n)
+
+  x = x.astype(np.float64) - x[0]
+  y = y.astype(np.float64)
+  edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+  x_sums = np.concatenate(([0.0], np.cumsum(x)))
+  y_sums = np.concatenate(([0.0], np.cumsum(y)))
+  counts = edges[1:] - edges[:-1]
+  avg_x = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts
+  avg_y = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / counts
+  # The last bucket looks ahead to the last point instead of a bucket average
+  next_x = np.append(avg_x[1:], x[-1])
+  next_y = np.append(avg_y[1:], y[-1])
+
+  kept = np.empty(threshold, dtype=np.int64)
+  kept[0], kept[-1] = 0, n - 1
+  a = 0
+  for i in range(threshold - 2):
+    lo, hi = edges[i], edges[i + 1]
+    area = np.abs(
+      (x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+    )
+    a = lo + int(area.argmax())
+    kept[i + 1] = a
+  return kept
+
+
+# =============================================================================
+# Chart preparation
+# =============================================================================
+
+
+def frame_from_rows(headers: Sequence[str], rows: Sequence[Sequence[Any]]) -> pd.DataFrame:
+  """Frame of string cells, e.g. from a markdown table or a JSON_ARRAY result."""
+  return pd.DataFrame(list(rows), columns=list(headers), dtype=object)
+
+
+def frame_from_arrow(table: pa.Table) -> pd.DataFrame:
+  """Frame with native dtypes from an Arrow table (decimals become floats)."""
+  columns = [
+    pc.cast(col, pa.float64()) if pa.types.is_decimal(col.type) else col
+    for col in table.columns
+  ]
+  return pa.Table.from_arrays(columns, names=table.column_names).to_pandas()
+
+
+def _as_x(values: pd.Series, kind: str, date_format: Optional[str]) -> pd.Series:
+  if kind == DATE:
+    if pd.api.types.is_datetime64_any_dtype(values):
+      if getattr(values.dt, 'tz', None) is not None:
+        return values.dt.tz_convert('UTC').dt.tz_localize(None)
+      return values
+    return _parse_dates(values.astype(str).str.strip(), date_format)
+  if kind == NUMERIC:
+    return _as_numbers(values)
+  return values.astype(str).where(values.notna(), '')
+
+
+def _as_numbers(values: pd.Series) -> pd.Series:
+  if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+    return values.astype(np.float64)
+  return _parse_numbers(values)
+
+
+def _labels(index: pd.Index, kind: str) -> List[str]:
+  if kind == DATE:
+    times = pd.DatetimeIndex(index)
+    with_time = bool((times != times.normalize()).any())
+    return list(times.strftime('%Y-%m-%d %H:%M' if with_time else '%Y-%m-%d'))
+  if kind == NUMERIC:
+    return [str(int(v)) if float(v).is_integer() else str(v) for v in index]
+  return [str(v) for v in index]
+
+
+def _json_numbers(values: np.ndarray) -> List[Optional[float]]:
+  """Floats for JSON, with NaN and infinities as None."""
+  return [v if math.isfinite(v) else None for v in values.astype(np.float64).tolist()]
+
+
+def _split_column(
+  frame: pd.DataFrame, kinds: List[str], x: int
+) -> Optional[Tuple[np.ndarray, List[str]]]:
+  """Codes and names of a low-cardinality categorical column to split a time series by."""
+  for i, kind in enumerate(kinds):
+    if kind == CATEGORICAL and i != x:
+      codes, categories = pd.factorize(frame.iloc[:, i])
+      if 2 <= len(categories) <= CHART_MAX_SERIES:
+        return codes, [str(category) for category in categories]
+  return None
+
+
+def prepare_chart(
+  frame: pd.DataFrame, max_points: int = CHART_MAX_POINTS
+) -> Optional[Dict[str, Any]]:
+  """Chart-ready series for a table, or None if it has nothing numeric to chart.
+
+  Args:
+    frame: The rows, with native dtypes or as strings
+    max_points: Points kept when downsampling a line chart
+
+  Returns:
+    {
+      'type': 'line' | 'bar',
+      'data': {'labels': [...], 'datasets': [{'label': 'revenue', 'data': [...]}]},
+      'x': {'name': 'month', 'kind': 'date'},
+      'source_rows': 120000,  # rows the chart was computed from
+      'points': 500,
+      'aggregated': True,     # several rows were summed into one point
+      'downsampled': True,    # points were dropped by LTTB
+    }
+  """
+  if frame.empty or frame.shape[1] < 2:
+    return None
+
+  names = [str(name) for name in frame.columns]
+  kinds_formats = [_column_kind(frame.iloc[:, i]) for i in range(frame.shape[1])]
+  kinds = [kind for kind, _ in kinds_formats]
+  x, ys, chart_type = pick_axes(names, kinds)
+  if not ys:
+    return None
+
+  x_kind, x_format = kinds_formats[x]
+  work = pd.DataFrame({names[i]: _as_numbers(frame.iloc[:, i]) for i in ys})
+  work.index = pd.Index(_as_x(frame.iloc[:, x], x_kind, x_format), name=names[x])
+  # Split a time series by category only when categories share x values
+  split = None
+  if chart_type == 'line' and x_kind != CATEGORICAL and work.index.has_duplicates:
+    split = _split_column(frame, kinds, x)
+  if split is not None:
+    work['category'] = split[0]  # -1 where the category is missing
+  if x_kind != CATEGORICAL:
+    work = work[work.index.notna()]
+
+  if split is not None:
+    # One series per category of the split column, for the first numeric column
+    categories = split[1]
+    work = work[work['category'] >= 0]
+    grouped = (
+      work.groupby([work.index, 'category'])[names[ys[0]]].sum(min_count=1).unstack('category')
+    )
+    grouped.columns = [f'{names[ys[0]]} ({categories[code]})' for code in grouped.columns]
+  elif x_kind != CATEGORICAL and not work.index.has_duplicates:
+    # Nothing to aggregate (e.g. one row per timestamp)
+    grouped = work if work.index.is_monotonic_increasing else work.sort_index()
+  else:
+    grouped = work.groupby(level=0, sort=x_kind != CATEGORICAL).sum(min_count=1)
+  aggregated = len(grouped) < len(work)
+
+  downsampled = False
+  if x_kind == CATEGORICAL:
+    if len(grouped) > CHART_MAX_CATEGORIES:
+      ranked = grouped.iloc[:, 0].fillna(0).sort_values(ascending=False)
+      top = grouped.loc[ranked.index[: CHART_MAX_CATEGORIES - 1]]
+      other = grouped.drop(top.index).sum(min_count=1).to_frame('Other').T
+      grouped = pd.concat([top, other])
+      aggregated = True
+      chart_type = 'bar'  # ranked, so no longer in time order
+  elif len(grouped) > max_points:
+    x_values = grouped.index.values
+    if x_kind == DATE:
+      x_values = x_values.astype('datetime64[ns]').astype(np.int64)
+    shape = np.nansum(grouped.to_numpy(dtype=np.float64), axis=1)
+    grouped = grouped.iloc[lttb_indices(x_values.astype(np.float64), shape, max_points)]
+    downsampled = True
+
+  datasets = [
+    {'label': str(name), 'data': _json_numbers(grouped[name].to_numpy())} for name in grouped
+  ]
+  for dataset in datasets:
+    if chart_type == 'line':
+      dataset['tension'] = 0.3
+  return {
+    'type': chart_type,
+    'data': {'labels': _labels(grouped.index, x_kind), 'datasets': datasets},
+    'x': {'name': names[x], 'kind': x_kind},
+    'source_rows': len(frame),
+    'points': len(grouped),
+    'aggregated': aggregated,
+    'downsampled': downsampled,
+  }
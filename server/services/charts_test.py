@@ -0,0 +1,126 @@
+"""Tests for the chart data preparation."""
+
+import numpy as np
+import pandas as pd
+
+from .charts import (
+  CATEGORICAL,
+  CHART_MAX_CATEGORIES,
+  DATE,
+  NUMERIC,
+  frame_from_rows,
+  infer_row_kinds,
+  lttb_indices,
+  prepare_chart,
+)
+
+
+def test_lttb_keeps_first_and_last_points():
+  x = np.arange(1000, dtype=np.float64)
+  y = np.sin(x / 20)
+  kept = lttb_indices(x, y, 50)
+  assert len(kept) == 50
+  assert (kept[0], kept[-1]) == (0, 999)
+  assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_a_spike():
+  x = np.arange(100, dtype=np.float64)
+  y = np.zeros(100)
+  y[37] = 10.0
+  assert 37 in lttb_indices(x, y, 10)
+
+
+def test_lttb_below_threshold_keeps_everything():
+  x = np.arange(5, dtype=np.float64)
+  assert lttb_indices(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+  assert lttb_indices(x, x, 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_line_chart_is_downsampled():
+  frame = pd.DataFrame(
+    {'day': pd.date_range('2026-01-01', periods=2000, freq='h'), 'value': np.arange(2000.0)}
+  )
+  chart = prepare_chart(frame, max_points=100)
+  assert chart['type'] == 'line'
+  assert (chart['points'], chart['downsampled'], chart['aggregated']) == (100, True, False)
+  labels = chart['data']['labels']
+  assert (labels[0], labels[-1]) == ('2026-01-01 00:00', '2026-03-25 07:00')
+  assert chart['data']['datasets'][0]['data'][-1] == 1999.0
+
+
+def test_categories_beyond_limit_are_summed_into_other():
+  rows = [[f'c{i:02}', str(i)] for i in range(40)]
+  chart = prepare_chart(frame_from_rows(['name', 'amount'], rows))
+  labels = chart['data']['labels']
+  assert len(labels) == CHART_MAX_CATEGORIES
+  # Largest first, then the rest
+  assert labels[:2] == ['c39', 'c38']
+  assert labels[-1] == 'Other'
+  assert chart['data']['datasets'][0]['data'][-1] == sum(range(40 - CHART_MAX_CATEGORIES + 1))
+  assert chart['aggregated'] is True
+
+
+def test_rows_are_summed_per_category():
+  rows = [['a', '1'], ['b', '2'], ['a', '3']]
+  chart = prepare_chart(frame_from_rows(['name', 'amount'], rows))
+  assert chart['type'] == 'bar'
+  assert chart['data']['labels'] == ['a', 'b']
+  assert chart['data']['datasets'][0]['data'] == [4.0, 2.0]
+
+
+def test_time_series_is_split_by_category():
+  rows = [
+    ['2026-01-01', 'EU', '1'],
+    ['2026-01-01', 'US', '2'],
+    ['2026-01-02', 'EU', '3'],
+    ['2026-01-02', 'US', '4'],
+    ['2026-01-02', 'EU', '5'],
+  ]
+  chart = prepare_chart(frame_from_rows(['day', 'region', 'sales'], rows))
+  assert chart['type'] == 'line'
+  assert chart['data']['labels'] == ['2026-01-01', '2026-01-02']
+  datasets = {d['label']: d['data'] for d in chart['data']['datasets']}
+  assert datasets == {'sales (EU)': [1.0, 8.0], 'sales (US)': [2.0, 4.0]}
+
+
+def test_date_formats_are_detected():
+  for dates, label in (
+    (['2026-01-05', '2026-02-05'], '2026-01-05'),
+    (['2026-01', '2026-02'], '2026-01-01'),
+    (['Jan 2026', 'Feb 2026'], '2026-01-01'),
+    (['January 2026', 'February 2026'], '2026-01-01'),
+    (['Jan 05, 2026', 'Feb 05, 2026'], '2026-01-05'),
+    (['05 Jan 2026', '05 Feb 2026'], '2026-01-05'),
+    (['01/05/2026', '02/05/2026'], '2026-01-05'),
+    (['13/01/2026', '13/02/2026'], '2026-01-13'),
+    (['2026/01/05', '2026/02/05'], '2026-01-05'),
+  ):
+    chart = prepare_chart(frame_from_rows(['when', 'n'], [[d, '1'] for d in dates]))
+    assert chart['x'] == {'name': 'when', 'kind': DATE}, dates
+    assert chart['data']['labels'][0] == label, dates
+
+
+def test_formatted_numbers_and_missing_markers():
+  rows = [['a', '$1,000'], ['b', '2,000'], ['c', 'n/a']]
+  assert infer_row_kinds(rows, 2) == [CATEGORICAL, NUMERIC]
+  chart = prepare_chart(frame_from_rows(['item', 'cost'], rows))
+  assert chart['data']['datasets'][0]['data'] == [1000.0, 2000.0, None]
+
+
+def test_column_mostly_text_is_not_numeric():
+  rows = [['a', '1'], ['b', 'many'], ['c', 'few']]
+  assert infer_row_kinds(rows, 2) == [CATEGORICAL, CATEGORICAL]
+  assert prepare_chart(frame_from_rows(['item', 'count'], rows)) is None
+
+
+def test_non_finite_values_become_none():
+  frame = pd.DataFrame({'name': ['a', 'b', 'c'], 'value': [1.5, np.nan, np.inf]})
+  chart = prepare_chart(frame)
+  assert chart['data']['datasets'][0]['data'] == [1.5, None, None]
+
+
+def test_nothing_to_chart():
+  assert prepare_chart(pd.DataFrame()) is None
+  assert prepare_chart(pd.DataFrame({'value': [1, 2]})) is None
+  assert prepare_chart(frame_from_rows(['a', 'b'], [['x', 'y']])) is None
@@ -1,7 +1,14 @@
 """Chat storage service with automatic backend selection.
 
 This module provides a factory function to create chat storage instances.
-If LAKEBASE_PG_URL is set, uses PostgreSQL; otherwise falls back to in-memory storage.
+CHAT_STORAGE selects the backend:
+- postgres: PostgreSQL (Lakebase), the default when LAKEBASE_PG_URL is set
+- sqlite: a local SQLite file shared by all workers (CHAT_SQLITE_PATH, see sqlite.py),
+  the default otherwise
+- memory: compact in-memory storage bounded by CHAT_MEMORY_BUDGET_MB (see compact.py)
+
+PostgreSQL storage is wrapped in a hot in-memory cache of recent reads,
+sized by CHAT_CACHE_MB (see cached.py, 0 disables it).
 
 Usage:
     from server.services.chat import get_storage, init_storage
@@ -17,84 +24,174 @@ Usage:
 """
 
 import logging
+import os
 from typing import Optional
 
-from server.db import create_tables, init_database, is_postgres_configured
-
-from .base import BaseChatStorage, BaseUserScopedChatStorage
+from server.db import (
+  close_database,
+  create_tables,
+  init_database,
+  is_postgres_configured,
+  open_pool,
+)
+
+from .base import (
+  BaseChatStorage,
+  BaseUserScopedChatStorage,
+  Cursor,
+  decode_cursor,
+  encode_cursor,
+  new_id,
+)
+from .compact import ChatRecord, CompactChatStorage, CompactUserScopedChatStorage, MessageRecord
 from .memory import MemoryChatStorage, MemoryUserScopedChatStorage
 
 logger = logging.getLogger(__name__)
 
-# Global storage instance
+# Global storage instance, and its backend
 _storage: Optional[BaseUserScopedChatStorage] = None
+_backend: Optional[str] = None
 _initialized: bool = False
 
 
+def storage_backend() -> str:
+  """Configured chat storage backend: 'postgres', 'sqlite' or 'memory'."""
+  backend = (os.environ.get('CHAT_STORAGE') or '').strip().lower()
+  if backend in ('postgres', 'sqlite', 'memory'):
+    return backend
+  if backend:
+    logger.warning(f'Unknown CHAT_STORAGE={backend!r}, expected postgres, sqlite or memory')
+  return 'postgres' if is_postgres_configured() else 'sqlite'
+
+
+async def _local_storage(backend: str, max_chats_per_user: int) -> BaseUserScopedChatStorage:
+  """SQLite storage, or in-memory storage if requested or if SQLite cannot be opened."""
+  global _backend
+  if backend == 'sqlite':
+    try:
+      from .sqlite import SqliteUserScopedChatStorage
+
+      storage = SqliteUserScopedChatStorage(max_chats_per_user=max_chats_per_user)
+      await storage.open()
+      _backend = 'sqlite'
+      return storage
+    except Exception as e:
+      logger.error(f'Failed to initialize SQLite storage: {e}')
+      logger.warning('Falling back to in-memory storage')
+  _backend = 'memory'
+  return CompactUserScopedChatStorage(max_chats_per_user=max_chats_per_user)
+
+
 async def init_storage(max_chats_per_user: int = 10) -> BaseUserScopedChatStorage:
   """Initialize the global chat storage instance asynchronously.
 
-  Automatically selects the appropriate backend:
-  - PostgreSQL if LAKEBASE_PG_URL is set
-  - In-memory storage otherwise
+  Selects the backend from CHAT_STORAGE:
+  - PostgreSQL if LAKEBASE_PG_URL is set (unless CHAT_STORAGE says otherwise)
+  - SQLite otherwise, or compact in-memory storage with CHAT_STORAGE=memory
 
   This should be called once at app startup (e.g., in FastAPI lifespan).
   """
-  global _storage, _initialized
+  global _storage, _backend, _initialized
 
   if _initialized and _storage is not None:
     return _storage
 
-  if is_postgres_configured():
+  backend = storage_backend()
+  if backend == 'postgres' and not is_postgres_configured():
+    logger.warning('CHAT_STORAGE=postgres but LAKEBASE_PG_URL is not set, using SQLite')
+    backend = 'sqlite'
+
+  if backend == 'postgres':
     logger.info('Initializing PostgreSQL chat storage')
     try:
+      from .cached import CachedUserScopedChatStorage, cache_budget_bytes
       from .postgres import PostgresUserScopedChatStorage
 
       init_database()
       await create_tables()
+      await open_pool()
 
       _storage = PostgresUserScopedChatStorage(max_chats_per_user=max_chats_per_user)
+      if cache_budget_bytes() > 0:
+        _storage = CachedUserScopedChatStorage(_storage)
+        await _storage.open()
+      _backend = 'postgres'
       logger.info('PostgreSQL chat storage initialized successfully')
     except Exception as e:
       logger.error(f'Failed to initialize PostgreSQL storage: {e}')
-      logger.warning('Falling back to in-memory storage')
-      _storage = MemoryUserScopedChatStorage(max_chats_per_user=max_chats_per_user)
+      logger.warning('Falling back to local chat storage')
+      await close_database()
+      _storage = await _local_storage('sqlite', max_chats_per_user)
   else:
-    logger.info('Using in-memory chat storage (LAKEBASE_PG_URL not set)')
-    _storage = MemoryUserScopedChatStorage(max_chats_per_user=max_chats_per_user)
+    logger.info(f'Using {backend} chat storage')
+    _storage = await _local_storage(backend, max_chats_per_user)
 
   _initialized = True
   return _storage
 
 
+async def close_storage():
+  """Close the connections of the global storage, if it holds any (at app shutdown)."""
+  close = getattr(_storage, 'close', None)
+  if close is not None:
+    await close()
+
+
+def active_backend() -> Optional[str]:
+  """Backend of the storage in use: 'postgres', 'sqlite' or 'memory' (None before init).
+
+  Unlike storage_backend(), reflects a fallback after the configured backend failed.
+  """
+  return _backend
+
+
+def cache_stats() -> Optional[dict]:
+  """Statistics of the chat storage cache, or None if the storage is not cached."""
+  stats = getattr(_storage, 'stats', None)
+  return stats() if stats is not None else None
+
+
 def get_storage() -> BaseUserScopedChatStorage:
   """Get the global chat storage instance.
 
   Must call init_storage() first (at app startup).
   If init_storage() wasn't called, falls back to in-memory storage.
   """
-  global _storage
+  global _storage, _backend
 
   if _storage is None:
     logger.warning('get_storage() called before init_storage() - using in-memory storage')
-    _storage = MemoryUserScopedChatStorage(max_chats_per_user=10)
+    _storage = CompactUserScopedChatStorage(max_chats_per_user=10)
+    _backend = 'memory'
 
   return _storage
 
 
 def reset_storage():
   """Reset the global storage instance. Useful for testing."""
-  global _storage, _initialized
-  _storage = None
+  global _storage, _backend, _initialized
+  _storage = _backend = None
   _initialized = False
 
 
 __all__ = [
   'init_storage',
+  'close_storage',
+  'active_backend',
+  'cache_stats',
+  'storage_backend',
   'get_storage',
   'reset_storage',
   'BaseChatStorage',
   'BaseUserScopedChatStorage',
+  'ChatRecord',
+  'Cursor',
+  'CompactChatStorage',
+  'CompactUserScopedChatStorage',
   'MemoryChatStorage',
   'MemoryUserScopedChatStorage',
+  'MessageRecord',
+  'decode_cursor',
+  'encode_cursor',
+  'new_id',
 ]
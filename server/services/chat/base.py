@@ -4,14 +4,70 @@ This module defines the async interface that all chat storage backends must impl
 Uses SQLAlchemy models directly for both memory and PostgreSQL storage.
 """
 
+import base64
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, List, Optional
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 if TYPE_CHECKING:
   from server.db.models import ChatModel
 
 # Import models - they work both attached (PostgreSQL) and detached (memory)
-from server.db.models import ChatModel, MessageModel
+from server.db.models import PREVIEW_LENGTH, ChatModel, MessageModel
+
+# Keyset position: (updated_at, id) of a chat or (timestamp, id) of a message
+Cursor = Tuple[datetime, str]
+
+
+def new_id(prefix: str) -> str:
+  """New chat or message ID: the prefix and a UUIDv7 in hex (e.g. chat_0192b3c4...).
+
+  UUIDv7 starts with the Unix time in milliseconds, so IDs sort by creation
+  time and new rows are appended at the right edge of the primary key index
+  instead of at random pages. The other 74 bits are random. IDs are opaque:
+  older IDs (prefix and 12 random hex digits) remain valid.
+  """
+  unix_ts_ms = time.time_ns() // 1_000_000
+  rand_a = int.from_bytes(os.urandom(2), 'big') & 0xFFF
+  rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+  # Layout: unix_ts_ms (48 bits), version 7 (4), rand_a (12), variant 0b10 (2), rand_b (62)
+  value = unix_ts_ms << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b
+  return f'{prefix}_{value:032x}'
+
+
+def encode_cursor(at: datetime, item_id: str) -> str:
+  """Opaque cursor string for the position of a chat or message."""
+  raw = f'{at.isoformat(timespec="microseconds")}|{item_id}'
+  return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+  """Position encoded by encode_cursor.
+
+  Raises:
+      ValueError: If the cursor is malformed
+  """
+  try:
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    at, item_id = raw.split('|', 1)
+    return datetime.fromisoformat(at), item_id
+  except (ValueError, UnicodeDecodeError) as e:
+    raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def message_preview(content: Optional[str]) -> str:
+  """Start of a message as shown in the chat list (last_message_preview)."""
+  return (content or '')[:PREVIEW_LENGTH]
+
+
+def _chat_position(chat) -> Cursor:
+  return chat.updated_at, chat.id
+
+
+def _message_position(msg) -> Cursor:
+  return msg.timestamp, msg.id
 
 
 class BaseChatStorage(ABC):
@@ -21,6 +77,9 @@ class BaseChatStorage(ABC):
   All methods are async to support non-blocking database operations.
   """
 
+  # Owner of the chats in this storage
+  user_email: str
+
   @abstractmethod
   async def get_all(self) -> List[ChatModel]:
     """Get all chats sorted by updated_at (newest first).
@@ -42,6 +101,121 @@ class BaseChatStorage(ABC):
     """
     pass
 
+  async def get_page(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[ChatModel]:
+    """Get a page of chats sorted by (updated_at, id), newest first.
+
+    Backends with a database override this with a keyset query; the default
+    pages through get_all().
+
+    Args:
+        limit: Maximum number of chats to return
+        before: Only chats older than this position (next page)
+        after: Only chats newer than this position (previous page)
+
+    Returns:
+        Up to limit chats without messages, newest first. With after, the
+        chats closest to the cursor.
+    """
+    chats = sorted(await self.get_all(), key=_chat_position, reverse=True)
+    if before is not None:
+      chats = [chat for chat in chats if _chat_position(chat) < before]
+    if after is not None:
+      chats = [chat for chat in chats if _chat_position(chat) > after]
+      return chats[max(len(chats) - limit, 0):]
+    return chats[:limit]
+
+  async def get_summary(self, chat_id: str) -> Optional[ChatModel]:
+    """Get specific chat by ID without loading its messages.
+
+    Args:
+        chat_id: Chat ID to retrieve
+
+    Returns:
+        ChatModel if found (only use to_dict_summary), None otherwise
+    """
+    return await self.get(chat_id)
+
+  async def get_messages(
+    self,
+    chat_id: str,
+    limit: int,
+    before: Optional[Cursor] = None,
+    after: Optional[Cursor] = None,
+  ) -> Optional[List[MessageModel]]:
+    """Get a page of a chat's messages sorted by (timestamp, id), oldest first.
+
+    Without a cursor this is the latest limit messages, so a long chat opens
+    with its end.
+
+    Args:
+        chat_id: Chat ID to read
+        limit: Maximum number of messages to return
+        before: Only messages older than this position, the closest ones
+        after: Only messages newer than this position, the closest ones
+
+    Returns:
+        Up to limit messages in chronological order, None if chat not found
+    """
+    chat = await self.get(chat_id)
+    if chat is None:
+      return None
+    messages = sorted(chat.messages, key=_message_position)
+    if before is not None:
+      messages = [msg for msg in messages if _message_position(msg) < before]
+    if after is not None:
+      messages = [msg for msg in messages if _message_position(msg) > after]
+      return messages[:limit]
+    return messages[max(len(messages) - limit, 0):]
+
+  async def get_page_summaries(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[dict]:
+    """Response items of GET /chats: get_page() as summary dicts with their cursor.
+
+    Args:
+        limit: Maximum number of chats to return
+        before: Only chats older than this position (next page)
+        after: Only chats newer than this position (previous page)
+
+    Returns:
+        Chat summary dicts, newest first
+    """
+    return [
+      {**chat.to_dict_summary(), 'cursor': encode_cursor(chat.updated_at, chat.id)}
+      for chat in await self.get_page(limit, before=before, after=after)
+    ]
+
+  async def get_document(self, chat_id: str, limit: int) -> Optional[Union[dict, str]]:
+    """Response document of GET /chats/{chat_id}: the chat with its latest messages.
+
+    Backends that can build the document in the database return its JSON
+    text, which is sent as is.
+
+    Args:
+        chat_id: Chat ID to retrieve
+        limit: Maximum number of (latest) messages to include
+
+    Returns:
+        Chat summary with messages, has_more_messages and messages_cursor (the
+        before= cursor of older messages), as a dict or JSON text; None if
+        chat not found
+    """
+    chat = await self.get_summary(chat_id)
+    messages = await self.get_messages(chat_id, limit + 1) if chat else None
+    if chat is None or messages is None:
+      return None
+    has_more = len(messages) > limit
+    if has_more:
+      messages = messages[1:]
+    return {
+      **chat.to_dict_summary(),
+      'messages': [msg.to_dict() for msg in messages],
+      'has_more_messages': has_more,
+      'messages_cursor': encode_cursor(*_message_position(messages[0])) if has_more else None,
+    }
+
   @abstractmethod
   async def create(self, title: str = 'New Chat', agent_id: Optional[str] = None) -> ChatModel:
     """Create new chat.
@@ -68,6 +242,27 @@ class BaseChatStorage(ABC):
     """
     pass
 
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add several messages (e.g. the user and assistant messages of a turn) at once.
+
+    Backends override this to store them in one transaction. As with
+    add_message, the first message sets the title of an empty chat if it is
+    a user message. A backend that defers the write to the end of the
+    request (see server.db.unit_of_work) still returns False for a chat the
+    user does not own.
+
+    Args:
+        chat_id: Chat ID to add messages to
+        msgs: MessageModel objects to add, in order
+
+    Returns:
+        True if successful, False if chat not found
+    """
+    for msg in msgs:
+      if not await self.add_message(chat_id, msg):
+        return False
+    return True
+
   @abstractmethod
   async def update_title(self, chat_id: str, title: str) -> bool:
     """Update chat title.
@@ -93,6 +288,31 @@ class BaseChatStorage(ABC):
     """
     pass
 
+  @abstractmethod
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat.
+
+    Args:
+        chat_id: Chat ID to look up
+
+    Returns:
+        Conversation ID, or None if the chat has none or doesn't exist
+    """
+    pass
+
+  @abstractmethod
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation (does not change updated_at).
+
+    Args:
+        chat_id: Chat ID to update
+        conversation_id: Genie conversation ID
+
+    Returns:
+        True if successful, False if chat not found
+    """
+    pass
+
   @abstractmethod
   async def clear_all(self) -> int:
     """Delete all chats.
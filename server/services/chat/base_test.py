@@ -0,0 +1,96 @@
+"""Tests for the chat storage base: cursors and the default keyset paging."""
+
+import asyncio
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+from server.db import MessageModel
+
+from .base import decode_cursor, encode_cursor
+from .memory import MemoryChatStorage
+
+TIE = datetime(2026, 1, 2, 3, 4, 5)
+
+
+def _b64(raw: str) -> str:
+  return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+  for at, item_id in (
+    (datetime(2026, 1, 2, 3, 4, 5, 6), 'chat_0192b3c4'),
+    (datetime(2026, 1, 2), 'msg_x|with|bars'),
+    (datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 'chat_1'),
+  ):
+    cursor = encode_cursor(at, item_id)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (at, item_id)
+
+
+def test_invalid_cursors():
+  for cursor in ('!!!', _b64('no separator'), _b64('yesterday|chat_1'), 'gA', ''):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+      decode_cursor(cursor)
+
+
+def _walk_chats(storage: MemoryChatStorage, limit: int) -> tuple:
+  """IDs of all chats paged with before=, then again with after= from the last one."""
+
+  async def walk():
+    older, cursor = [], None
+    while True:
+      page = await storage.get_page(limit, before=cursor)
+      if not page:
+        break
+      older.extend(chat.id for chat in page)
+      cursor = (page[-1].updated_at, page[-1].id)
+    newer, cursor = [], (TIE, '')
+    while True:
+      page = await storage.get_page(limit, after=cursor)
+      if not page:
+        break
+      newer[:0] = [chat.id for chat in page]
+      cursor = (page[0].updated_at, page[0].id)
+    return older, newer
+
+  return asyncio.run(walk())
+
+
+def test_chat_pages_with_equal_updated_at():
+  storage = MemoryChatStorage('user@example.com')
+
+  async def create():
+    for _ in range(5):
+      chat = await storage.create()
+      chat.updated_at = TIE
+
+  asyncio.run(create())
+  expected = sorted(storage.chats, reverse=True)
+  assert [chat.id for chat in asyncio.run(storage.get_all())] == expected
+  assert _walk_chats(storage, 2) == (expected, expected)
+
+
+def test_message_pages_with_equal_timestamps():
+  storage = MemoryChatStorage('user@example.com')
+  ids = [f'msg_{i}' for i in range(5)]
+
+  async def walk():
+    chat = await storage.create()
+    messages = [MessageModel(id=i, role='user', content=i, timestamp=TIE) for i in reversed(ids)]
+    await storage.add_messages(chat.id, messages)
+    latest = await storage.get_messages(chat.id, 2)
+    seen = [m.id for m in latest]
+    while True:
+      page = await storage.get_messages(chat.id, 2, before=(TIE, seen[0]))
+      if not page:
+        break
+      seen[:0] = [m.id for m in page]
+    after = await storage.get_messages(chat.id, 10, after=(TIE, ids[1]))
+    return [m.id for m in latest], seen, [m.id for m in after]
+
+  latest, seen, after = asyncio.run(walk())
+  assert latest == ids[-2:]
+  assert seen == ids
+  assert after == ids[2:]
@@ -0,0 +1,429 @@
+"""Hot in-memory cache in front of the PostgreSQL chat storage.
+
+Most reads are for the few most recent chats of a user: the chat list is
+refreshed after every turn and the open chat is reloaded. CachedUserScopedChatStorage
+wraps PostgresUserScopedChatStorage and keeps these results in process memory:
+- Cached: the first page of the chat list (get_page_summaries without a
+  cursor), chat documents (get_document, the JSON text built by PostgreSQL)
+  and chat summaries (get_summary, used to check a chat before a turn)
+- Entries expire after CHAT_CACHE_TTL seconds (default 60); beyond
+  CHAT_CACHE_MB (default 32, 0 disables the cache) the least recently used
+  entries of all users are evicted
+- Any write of a user drops all of their entries, when it is made and again
+  once it is committed (writes may be deferred to the end of the request, see
+  server.db.unit_of_work); a read that started before a write is not cached
+- Other workers are told with NOTIFY on the chat_cache channel (payload: the
+  user email), which each worker LISTENs to on a dedicated connection.
+  CHAT_CACHE_NOTIFY=false turns this off, e.g. with a single worker; the TTL
+  then bounds how stale another worker's cache can be
+
+Hit ratios and sizes are returned by stats() (GET /api/health/database).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from server.db import after_writes, open_raw_connection
+from server.db.models import ChatModel, MessageModel
+
+from .base import BaseChatStorage, BaseUserScopedChatStorage, Cursor
+from .compact import ChatRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MB = 32
+DEFAULT_CACHE_TTL = 60
+CACHE_CHANNEL = 'chat_cache'
+# Seconds before reconnecting a lost LISTEN connection
+_RECONNECT_DELAY = 5
+
+# Rough bytes per entry besides its value: key, tuple and dict slots
+_ENTRY_OVERHEAD = 200
+
+
+def cache_budget_bytes() -> int:
+  """Memory budget of the chat cache, from CHAT_CACHE_MB (0 disables the cache)."""
+  megabytes = float(os.environ.get('CHAT_CACHE_MB') or DEFAULT_CACHE_MB)
+  return int(megabytes * 1024 * 1024)
+
+
+def cache_ttl() -> float:
+  """Seconds a cached read stays valid, from CHAT_CACHE_TTL."""
+  return float(os.environ.get('CHAT_CACHE_TTL') or DEFAULT_CACHE_TTL)
+
+
+def cache_notify() -> bool:
+  """Whether writes are announced to other workers (CHAT_CACHE_NOTIFY, default true).
+
+  Off behind a transaction pooler (PG_POOLER=transaction), which does not support LISTEN.
+  """
+  if (os.environ.get('PG_POOLER') or '').strip().lower() == 'transaction':
+    return False
+  return (os.environ.get('CHAT_CACHE_NOTIFY') or 'true').strip().lower() in ('1', 'true', 'yes')
+
+
+def _value_size(value: Any) -> int:
+  if isinstance(value, str):
+    return sys.getsizeof(value)
+  if isinstance(value, ChatRecord):
+    return value.size
+  return len(json.dumps(value, default=str))
+
+
+class HotCache:
+  """Read results per user, least recently used first, with a TTL and a byte budget."""
+
+  def __init__(
+    self, budget_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic
+  ):
+    """Initialize an empty cache."""
+    self.budget_bytes = budget_bytes
+    self.ttl = ttl
+    self._clock = clock
+    # (user, key) -> (value, size, expiry time)
+    self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[Any, int, float]]' = OrderedDict()
+    self._keys: Dict[str, Set[Hashable]] = defaultdict(set)
+    # Write generation per user, so that reads started before a write are not
+    # stored. Users without entries share _base; their own generation is only
+    # kept while they are a minority. Values come from _counter and are never
+    # reused, so a user whose generation is dropped cannot get an old one back.
+    self._generations: Dict[str, int] = {}
+    self._counter = 0
+    self._base = 0
+    self.size = 0
+    self.hits: Dict[str, int] = defaultdict(int)
+    self.misses: Dict[str, int] = defaultdict(int)
+    self.evictions = 0
+    self.invalidations = 0
+
+  def generation(self, user: str) -> int:
+    """Write generation of a user, to pass to put()."""
+    return self._generations.get(user, self._base)
+
+  def get(self, user: str, key: Tuple) -> Optional[Any]:
+    """Cached value, or None if missing or expired (key[0] names the kind of read)."""
+    entry = self._entries.get((user, key))
+    if entry is not None and entry[2] > self._clock():
+      self._entries.move_to_end((user, key))
+      self.hits[key[0]] += 1
+      return entry[0]
+    if entry is not None:
+      self._evict((user, key))
+    self.misses[key[0]] += 1
+    return None
+
+  def put(self, user: str, key: Tuple, value: Any, generation: int):
+    """Store a value read at the given generation, unless the user wrote since."""
+    if generation != self.generation(user):
+      return
+    size = _ENTRY_OVERHEAD + _value_size(value)
+    if size > self.budget_bytes:
+      return
+    if (user, key) in self._entries:
+      self._drop((user, key))
+    self._entries[(user, key)] = (value, size, self._clock() + self.ttl)
+    self._keys[user].add(key)
+    self.size += size
+    while self.size > self.budget_bytes:
+      self._evict(next(iter(self._entries)))
+      self.evictions += 1
+
+  def invalidate(self, user: str):
+    """Drop the entries of a user and ignore their reads in flight."""
+    self._counter += 1
+    self._generations[user] = self._counter
+    self.invalidations += 1
+    for key in list(self._keys.get(user, ())):
+      self._drop((user, key))
+    if len(self._generations) > 2 * len(self._keys) + 16:
+      # Users who wrote but have nothing cached, e.g. since they left
+      self._generations = {u: g for u, g in self._generations.items() if u in self._keys}
+      self._new_base()
+
+  def clear(self):
+    """Drop all entries and ignore all reads in flight."""
+    self._generations.clear()
+    self._new_base()
+    self._entries.clear()
+    self._keys.clear()
+    self.size = 0
+
+  def _drop(self, entry_key: Tuple[str, Hashable]):
+    user, key = entry_key
+    _, size, _ = self._entries.pop(entry_key)
+    self.size -= size
+    keys = self._keys[user]
+    keys.discard(key)
+    if not keys:
+      del self._keys[user]
+
+  def _evict(self, entry_key: Tuple[str, Hashable]):
+    """Drop an expired or least recently used entry, and the generation of a user left without."""
+    self._drop(entry_key)
+    user = entry_key[0]
+    if user not in self._keys and self._generations.pop(user, None) is not None:
+      self._new_base()
+
+  def _new_base(self):
+    # Users whose generation was dropped now have _base; a new value makes sure
+    # that reads started before their last write are not stored
+    self._counter += 1
+    self._base = self._counter
+
+  def stats(self) -> Dict[str, Any]:
+    """Hit ratio per kind of read, size and eviction counters."""
+    reads = {}
+    for kind in sorted(set(self.hits) | set(self.misses)):
+      hits, misses = self.hits[kind], self.misses[kind]
+      reads[kind] = {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses)}
+    hits, misses = sum(self.hits.values()), sum(self.misses.values())
+    return {
+      'entries': len(self._entries),
+      'bytes': self.size,
+      'budget_bytes': self.budget_bytes,
+      'ttl_seconds': self.ttl,
+      'hits': hits,
+      'misses': misses,
+      'hit_ratio': hits / (hits + misses) if hits + misses else None,
+      'reads': reads,
+      'evictions': self.evictions,
+      'invalidations': self.invalidations,
+    }
+
+
+class CachedChatStorage(BaseChatStorage):
+  """The chats of a single user, with hot reads served from a HotCache."""
+
+  def __init__(self, inner: BaseChatStorage, owner: 'CachedUserScopedChatStorage'):
+    """Wrap the storage of a user."""
+    self.inner = inner
+    self.user_email = inner.user_email
+    self._owner = owner
+
+  async def _cached(self, key: Tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+    cache = self._owner.cache
+    value = cache.get(self.user_email, key)
+    if value is None:
+      generation = cache.generation(self.user_email)
+      value = await load()
+      if value is not None:
+        cache.put(self.user_email, key, value, generation)
+    return value
+
+  async def get_all(self) -> List[ChatModel]:
+    """Get all chats (not cached)."""
+    return await self.inner.get_all()
+
+  async def get(self, chat_id: str) -> Optional[ChatModel]:
+    """Get chat with all its messages (not cached)."""
+    return await self.inner.get(chat_id)
+
+  async def get_page(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[ChatModel]:
+    """Get a page of chats (not cached)."""
+    return await self.inner.get_page(limit, before=before, after=after)
+
+  async def get_summary(self, chat_id: str) -> Optional[ChatModel]:
+    """Get specific chat by ID without its messages (cached)."""
+    return await self._cached(('summary', chat_id), lambda: self.inner.get_summary(chat_id))
+
+  async def get_messages(
+    self,
+    chat_id: str,
+    limit: int,
+    before: Optional[Cursor] = None,
+    after: Optional[Cursor] = None,
+  ) -> Optional[List[MessageModel]]:
+    """Get a page of a chat's messages (not cached)."""
+    return await self.inner.get_messages(chat_id, limit, before=before, after=after)
+
+  async def get_page_summaries(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[dict]:
+    """Get a page of chat summaries; the first page is cached."""
+    if before is not None or after is not None:
+      return await self.inner.get_page_summaries(limit, before=before, after=after)
+    return await self._cached(('list', limit), lambda: self.inner.get_page_summaries(limit))
+
+  async def get_document(self, chat_id: str, limit: int):
+    """Get the chat with its latest messages (cached)."""
+    return await self._cached(
+      ('document', chat_id, limit), lambda: self.inner.get_document(chat_id, limit)
+    )
+
+  async def create(self, title: str = 'New Chat', agent_id: Optional[str] = None) -> ChatModel:
+    """Create new chat."""
+    chat = await self.inner.create(title, agent_id)
+    await self._owner.written(self.user_email)
+    return chat
+
+  async def add_message(self, chat_id: str, msg: MessageModel) -> bool:
+    """Add message to existing chat."""
+    return await self.add_messages(chat_id, [msg])
+
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add messages to existing chat."""
+    added = await self.inner.add_messages(chat_id, msgs)
+    await self._owner.written(self.user_email)
+    return added
+
+  async def update_title(self, chat_id: str, title: str) -> bool:
+    """Update chat title."""
+    updated = await self.inner.update_title(chat_id, title)
+    await self._owner.written(self.user_email)
+    return updated
+
+  async def delete(self, chat_id: str) -> bool:
+    """Delete chat by ID."""
+    deleted = await self.inner.delete(chat_id)
+    await self._owner.written(self.user_email)
+    return deleted
+
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat (cached by the Genie registry)."""
+    return await self.inner.get_genie_conversation(chat_id)
+
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation."""
+    linked = await self.inner.set_genie_conversation(chat_id, conversation_id)
+    await self._owner.written(self.user_email)
+    return linked
+
+  async def clear_all(self) -> int:
+    """Delete all chats."""
+    count = await self.inner.clear_all()
+    await self._owner.written(self.user_email)
+    return count
+
+
+class CachedUserScopedChatStorage(BaseUserScopedChatStorage):
+  """User-scoped storage serving hot reads from memory, backed by another storage.
+
+  Call open() to start listening for the writes of other workers and close()
+  at shutdown.
+  """
+
+  def __init__(
+    self,
+    inner: BaseUserScopedChatStorage,
+    budget_bytes: Optional[int] = None,
+    ttl: Optional[float] = None,
+    notify: Optional[bool] = None,
+  ):
+    """Wrap a user-scoped storage; unset settings come from the environment."""
+    self.inner = inner
+    self.cache = HotCache(
+      budget_bytes if budget_bytes is not None else cache_budget_bytes(),
+      ttl if ttl is not None else cache_ttl(),
+    )
+    self.notify = notify if notify is not None else cache_notify()
+    self._user_storages: Dict[str, CachedChatStorage] = {}
+    self._listener = None
+    self._listener_task: Optional[asyncio.Task] = None
+    self._publish_lock = asyncio.Lock()
+    self.notifications_received = 0
+
+  async def open(self):
+    """Start listening for the writes of other workers (if enabled)."""
+    if self.notify and self._listener_task is None:
+      self._listener_task = asyncio.create_task(self._listen())
+
+  async def close(self):
+    """Stop listening and close the wrapped storage."""
+    if self._listener_task is not None:
+      self._listener_task.cancel()
+      try:
+        await self._listener_task
+      except asyncio.CancelledError:
+        pass
+      self._listener_task = None
+    close = getattr(self.inner, 'close', None)
+    if close is not None:
+      await close()
+
+  async def _listen(self):
+    """Keep a LISTEN connection open, reconnecting when it is lost."""
+    while True:
+      conn = None
+      try:
+        conn = await open_raw_connection()
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+        await conn.add_listener(CACHE_CHANNEL, self._on_notification)
+        # Writes of other workers may have been missed while not listening
+        self.cache.clear()
+        self._listener = conn
+        logger.info(f'Chat cache listening on {CACHE_CHANNEL}')
+        await closed.wait()
+        logger.warning('Chat cache listener disconnected')
+      except asyncio.CancelledError:
+        raise
+      except Exception as e:
+        logger.warning(f'Chat cache listener failed: {e}')
+      finally:
+        self._listener = None
+        if conn is not None and not conn.is_closed():
+          conn.terminate()
+      await asyncio.sleep(_RECONNECT_DELAY)
+
+  def _on_notification(self, conn, pid: int, channel: str, user_email: str):
+    # Own writes are already invalidated
+    if pid != conn.get_server_pid():
+      self.notifications_received += 1
+      self.cache.invalidate(user_email)
+
+  async def _publish(self, user_email: str):
+    conn = self._listener
+    if conn is None:
+      return
+    try:
+      # One query at a time on the connection
+      async with self._publish_lock:
+        await conn.execute('SELECT pg_notify($1, $2)', CACHE_CHANNEL, user_email)
+    except Exception as e:
+      logger.warning(f'Failed to notify chat cache invalidation: {e}')
+
+  async def written(self, user_email: str):
+    """Invalidate a user's entries after a write, and again once it is committed."""
+    self.cache.invalidate(user_email)
+
+    async def committed():
+      self.cache.invalidate(user_email)
+      await self._publish(user_email)
+
+    await after_writes(committed)
+
+  def get_storage_for_user(self, user_email: str) -> BaseChatStorage:
+    """Get or create the cached storage of a user."""
+    if user_email not in self._user_storages:
+      self._user_storages[user_email] = CachedChatStorage(
+        self.inner.get_storage_for_user(user_email), self
+      )
+    return self._user_storages[user_email]
+
+  async def get_all_users(self) -> List[str]:
+    """Get list of all users with chat storage."""
+    return await self.inner.get_all_users()
+
+  async def clear_user_storage(self, user_email: str) -> bool:
+    """Clear all storage for a specific user."""
+    cleared = await self.inner.clear_user_storage(user_email)
+    self._user_storages.pop(user_email, None)
+    await self.written(user_email)
+    return cleared
+
+  def stats(self) -> Dict[str, Any]:
+    """Cache statistics, with the state of cross-worker invalidation."""
+    return {
+      **self.cache.stats(),
+      'notify': self.notify,
+      'listening': self._listener is not None,
+      'notifications_received': self.notifications_received,
+    }
@@ -0,0 +1,148 @@
+"""Tests for the hot chat cache: hits, invalidation, the write generation guard and the TTL."""
+
+import asyncio
+
+from .cached import _ENTRY_OVERHEAD, CachedUserScopedChatStorage, HotCache
+from .memory import MemoryUserScopedChatStorage
+
+USER = 'user@example.com'
+OTHER = 'other@example.com'
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 100.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+def test_hit_and_miss_per_user():
+  cache = HotCache(1024 * 1024, ttl=60)
+  cache.put(USER, ('summary', 'chat_1'), 'value', cache.generation(USER))
+  assert cache.get(USER, ('summary', 'chat_1')) == 'value'
+  assert cache.get(OTHER, ('summary', 'chat_1')) is None
+  assert cache.get(USER, ('summary', 'chat_2')) is None
+  assert cache.stats()['reads']['summary'] == {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3}
+
+
+def test_invalidate_drops_only_the_entries_of_the_user():
+  cache = HotCache(1024 * 1024, ttl=60)
+  for user in (USER, OTHER):
+    cache.put(user, ('list', 20), 'chats', cache.generation(user))
+    cache.put(user, ('document', 'chat_1', 50), 'doc', cache.generation(user))
+  cache.invalidate(USER)
+  assert cache.get(USER, ('list', 20)) is None
+  assert cache.get(USER, ('document', 'chat_1', 50)) is None
+  assert cache.get(OTHER, ('list', 20)) == 'chats'
+  assert cache.stats()['entries'] == 2
+
+
+def test_read_started_before_a_write_is_not_stored():
+  cache = HotCache(1024 * 1024, ttl=60)
+  generation = cache.generation(USER)
+  other_generation = cache.generation(OTHER)
+  cache.invalidate(USER)
+  cache.put(USER, ('list', 20), 'stale', generation)
+  cache.put(OTHER, ('list', 20), 'fresh', other_generation)
+  assert cache.get(USER, ('list', 20)) is None
+  assert cache.get(OTHER, ('list', 20)) == 'fresh'
+
+  cache.put(USER, ('list', 20), 'fresh', cache.generation(USER))
+  assert cache.get(USER, ('list', 20)) == 'fresh'
+
+
+def test_clear_ignores_all_reads_in_flight():
+  cache = HotCache(1024 * 1024, ttl=60)
+  generation = cache.generation(USER)
+  cache.clear()
+  cache.put(USER, ('list', 20), 'stale', generation)
+  assert cache.get(USER, ('list', 20)) is None
+
+
+def test_entries_expire_after_the_ttl():
+  clock = _Clock()
+  cache = HotCache(1024 * 1024, ttl=60, clock=clock)
+  cache.put(USER, ('list', 20), 'chats', cache.generation(USER))
+  clock.now += 59
+  assert cache.get(USER, ('list', 20)) == 'chats'
+  clock.now += 1
+  assert cache.get(USER, ('list', 20)) is None
+  assert cache.stats()['entries'] == 0
+  assert cache.size == 0
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_budget():
+  size = _ENTRY_OVERHEAD + len('["xx"]')
+  cache = HotCache(size * 2, ttl=60)
+  for user in ('a', 'b'):
+    cache.put(user, ('list', 20), ['xx'], cache.generation(user))
+  # Reading `a` makes `b` the least recently used
+  assert cache.get('a', ('list', 20)) == ['xx']
+  cache.put('c', ('list', 20), ['xx'], cache.generation('c'))
+  assert cache.get('b', ('list', 20)) is None
+  assert cache.get('a', ('list', 20)) == ['xx']
+  assert cache.get('c', ('list', 20)) == ['xx']
+  assert cache.size == size * 2
+  assert cache.evictions == 1
+
+
+def test_generation_of_a_user_is_dropped_with_their_last_entry():
+  clock = _Clock()
+  cache = HotCache(1024 * 1024, ttl=60, clock=clock)
+  cache.invalidate(USER)
+  cache.put(USER, ('list', 20), 'chats', cache.generation(USER))
+  assert USER in cache._generations
+
+  clock.now += 60
+  assert cache.get(USER, ('list', 20)) is None
+  assert cache._generations == {}
+
+
+def test_read_before_a_write_is_not_stored_after_the_generation_is_dropped():
+  clock = _Clock()
+  cache = HotCache(1024 * 1024, ttl=60, clock=clock)
+  before_write = cache.generation(USER)
+  cache.invalidate(USER)
+  cache.put(USER, ('summary', 'chat_1'), 'fresh', cache.generation(USER))
+  clock.now += 60
+  # Expiry drops the last entry of the user and their generation
+  assert cache.get(USER, ('summary', 'chat_1')) is None
+
+  cache.put(USER, ('list', 20), 'stale', before_write)
+  assert cache.get(USER, ('list', 20)) is None
+
+
+def test_generations_of_users_without_entries_are_bounded():
+  cache = HotCache(1024 * 1024, ttl=60)
+  in_flight = cache.generation(USER)
+  for i in range(1000):
+    cache.invalidate(f'user{i}@example.com')
+  assert len(cache._generations) <= 17
+
+  cache.put(USER, ('list', 20), 'stale', in_flight)
+  assert cache.get(USER, ('list', 20)) is None
+  cache.put('user1@example.com', ('list', 20), 'fresh', cache.generation('user1@example.com'))
+  assert cache.get('user1@example.com', ('list', 20)) == 'fresh'
+
+
+def test_storage_serves_hot_reads_until_a_write():
+  storage = CachedUserScopedChatStorage(
+    MemoryUserScopedChatStorage(), budget_bytes=1024 * 1024, ttl=60, notify=False
+  )
+  user_storage = storage.get_storage_for_user(USER)
+
+  async def run():
+    chat = await user_storage.create('First')
+    first = await user_storage.get_page_summaries(20)
+    inner = storage.inner.get_storage_for_user(USER)
+    inner.chats[chat.id].title = 'Changed behind the cache'
+    cached = await user_storage.get_page_summaries(20)
+    await user_storage.update_title(chat.id, 'Renamed')
+    return first, cached, await user_storage.get_page_summaries(20)
+
+  first, cached, after_write = asyncio.run(run())
+  assert cached == first
+  assert [chat['title'] for chat in cached] == ['First']
+  assert [chat['title'] for chat in after_write] == ['Renamed']
+  assert storage.stats()['reads']['list'] == {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3}
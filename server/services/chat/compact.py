@@ -0,0 +1,411 @@
+"""Compact in-memory chat storage with a process-wide memory budget.
+
+Stores chats and messages as small `__slots__` records instead of detached
+SQLAlchemy models, which carry ORM instrumentation state per instance:
+- Chats of a user are kept ordered by updated_at (oldest first), so listing
+  them and dropping the oldest one need no sorting
+- Every record carries an estimated size in bytes; the sizes add up to the
+  memory used by all users
+- When the total exceeds the budget (CHAT_MEMORY_BUDGET_MB, default 256),
+  the least recently active users are evicted first, then the oldest chats
+  of the current user
+- Records are converted to the API dict shape only when a response is built
+  (to_dict / to_dict_summary, same shape as the SQLAlchemy models)
+
+Like the other in-memory storage, chats only live as long as the process.
+"""
+
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from server.db.models import MessageModel
+
+from .base import BaseChatStorage, BaseUserScopedChatStorage, message_preview, new_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Rough bytes per record besides its strings: the object, its slots and datetimes
+_RECORD_OVERHEAD = 200
+
+
+def memory_budget_bytes() -> int:
+  """Memory budget of the in-memory chat storage, from CHAT_MEMORY_BUDGET_MB."""
+  megabytes = float(os.environ.get('CHAT_MEMORY_BUDGET_MB') or DEFAULT_MEMORY_BUDGET_MB)
+  return int(megabytes * 1024 * 1024)
+
+
+def _text_size(value: Optional[str]) -> int:
+  return sys.getsizeof(value) if value is not None else 0
+
+
+class MessageRecord:
+  """A chat message, with the fields of MessageModel."""
+
+  __slots__ = (
+    'id',
+    'chat_id',
+    'role',
+    'content',
+    'timestamp',
+    'trace_id',
+    'trace_summary',
+    'is_error',
+    'size',
+  )
+
+  def __init__(
+    self,
+    id: str,
+    chat_id: str,
+    role: str,
+    content: str,
+    timestamp: datetime,
+    trace_id: Optional[str] = None,
+    trace_summary: Optional[Dict[str, Any]] = None,
+    is_error: bool = False,
+    size: int = 0,
+  ):
+    """Initialize the record; `size` is its estimated memory use, if tracked."""
+    self.id = id
+    self.chat_id = chat_id
+    self.role = role
+    self.content = content
+    self.timestamp = timestamp
+    self.trace_id = trace_id
+    self.trace_summary = trace_summary
+    self.is_error = is_error
+    self.size = size
+
+  @classmethod
+  def from_message(cls, msg: MessageModel, chat_id: str) -> 'MessageRecord':
+    """Copy a message (e.g. a MessageModel built by a router) into a record, with its size."""
+    trace_summary = msg.trace_summary
+    return cls(
+      id=msg.id,
+      chat_id=chat_id,
+      role=msg.role,
+      content=msg.content or '',
+      timestamp=msg.timestamp or datetime.now(),
+      trace_id=msg.trace_id,
+      trace_summary=trace_summary,
+      is_error=bool(msg.is_error),
+      size=(
+        _RECORD_OVERHEAD
+        + _text_size(msg.id)
+        + _text_size(msg.content)
+        + _text_size(msg.trace_id)
+        + (len(json.dumps(trace_summary, default=str)) if trace_summary else 0)
+      ),
+    )
+
+  def to_dict(self) -> dict:
+    """Convert to dictionary for JSON serialization."""
+    return {
+      'id': self.id,
+      'chat_id': self.chat_id,
+      'role': self.role,
+      'content': self.content,
+      'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+      'trace_id': self.trace_id,
+      'trace_summary': self.trace_summary,
+      'is_error': self.is_error,
+    }
+
+
+class ChatRecord:
+  """A chat session with its messages, with the fields of ChatModel."""
+
+  __slots__ = (
+    'id',
+    'user_email',
+    'title',
+    'agent_id',
+    'genie_conversation_id',
+    'created_at',
+    'updated_at',
+    'message_count',
+    'last_message_at',
+    'last_message_preview',
+    'messages',
+    'size',
+  )
+
+  def __init__(
+    self,
+    id: str,
+    user_email: str,
+    title: str,
+    agent_id: Optional[str],
+    created_at: datetime,
+  ):
+    """Initialize an empty chat and estimate its size."""
+    self.id = id
+    self.user_email = user_email
+    self.title = title
+    self.agent_id = agent_id
+    self.genie_conversation_id: Optional[str] = None
+    self.created_at = created_at
+    self.updated_at = created_at
+    self.message_count = 0
+    self.last_message_at: Optional[datetime] = None
+    self.last_message_preview: Optional[str] = None
+    self.messages: List[MessageRecord] = []
+    self.size = _RECORD_OVERHEAD + _text_size(id) + _text_size(title) + _text_size(agent_id)
+
+  def to_dict(self) -> dict:
+    """Convert to dictionary for JSON serialization (includes messages)."""
+    return {
+      **self.to_dict_summary(),
+      'messages': [msg.to_dict() for msg in self.messages],
+    }
+
+  def to_dict_summary(self) -> dict:
+    """Convert to summary dictionary (excludes messages for list views)."""
+    return {
+      'id': self.id,
+      'user_email': self.user_email,
+      'title': self.title,
+      'agent_id': self.agent_id,
+      'created_at': self.created_at.isoformat() if self.created_at else None,
+      'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+      'message_count': self.message_count,
+      'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+      'last_message_preview': self.last_message_preview,
+    }
+
+
+class CompactChatStorage(BaseChatStorage):
+  """Compact in-memory storage for the chats of a single user.
+
+  Features:
+  - Stores up to max_chats (default 10), dropping the oldest
+  - Chats ordered by updated_at, newest last
+  - Reports size changes to the owning CompactUserScopedChatStorage
+  """
+
+  def __init__(
+    self,
+    user_email: str,
+    max_chats: int = 10,
+    owner: Optional['CompactUserScopedChatStorage'] = None,
+  ):
+    """Initialize storage with user email, max chat limit and the owner tracking memory."""
+    self.user_email = user_email
+    self.max_chats = max_chats
+    self.chats: 'OrderedDict[str, ChatRecord]' = OrderedDict()
+    self.size = 0
+    self.evicted = False
+    self._owner = owner
+
+  def _charge(self, delta: int):
+    self.size += delta
+    if self._owner is not None and not self.evicted:
+      self._owner._charge(self, delta)
+
+  def _touch(self, chat: ChatRecord):
+    """Mark a chat as updated now, moving it to the end of the order."""
+    chat.updated_at = datetime.now()
+    self.chats.move_to_end(chat.id)
+
+  def _drop(self, chat_id: str) -> bool:
+    chat = self.chats.pop(chat_id, None)
+    if chat is None:
+      return False
+    self._charge(-chat.size)
+    return True
+
+  async def get_all(self) -> List[ChatRecord]:
+    """Get all chats sorted by updated_at (newest first)."""
+    return list(reversed(self.chats.values()))
+
+  async def get(self, chat_id: str) -> Optional[ChatRecord]:
+    """Get specific chat by ID."""
+    return self.chats.get(chat_id)
+
+  async def create(self, title: str = 'New Chat', agent_id: Optional[str] = None) -> ChatRecord:
+    """Create new chat.
+
+    If max_chats limit reached, deletes the oldest chat.
+    """
+    while self.chats and len(self.chats) >= self.max_chats:
+      self._drop(next(iter(self.chats)))
+
+    chat = ChatRecord(
+      id=new_id('chat'),
+      user_email=self.user_email,
+      title=title,
+      agent_id=agent_id,
+      created_at=datetime.now(),
+    )
+    self.chats[chat.id] = chat
+    self._charge(chat.size)
+    return chat
+
+  async def add_message(self, chat_id: str, msg: MessageModel) -> bool:
+    """Add message to existing chat."""
+    return await self.add_messages(chat_id, [msg])
+
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add messages to existing chat, charging their size to the budget once."""
+    chat = self.chats.get(chat_id)
+    if not chat:
+      return False
+
+    records = [MessageRecord.from_message(msg, chat_id) for msg in msgs]
+    delta = sum(record.size for record in records)
+    # Auto-generate title from first user message
+    if records and not chat.messages and records[0].role == 'user':
+      content = records[0].content
+      title = content[:50] + ('...' if len(content) > 50 else '')
+      delta += _text_size(title) - _text_size(chat.title)
+      chat.title = title
+    if records:
+      preview = message_preview(records[-1].content)
+      delta += _text_size(preview) - _text_size(chat.last_message_preview)
+      chat.message_count += len(records)
+      chat.last_message_at = records[-1].timestamp
+      chat.last_message_preview = preview
+    chat.messages.extend(records)
+    self._touch(chat)
+    chat.size += delta
+    self._charge(delta)
+    return True
+
+  async def update_title(self, chat_id: str, title: str) -> bool:
+    """Update chat title."""
+    chat = self.chats.get(chat_id)
+    if not chat:
+      return False
+    delta = _text_size(title) - _text_size(chat.title)
+    chat.title = title
+    chat.size += delta
+    self._touch(chat)
+    self._charge(delta)
+    return True
+
+  async def delete(self, chat_id: str) -> bool:
+    """Delete chat by ID."""
+    return self._drop(chat_id)
+
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat."""
+    chat = self.chats.get(chat_id)
+    return chat.genie_conversation_id if chat else None
+
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation."""
+    chat = self.chats.get(chat_id)
+    if not chat:
+      return False
+    chat.genie_conversation_id = conversation_id
+    return True
+
+  async def clear_all(self) -> int:
+    """Delete all chats."""
+    count = len(self.chats)
+    self.chats.clear()
+    self._charge(-self.size)
+    return count
+
+
+class CompactUserScopedChatStorage(BaseUserScopedChatStorage):
+  """User-scoped compact in-memory chat storage with a memory budget.
+
+  Users are kept in least recently active order. When the estimated size of
+  all chats exceeds the budget, whole users are evicted starting with the
+  least recently active one; if the current user alone exceeds it, their
+  oldest chats are dropped.
+  """
+
+  def __init__(self, max_chats_per_user: int = 10, budget_bytes: Optional[int] = None):
+    """Initialize user-scoped storage.
+
+    Args:
+      max_chats_per_user: Chats kept per user
+      budget_bytes: Memory budget for all users (default from CHAT_MEMORY_BUDGET_MB)
+    """
+    self._user_storages: 'OrderedDict[str, CompactChatStorage]' = OrderedDict()
+    self._max_chats_per_user = max_chats_per_user
+    self.budget_bytes = budget_bytes if budget_bytes is not None else memory_budget_bytes()
+    self.used_bytes = 0
+    self.evicted_users = 0
+    self.evicted_chats = 0
+
+  def get_storage_for_user(self, user_email: str) -> BaseChatStorage:
+    """Get or create CompactChatStorage for a specific user, marking them active."""
+    user_storage = self._user_storages.get(user_email)
+    if user_storage is None:
+      user_storage = CompactChatStorage(
+        user_email=user_email,
+        max_chats=self._max_chats_per_user,
+        owner=self,
+      )
+      self._user_storages[user_email] = user_storage
+    else:
+      self._user_storages.move_to_end(user_email)
+    return user_storage
+
+  async def get_all_users(self) -> List[str]:
+    """Get list of all users with chat storage."""
+    return list(self._user_storages.keys())
+
+  async def clear_user_storage(self, user_email: str) -> bool:
+    """Clear all storage for a specific user."""
+    user_storage = self._user_storages.pop(user_email, None)
+    if user_storage is None:
+      return False
+    self._detach(user_storage)
+    return True
+
+  def stats(self) -> Dict[str, Any]:
+    """Memory use and eviction counters."""
+    return {
+      'users': len(self._user_storages),
+      'chats': sum(len(s.chats) for s in self._user_storages.values()),
+      'used_bytes': self.used_bytes,
+      'budget_bytes': self.budget_bytes,
+      'evicted_users': self.evicted_users,
+      'evicted_chats': self.evicted_chats,
+    }
+
+  # ---------- Budget internals ----------
+
+  def _detach(self, user_storage: CompactChatStorage):
+    """Forget a user's storage; handlers still holding it see no chats."""
+    self.used_bytes -= user_storage.size
+    user_storage.evicted = True
+    user_storage.chats.clear()
+    user_storage.size = 0
+
+  def _charge(self, user_storage: CompactChatStorage, delta: int):
+    self.used_bytes += delta
+    if delta > 0 and self.used_bytes > self.budget_bytes:
+      self._evict(user_storage)
+
+  def _evict(self, active: CompactChatStorage):
+    """Bring memory use under the budget, sparing `active` as long as possible."""
+    for user_email in list(self._user_storages):
+      if self.used_bytes <= self.budget_bytes:
+        return
+      user_storage = self._user_storages[user_email]
+      if user_storage is active:
+        continue
+      del self._user_storages[user_email]
+      self.evicted_chats += len(user_storage.chats)
+      self.evicted_users += 1
+      self._detach(user_storage)
+      logger.info(f'Chat memory budget exceeded, evicted idle user {user_email}')
+
+    # The active user alone is over budget: drop their oldest chats, keeping the newest
+    while self.used_bytes > self.budget_bytes and len(active.chats) > 1:
+      chat_id = next(iter(active.chats))
+      active._drop(chat_id)
+      self.evicted_chats += 1
+      logger.info(f'Chat memory budget exceeded, dropped chat {chat_id} of {active.user_email}')
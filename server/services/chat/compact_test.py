@@ -0,0 +1,54 @@
+"""Tests for the compact in-memory chat storage and its memory budget."""
+
+import asyncio
+
+from server.db import MessageModel
+
+from .compact import CompactUserScopedChatStorage
+
+
+def _message(chars: int) -> MessageModel:
+  return MessageModel(id=f'msg_{chars}', role='user', content='x' * chars)
+
+
+async def _chat_with(storage, chars: int) -> str:
+  chat = await storage.create()
+  assert await storage.add_messages(chat.id, [_message(chars)])
+  return chat.id
+
+
+def test_budget_evicts_least_recently_active_users_then_oldest_chats(monkeypatch):
+  # 10 KiB: room for three users with a small chat each, not for a fourth chat
+  monkeypatch.setenv('CHAT_MEMORY_BUDGET_MB', str(10 / 1024))
+  users = CompactUserScopedChatStorage()
+  assert users.budget_bytes == 10 * 1024
+
+  async def run():
+    a, b, c = (users.get_storage_for_user(f'{name}@example.com') for name in 'abc')
+    for storage in (a, b, c):
+      await _chat_with(storage, 2000)
+    assert users.stats()['evicted_users'] == 0
+
+    # `a` is active again, leaving `b` the least recently active user
+    users.get_storage_for_user('a@example.com')
+    c_first = next(iter(c.chats))
+    c_second = await _chat_with(c, 3000)
+    assert await users.get_all_users() == ['c@example.com', 'a@example.com']
+    assert b.evicted and not b.chats
+    assert len(a.chats) == 1 and list(c.chats) == [c_first, c_second]
+
+    # Over budget again: `a` goes before any chat of the active user `c`
+    await c.add_messages(c_second, [_message(2500)])
+    assert await users.get_all_users() == ['c@example.com']
+    assert a.evicted and list(c.chats) == [c_first, c_second]
+
+    # Only the active user is left: their oldest chat is dropped
+    c_third = await _chat_with(c, 1000)
+    assert list(c.chats) == [c_second, c_third]
+
+  asyncio.run(run())
+  stats = users.stats()
+  assert stats['evicted_users'] == 2
+  assert stats['evicted_chats'] == 3
+  assert stats['users'] == 1 and stats['chats'] == 2
+  assert users.used_bytes == users._user_storages['c@example.com'].size <= users.budget_bytes
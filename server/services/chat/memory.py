@@ -7,13 +7,12 @@ Uses SQLAlchemy models in detached mode (not connected to any database).
 - User isolation via email-scoped storage
 """
 
-import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
 
 from server.db.models import ChatModel, MessageModel
 
-from .base import BaseChatStorage, BaseUserScopedChatStorage
+from .base import BaseChatStorage, BaseUserScopedChatStorage, message_preview, new_id
 
 
 class MemoryChatStorage(BaseChatStorage):
@@ -34,7 +33,7 @@ class MemoryChatStorage(BaseChatStorage):
 
   async def get_all(self) -> List[ChatModel]:
     """Get all chats sorted by updated_at (newest first)."""
-    return sorted(self.chats.values(), key=lambda c: c.updated_at, reverse=True)
+    return sorted(self.chats.values(), key=lambda c: (c.updated_at, c.id), reverse=True)
 
   async def get(self, chat_id: str) -> Optional[ChatModel]:
     """Get specific chat by ID."""
@@ -51,7 +50,7 @@ class MemoryChatStorage(BaseChatStorage):
       del self.chats[oldest.id]
 
     # Create new chat using SQLAlchemy model (detached)
-    chat_id = f'chat_{uuid.uuid4().hex[:12]}'
+    chat_id = new_id('chat')
     now = datetime.now()
     new_chat = ChatModel(
       id=chat_id,
@@ -60,6 +59,7 @@ class MemoryChatStorage(BaseChatStorage):
       agent_id=agent_id,
       created_at=now,
       updated_at=now,
+      message_count=0,
     )
     # Initialize messages list for detached model
     new_chat.messages = []
@@ -73,10 +73,15 @@ class MemoryChatStorage(BaseChatStorage):
     if not chat:
       return False
 
-    # Set the chat_id on the message
+    # Set the chat_id on the message (and the timestamp messages are paged by)
     msg.chat_id = chat_id
+    if msg.timestamp is None:
+      msg.timestamp = datetime.now()
     chat.messages.append(msg)
     chat.updated_at = datetime.now()
+    chat.message_count = len(chat.messages)
+    chat.last_message_at = msg.timestamp
+    chat.last_message_preview = message_preview(msg.content)
 
     # Auto-generate title from first user message
     if len(chat.messages) == 1 and msg.role == 'user':
@@ -84,6 +89,14 @@ class MemoryChatStorage(BaseChatStorage):
 
     return True
 
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add messages to existing chat."""
+    if chat_id not in self.chats:
+      return False
+    for msg in msgs:
+      await self.add_message(chat_id, msg)
+    return True
+
   async def update_title(self, chat_id: str, title: str) -> bool:
     """Update chat title."""
     chat = self.chats.get(chat_id)
@@ -100,6 +113,19 @@ class MemoryChatStorage(BaseChatStorage):
       return True
     return False
 
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat."""
+    chat = self.chats.get(chat_id)
+    return chat.genie_conversation_id if chat else None
+
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation."""
+    chat = self.chats.get(chat_id)
+    if not chat:
+      return False
+    chat.genie_conversation_id = conversation_id
+    return True
+
   async def clear_all(self) -> int:
     """Delete all chats."""
     count = len(self.chats)
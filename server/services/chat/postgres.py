@@ -2,18 +2,252 @@
 
 This module provides persistent chat storage using PostgreSQL with async SQLAlchemy.
 All database operations are non-blocking.
+
+Reads skip the ORM: they run prebuilt Core statements on an autocommit
+connection (read_scope: no session, no BEGIN/COMMIT) and return plain rows,
+turned into the ChatRecord / MessageRecord of the compact memory storage.
+A chat with its messages is returned by PostgreSQL as the finished JSON
+response document (json_build_object / json_agg), which the router sends
+without decoding it.
+
+Writes are single statements. Inside a request (server.db.unit_of_work),
+storing messages and linking a Genie conversation are deferred and committed
+together (at flush_writes() or when the request ends), so the writes of a
+chat turn share one connection checkout and transaction.
 """
 
-import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import delete, func, select
-from sqlalchemy.orm import selectinload
-
-from server.db import ChatModel, MessageModel, session_scope
-
-from .base import BaseChatStorage, BaseUserScopedChatStorage
+from sqlalchemy import (
+  bindparam,
+  case,
+  column,
+  delete,
+  insert,
+  select,
+  text,
+  true,
+  tuple_,
+  update,
+  values,
+)
+
+from server.db import (
+  ChatModel,
+  MessageModel,
+  close_database,
+  defer_write,
+  read_scope,
+  session_scope,
+)
+
+from .base import (
+  BaseChatStorage,
+  BaseUserScopedChatStorage,
+  Cursor,
+  encode_cursor,
+  message_preview,
+  new_id,
+)
+from .compact import ChatRecord, MessageRecord
+
+# Opaque message cursor in SQL (base64url of "<timestamp>|<id>", see base.encode_cursor)
+_MESSAGE_CURSOR_SQL = (
+  "rtrim(translate(encode(convert_to((to_json(p.timestamp) #>> '{}') || '|' || p.id, 'UTF8'), "
+  "'base64'), E'+/\\n', '-_'), '=')"
+)
+
+# GET /chats/{chat_id} document: chat summary, latest :limit messages, paging fields
+_CHAT_DOCUMENT = text(
+  f"""
+WITH latest AS (
+  SELECT id, chat_id, role, content, timestamp, trace_id, trace_summary, is_error
+  FROM messages
+  WHERE chat_id = :chat_id
+  ORDER BY timestamp DESC, id DESC
+  LIMIT :fetch
+), page AS (
+  SELECT * FROM latest ORDER BY timestamp DESC, id DESC LIMIT :limit
+)
+SELECT json_build_object(
+  'id', c.id,
+  'user_email', c.user_email,
+  'title', c.title,
+  'agent_id', c.agent_id,
+  'created_at', c.created_at,
+  'updated_at', c.updated_at,
+  'message_count', c.message_count,
+  'last_message_at', c.last_message_at,
+  'last_message_preview', c.last_message_preview,
+  'messages', COALESCE(
+    (
+      SELECT json_agg(
+        json_build_object(
+          'id', p.id,
+          'chat_id', p.chat_id,
+          'role', p.role,
+          'content', p.content,
+          'timestamp', p.timestamp,
+          'trace_id', p.trace_id,
+          'trace_summary', p.trace_summary,
+          'is_error', p.is_error
+        )
+        ORDER BY p.timestamp, p.id
+      )
+      FROM page p
+    ),
+    '[]'::json
+  ),
+  'has_more_messages', (SELECT count(*) FROM latest) > :limit,
+  'messages_cursor', CASE WHEN (SELECT count(*) FROM latest) > :limit THEN (
+    SELECT {_MESSAGE_CURSOR_SQL} FROM page p ORDER BY p.timestamp, p.id LIMIT 1
+  ) END
+)::text
+FROM chats c
+WHERE c.id = :chat_id AND c.user_email = :user_email
+"""
+)
+
+_chats = ChatModel.__table__
+_messages = MessageModel.__table__
+
+# All in ix_chats_user_updated, so chat list pages are index-only scans
+_SUMMARY_COLUMNS = (
+  _chats.c.id,
+  _chats.c.title,
+  _chats.c.agent_id,
+  _chats.c.genie_conversation_id,
+  _chats.c.created_at,
+  _chats.c.updated_at,
+  _chats.c.message_count,
+  _chats.c.last_message_at,
+  _chats.c.last_message_preview,
+)
+_MESSAGE_COLUMNS = (
+  _messages.c.id,
+  _messages.c.role,
+  _messages.c.content,
+  _messages.c.timestamp,
+  _messages.c.trace_id,
+  _messages.c.trace_summary,
+  _messages.c.is_error,
+)
+# Columns written by add_messages, in the order of its VALUES rows
+_INSERT_COLUMNS = (
+  _messages.c.id,
+  _messages.c.chat_id,
+  _messages.c.role,
+  _messages.c.content,
+  _messages.c.timestamp,
+  _messages.c.trace_id,
+  _messages.c.trace_summary,
+  _messages.c.is_error,
+)
+_OWN_CHAT = (_chats.c.id == bindparam('chat_id')) & (_chats.c.user_email == bindparam('user_email'))
+
+# Read statements are built once; SQLAlchemy reuses their compiled form and
+# asyncpg its prepared statement for the SQL text
+_LIST_CHATS = (
+  select(*_SUMMARY_COLUMNS)
+  .where(_chats.c.user_email == bindparam('user_email'))
+  .order_by(_chats.c.updated_at.desc(), _chats.c.id.desc())
+)
+_GET_CHAT = select(*_SUMMARY_COLUMNS).where(_OWN_CHAT)
+_GET_MESSAGES = (
+  select(*_MESSAGE_COLUMNS)
+  .where(_messages.c.chat_id == bindparam('chat_id'))
+  .order_by(_messages.c.timestamp, _messages.c.id)
+)
+_GET_GENIE_CONVERSATION = select(_chats.c.genie_conversation_id).where(_OWN_CHAT)
+_CHAT_EXISTS = select(_chats.c.id).where(_OWN_CHAT)
+_LIST_USERS = select(_chats.c.user_email).distinct()
+
+
+def _page_stmt(columns, owner, position, before: bool, after: bool):
+  """Keyset page on position = (timestamp, id): newest first, or closest first after a cursor.
+
+  Binds: the owner's, limit, and before_at/before_id or after_at/after_id.
+  """
+  at, item_id = position
+  stmt = select(*columns).where(owner)
+  if before:
+    stmt = stmt.where(
+      tuple_(at, item_id) < tuple_(
+        bindparam('before_at', type_=at.type), bindparam('before_id', type_=item_id.type)
+      )
+    )
+  if after:
+    stmt = stmt.where(
+      tuple_(at, item_id) > tuple_(
+        bindparam('after_at', type_=at.type), bindparam('after_id', type_=item_id.type)
+      )
+    )
+    stmt = stmt.order_by(at.asc(), item_id.asc())
+  else:
+    stmt = stmt.order_by(at.desc(), item_id.desc())
+  return stmt.limit(bindparam('limit'))
+
+
+# Page statements by (before, after)
+_CHAT_PAGES = {
+  (before, after): _page_stmt(
+    _SUMMARY_COLUMNS,
+    _chats.c.user_email == bindparam('user_email'),
+    (_chats.c.updated_at, _chats.c.id),
+    before,
+    after,
+  )
+  for before in (False, True)
+  for after in (False, True)
+}
+_MESSAGE_PAGES = {
+  (before, after): _page_stmt(
+    _MESSAGE_COLUMNS,
+    _messages.c.chat_id == bindparam('chat_id'),
+    (_messages.c.timestamp, _messages.c.id),
+    before,
+    after,
+  )
+  for before in (False, True)
+  for after in (False, True)
+}
+
+
+def _page_params(
+  params: dict, limit: int, before: Optional[Cursor], after: Optional[Cursor]
+) -> dict:
+  params['limit'] = limit
+  if before is not None:
+    params['before_at'], params['before_id'] = before
+  if after is not None:
+    params['after_at'], params['after_id'] = after
+  return params
+
+
+def _chat_record(user_email: str, row) -> ChatRecord:
+  chat_id, title, agent_id, genie_conversation_id, created_at, updated_at, *summary = row
+  chat = ChatRecord(
+    id=chat_id, user_email=user_email, title=title, agent_id=agent_id, created_at=created_at
+  )
+  chat.genie_conversation_id = genie_conversation_id
+  chat.updated_at = updated_at
+  chat.message_count, chat.last_message_at, chat.last_message_preview = summary
+  return chat
+
+
+def _message_record(chat_id: str, row) -> MessageRecord:
+  message_id, role, content, timestamp, trace_id, trace_summary, is_error = row
+  return MessageRecord(
+    id=message_id,
+    chat_id=chat_id,
+    role=role,
+    content=content,
+    timestamp=timestamp,
+    trace_id=trace_id,
+    trace_summary=trace_summary,
+    is_error=is_error,
+  )
 
 
 class PostgresChatStorage(BaseChatStorage):
@@ -31,134 +265,257 @@ class PostgresChatStorage(BaseChatStorage):
     self.user_email = user_email
     self.max_chats = max_chats
 
-  async def get_all(self) -> List[ChatModel]:
+  async def get_all(self) -> List[ChatRecord]:
     """Get all chats sorted by updated_at (newest first).
 
     Note: Does NOT load messages for performance. Use get() to fetch full chat.
     """
-    async with session_scope() as session:
-      stmt = (
-        select(ChatModel)
-        .where(ChatModel.user_email == self.user_email)
-        .order_by(ChatModel.updated_at.desc())
-      )
-      result = await session.execute(stmt)
-      chats = result.scalars().all()
-      # Return detached copies (without messages loaded)
-      return list(chats)
-
-  async def get(self, chat_id: str) -> Optional[ChatModel]:
-    """Get specific chat by ID."""
-    async with session_scope() as session:
-      stmt = (
-        select(ChatModel)
-        .options(selectinload(ChatModel.messages))
-        .where(
-          ChatModel.id == chat_id,
-          ChatModel.user_email == self.user_email,
-        )
-      )
-      result = await session.execute(stmt)
+    async with read_scope() as conn:
+      result = await conn.execute(_LIST_CHATS, {'user_email': self.user_email})
+      return [_chat_record(self.user_email, row) for row in result]
+
+  async def _chat_page(
+    self, limit: int, before: Optional[Cursor], after: Optional[Cursor]
+  ) -> list:
+    """Summary rows of a keyset page on (updated_at, id), newest first."""
+    stmt = _CHAT_PAGES[before is not None, after is not None]
+    params = _page_params({'user_email': self.user_email}, limit, before, after)
+    async with read_scope() as conn:
+      rows = (await conn.execute(stmt, params)).all()
+    # Pages after a cursor are read closest first
+    if after is not None:
+      rows.reverse()
+    return rows
+
+  async def get_page(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[ChatRecord]:
+    """Get a page of chats, newest first, by a keyset query on (updated_at, id)."""
+    rows = await self._chat_page(limit, before, after)
+    return [_chat_record(self.user_email, row) for row in rows]
+
+  async def get_page_summaries(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[dict]:
+    """Chat summary dicts of a page, built straight from the row tuples."""
+    return [
+      {
+        'id': chat_id,
+        'user_email': self.user_email,
+        'title': title,
+        'agent_id': agent_id,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'message_count': message_count,
+        'last_message_at': last_message_at.isoformat() if last_message_at else None,
+        'last_message_preview': last_message_preview,
+        'cursor': encode_cursor(updated_at, chat_id),
+      }
+      for (
+        chat_id,
+        title,
+        agent_id,
+        _,
+        created_at,
+        updated_at,
+        message_count,
+        last_message_at,
+        last_message_preview,
+      ) in await self._chat_page(limit, before, after)
+    ]
+
+  async def get_document(self, chat_id: str, limit: int) -> Optional[str]:
+    """JSON text of the chat with its latest messages, built by PostgreSQL."""
+    params = {'chat_id': chat_id, 'user_email': self.user_email, 'limit': limit, 'fetch': limit + 1}
+    async with read_scope() as conn:
+      result = await conn.execute(_CHAT_DOCUMENT, params)
       return result.scalar_one_or_none()
 
+  async def get_summary(self, chat_id: str) -> Optional[ChatRecord]:
+    """Get specific chat by ID without loading its messages."""
+    async with read_scope() as conn:
+      result = await conn.execute(_GET_CHAT, {'chat_id': chat_id, 'user_email': self.user_email})
+      row = result.first()
+    return _chat_record(self.user_email, row) if row else None
+
+  async def get_messages(
+    self,
+    chat_id: str,
+    limit: int,
+    before: Optional[Cursor] = None,
+    after: Optional[Cursor] = None,
+  ) -> Optional[List[MessageRecord]]:
+    """Get a page of a chat's messages, by a keyset query on (timestamp, id)."""
+    stmt = _MESSAGE_PAGES[before is not None, after is not None]
+    params = _page_params({'chat_id': chat_id}, limit, before, after)
+    async with read_scope() as conn:
+      owner = {'chat_id': chat_id, 'user_email': self.user_email}
+      if (await conn.execute(_GET_CHAT, owner)).first() is None:
+        return None
+      rows = (await conn.execute(stmt, params)).all()
+    # Latest messages are read newest first
+    if after is None:
+      rows.reverse()
+    return [_message_record(chat_id, row) for row in rows]
+
+  async def get(self, chat_id: str) -> Optional[ChatRecord]:
+    """Get specific chat by ID, with its messages."""
+    async with read_scope() as conn:
+      result = await conn.execute(_GET_CHAT, {'chat_id': chat_id, 'user_email': self.user_email})
+      row = result.first()
+      if row is None:
+        return None
+      chat = _chat_record(self.user_email, row)
+      result = await conn.execute(_GET_MESSAGES, {'chat_id': chat_id})
+      chat.messages = [_message_record(chat_id, message) for message in result]
+    return chat
+
   async def create(self, title: str = 'New Chat', agent_id: Optional[str] = None) -> ChatModel:
     """Create new chat.
 
-    If max_chats limit reached, deletes the oldest chat.
+    If max_chats limit reached, deletes the oldest chats. Eviction and insert
+    are one statement (a DELETE in a CTE of the INSERT), so creating a chat
+    is a single round trip; the returned chat is built in memory.
     """
-    async with session_scope() as session:
-      # Count current chats
-      count_stmt = (
-        select(func.count())
-        .select_from(ChatModel)
-        .where(ChatModel.user_email == self.user_email)
-      )
-      result = await session.execute(count_stmt)
-      current_count = result.scalar()
-
-      # Delete oldest if at limit
-      if current_count >= self.max_chats:
-        oldest_stmt = (
-          select(ChatModel)
-          .where(ChatModel.user_email == self.user_email)
-          .order_by(ChatModel.updated_at.asc())
-          .limit(1)
-        )
-        result = await session.execute(oldest_stmt)
-        oldest = result.scalar_one_or_none()
-        if oldest:
-          await session.delete(oldest)
-
-      # Create new chat
-      chat_id = f'chat_{uuid.uuid4().hex[:12]}'
-      now = datetime.now()
-      new_chat = ChatModel(
+    chat_id = new_id('chat')
+    now = datetime.now()
+
+    # Keep the newest max_chats - 1 chats; their messages go by ON DELETE CASCADE
+    stale = (
+      select(ChatModel.id)
+      .where(ChatModel.user_email == self.user_email)
+      .order_by(ChatModel.updated_at.desc())
+      .offset(max(self.max_chats - 1, 0))
+    )
+    evict = delete(ChatModel).where(ChatModel.id.in_(stale)).cte('evicted')
+    stmt = (
+      insert(ChatModel)
+      .values(
         id=chat_id,
         user_email=self.user_email,
         title=title,
         agent_id=agent_id,
         created_at=now,
         updated_at=now,
+        # Explicit: the column's Python default is not applied to this INSERT
+        message_count=0,
       )
-      session.add(new_chat)
-      await session.flush()
+      .add_cte(evict)
+    )
 
-      # Re-fetch with eager loading to avoid lazy load issues
-      stmt = (
-        select(ChatModel)
-        .options(selectinload(ChatModel.messages))
-        .where(ChatModel.id == chat_id)
-      )
-      result = await session.execute(stmt)
-      return result.scalar_one()
+    # Not deferred: the client lists its chats as soon as it learns the new ID
+    async with session_scope() as session:
+      await session.execute(stmt)
+
+    return ChatModel(
+      id=chat_id,
+      user_email=self.user_email,
+      title=title,
+      agent_id=agent_id,
+      genie_conversation_id=None,
+      created_at=now,
+      updated_at=now,
+      message_count=0,
+      messages=[],
+    )
+
+  async def _exists(self, chat_id: str) -> bool:
+    """Whether the user owns the chat, for writes whose statement is deferred.
+
+    The deferred statement only touches an owned chat either way; this gives
+    the caller the same answer as running it (before any pending write).
+    """
+    async with read_scope() as conn:
+      params = {'chat_id': chat_id, 'user_email': self.user_email}
+      result = await conn.execute(_CHAT_EXISTS, params)
+      return result.first() is not None
 
   async def add_message(self, chat_id: str, msg: MessageModel) -> bool:
     """Add message to existing chat."""
-    async with session_scope() as session:
-      # Find the chat
-      stmt = select(ChatModel).where(
+    return await self.add_messages(chat_id, [msg])
+
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add messages to existing chat with one statement.
+
+    An UPDATE ... RETURNING in a CTE touches the chat, bumps its message
+    count and last message (and titles it from the first user message while
+    the count is 0); the INSERT joins the new rows with it, so nothing is
+    inserted into a chat the user does not own. The row lock of the UPDATE
+    keeps the count exact under concurrent turns.
+    Inside a unit of work the statement is deferred, and whether the chat
+    exists is checked with a read instead.
+    """
+    now = datetime.now()
+    changes = {'updated_at': now}
+    if msgs:
+      changes['message_count'] = ChatModel.message_count + len(msgs)
+      changes['last_message_at'] = msgs[-1].timestamp or now
+      changes['last_message_preview'] = message_preview(msgs[-1].content)
+    # Auto-generate title from first user message
+    if msgs and msgs[0].role == 'user':
+      content = msgs[0].content or ''
+      title = content[:50] + ('...' if len(content) > 50 else '')
+      changes['title'] = case((ChatModel.message_count == 0, title), else_=ChatModel.title)
+
+    touch = (
+      update(ChatModel)
+      .where(
         ChatModel.id == chat_id,
         ChatModel.user_email == self.user_email,
       )
-      result = await session.execute(stmt)
-      chat = result.scalar_one_or_none()
-      if not chat:
-        return False
-
-      # Set chat_id on message and add
-      msg.chat_id = chat_id
-      session.add(msg)
-
-      # Update chat timestamp
-      chat.updated_at = datetime.now()
-
-      # Auto-generate title from first user message
-      msg_count_stmt = (
-        select(func.count())
-        .select_from(MessageModel)
-        .where(MessageModel.chat_id == chat_id)
+      .values(**changes)
+      .returning(ChatModel.id)
+    )
+    if msgs:
+      rows = values(*[column(c.name, c.type) for c in _INSERT_COLUMNS], name='new_messages').data(
+        [
+          (
+            msg.id,
+            chat_id,
+            msg.role,
+            msg.content or '',
+            msg.timestamp or now,
+            msg.trace_id,
+            msg.trace_summary,
+            bool(msg.is_error),
+          )
+          for msg in msgs
+        ]
       )
-      count_result = await session.execute(msg_count_stmt)
-      msg_count = count_result.scalar()
-      if msg_count == 0 and msg.role == 'user':
-        chat.title = msg.content[:50] + ('...' if len(msg.content) > 50 else '')
+      touched = touch.cte('touched')
+      stmt = (
+        insert(MessageModel)
+        .from_select(
+          [c.name for c in _INSERT_COLUMNS],
+          select(*rows.c).select_from(rows).join(touched, true()),
+        )
+        .returning(MessageModel.id)
+      )
+    else:
+      stmt = touch
 
-      return True
+    if defer_write(stmt):
+      return await self._exists(chat_id)
+    async with session_scope() as session:
+      result = await session.execute(stmt)
+      return result.first() is not None
 
   async def update_title(self, chat_id: str, title: str) -> bool:
-    """Update chat title."""
-    async with session_scope() as session:
-      stmt = select(ChatModel).where(
+    """Update chat title with one UPDATE ... RETURNING (deferred inside a unit of work)."""
+    stmt = (
+      update(ChatModel)
+      .where(
         ChatModel.id == chat_id,
         ChatModel.user_email == self.user_email,
       )
+      .values(title=title, updated_at=datetime.now())
+      .returning(ChatModel.id)
+    )
+    if defer_write(stmt):
+      return await self._exists(chat_id)
+    async with session_scope() as session:
       result = await session.execute(stmt)
-      chat = result.scalar_one_or_none()
-      if not chat:
-        return False
-      chat.title = title
-      chat.updated_at = datetime.now()
-      return True
+      return result.first() is not None
 
   async def delete(self, chat_id: str) -> bool:
     """Delete chat by ID."""
@@ -170,6 +527,30 @@ class PostgresChatStorage(BaseChatStorage):
       result = await session.execute(stmt)
       return result.rowcount > 0
 
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat."""
+    async with read_scope() as conn:
+      params = {'chat_id': chat_id, 'user_email': self.user_email}
+      result = await conn.execute(_GET_GENIE_CONVERSATION, params)
+      return result.scalar_one_or_none()
+
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation (deferred inside a unit of work, like add_messages)."""
+    stmt = (
+      update(ChatModel)
+      .where(
+        ChatModel.id == chat_id,
+        ChatModel.user_email == self.user_email,
+      )
+      # Keep updated_at as is (it has an onupdate default)
+      .values(genie_conversation_id=conversation_id, updated_at=ChatModel.updated_at)
+    )
+    if defer_write(stmt):
+      return await self._exists(chat_id)
+    async with session_scope() as session:
+      result = await session.execute(stmt)
+      return result.rowcount > 0
+
   async def clear_all(self) -> int:
     """Delete all chats."""
     async with session_scope() as session:
@@ -190,6 +571,10 @@ class PostgresUserScopedChatStorage(BaseUserScopedChatStorage):
     self._max_chats_per_user = max_chats_per_user
     self._user_storages: dict[str, PostgresChatStorage] = {}
 
+  async def close(self):
+    """Stop the pool's liveness checks and close its connections."""
+    await close_database()
+
   def get_storage_for_user(self, user_email: str) -> BaseChatStorage:
     """Get or create PostgresChatStorage for a specific user."""
     if user_email not in self._user_storages:
@@ -201,9 +586,8 @@ class PostgresUserScopedChatStorage(BaseUserScopedChatStorage):
 
   async def get_all_users(self) -> List[str]:
     """Get list of all users with chat storage."""
-    async with session_scope() as session:
-      stmt = select(ChatModel.user_email).distinct()
-      result = await session.execute(stmt)
+    async with read_scope() as conn:
+      result = await conn.execute(_LIST_USERS)
       return list(result.scalars().all())
 
   async def clear_user_storage(self, user_email: str) -> bool:
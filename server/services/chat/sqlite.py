@@ -0,0 +1,541 @@
+"""SQLite chat storage implementation (async, WAL mode).
+
+Durable chat storage for single-node deployments without Lakebase: chats
+survive restarts and all uvicorn workers on the machine share the same file.
+
+- WAL journal: readers never block the writer and see a consistent snapshot;
+  writers of several processes take turns (busy_timeout) instead of failing
+- Each process opens one connection for writes (transactions are serialized
+  by a lock) and one for reads, both on their own aiosqlite thread
+- Statements are constant SQL strings, so sqlite3 prepares each once per
+  connection and reuses it from its statement cache
+- Listing a user's chats is answered from the covering index
+  ix_chats_user_updated without reading the table
+- Rows are returned as the ChatRecord / MessageRecord of the compact memory
+  storage, converted to API dicts only when the response is built
+
+Selected by CHAT_STORAGE=sqlite (the default without LAKEBASE_PG_URL); the
+file is CHAT_SQLITE_PATH (default .chat_history/chats.db in the working
+directory).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+import aiosqlite
+
+from server.db.models import PREVIEW_LENGTH, MessageModel
+
+from .base import (
+  BaseChatStorage,
+  BaseUserScopedChatStorage,
+  Cursor,
+  message_preview,
+  new_id,
+)
+from .compact import ChatRecord, MessageRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = '.chat_history/chats.db'
+
+# Milliseconds a writer waits for another process's transaction before failing
+BUSY_TIMEOUT_MS = 5000
+# Prepared statements kept per connection (well above the number used here)
+STATEMENT_CACHE_SIZE = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+  id TEXT PRIMARY KEY,
+  user_email TEXT NOT NULL,
+  title TEXT NOT NULL,
+  agent_id TEXT,
+  genie_conversation_id TEXT,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  message_count INTEGER NOT NULL DEFAULT 0,
+  last_message_at TEXT,
+  last_message_preview TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_chats_user_updated ON chats (
+  user_email, updated_at, id, title, agent_id, created_at,
+  message_count, last_message_at, last_message_preview
+);
+CREATE TABLE IF NOT EXISTS messages (
+  id TEXT PRIMARY KEY,
+  chat_id TEXT NOT NULL REFERENCES chats (id) ON DELETE CASCADE,
+  role TEXT NOT NULL,
+  content TEXT NOT NULL,
+  timestamp TEXT NOT NULL,
+  trace_id TEXT,
+  trace_summary TEXT,
+  is_error INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_messages_chat_timestamp ON messages (chat_id, timestamp);
+"""
+
+# Files created before chats had message summaries: add, backfill and cover them
+_ADD_MESSAGE_SUMMARY = (
+  'ALTER TABLE chats ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0',
+  'ALTER TABLE chats ADD COLUMN last_message_at TEXT',
+  'ALTER TABLE chats ADD COLUMN last_message_preview TEXT',
+  'UPDATE chats SET '
+  'message_count = (SELECT count(*) FROM messages WHERE chat_id = chats.id), '
+  'last_message_at = (SELECT max(timestamp) FROM messages WHERE chat_id = chats.id), '
+  f'last_message_preview = (SELECT substr(content, 1, {PREVIEW_LENGTH}) FROM messages '
+  'WHERE chat_id = chats.id ORDER BY timestamp DESC, id DESC LIMIT 1)',
+  'DROP INDEX ix_chats_user_updated',
+  'CREATE INDEX ix_chats_user_updated ON chats (user_email, updated_at, id, title, agent_id, '
+  'created_at, message_count, last_message_at, last_message_preview)',
+)
+
+_PRAGMAS = (
+  'PRAGMA journal_mode=WAL',
+  'PRAGMA synchronous=NORMAL',
+  'PRAGMA foreign_keys=ON',
+  f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}',
+)
+
+# Chat summary columns, all in ix_chats_user_updated (read by _chat_record)
+_CHAT_COLUMNS = (
+  'id, title, agent_id, created_at, updated_at, message_count, last_message_at, '
+  'last_message_preview'
+)
+# Covered by ix_chats_user_updated
+_LIST_CHATS = (
+  f'SELECT {_CHAT_COLUMNS} FROM chats WHERE user_email = ? ORDER BY updated_at DESC, id DESC'
+)
+_GET_CHAT = (
+  f'SELECT {_CHAT_COLUMNS}, genie_conversation_id FROM chats WHERE id = ? AND user_email = ?'
+)
+_GET_MESSAGES = (
+  'SELECT id, role, content, timestamp, trace_id, trace_summary, is_error FROM messages '
+  'WHERE chat_id = ? ORDER BY timestamp'
+)
+# Keyset pages: filters and order on (updated_at, id) / (timestamp, id) are appended
+_PAGE_CHATS = f'SELECT {_CHAT_COLUMNS} FROM chats WHERE user_email = ?'
+_PAGE_MESSAGES = (
+  'SELECT id, role, content, timestamp, trace_id, trace_summary, is_error FROM messages '
+  'WHERE chat_id = ?'
+)
+_CHAT_EXISTS = 'SELECT 1 FROM chats WHERE id = ? AND user_email = ?'
+_DELETE_OLDEST_CHATS = (
+  'DELETE FROM chats WHERE id IN ('
+  'SELECT id FROM chats WHERE user_email = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?)'
+)
+_INSERT_CHAT = (
+  'INSERT INTO chats (id, user_email, title, agent_id, created_at, updated_at) '
+  'VALUES (?, ?, ?, ?, ?, ?)'
+)
+# Title (if not NULL) is only set while the chat has no messages
+_TOUCH_CHAT = (
+  'UPDATE chats SET updated_at = ?, message_count = message_count + ?, last_message_at = ?, '
+  'last_message_preview = ?, title = COALESCE(CASE WHEN message_count = 0 THEN ? END, title) '
+  'WHERE id = ? AND user_email = ?'
+)
+_INSERT_MESSAGE = (
+  'INSERT INTO messages (id, chat_id, role, content, timestamp, trace_id, trace_summary, is_error) '
+  'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+)
+_UPDATE_TITLE = 'UPDATE chats SET title = ?, updated_at = ? WHERE id = ? AND user_email = ?'
+_DELETE_CHAT = 'DELETE FROM chats WHERE id = ? AND user_email = ?'
+_GET_GENIE_CONVERSATION = (
+  'SELECT genie_conversation_id FROM chats WHERE id = ? AND user_email = ?'
+)
+_SET_GENIE_CONVERSATION = (
+  'UPDATE chats SET genie_conversation_id = ? WHERE id = ? AND user_email = ?'
+)
+_DELETE_USER_CHATS = 'DELETE FROM chats WHERE user_email = ?'
+_LIST_USERS = 'SELECT DISTINCT user_email FROM chats'
+
+
+def sqlite_path() -> str:
+  """Database file of the SQLite chat storage, from CHAT_SQLITE_PATH."""
+  return os.environ.get('CHAT_SQLITE_PATH') or DEFAULT_SQLITE_PATH
+
+
+def _now() -> str:
+  return datetime.now().isoformat(timespec='microseconds')
+
+
+def _timestamp(value: Optional[datetime]) -> str:
+  """Stored form of a timestamp: naive local time like _now(), so that stored values compare.
+
+  Aware datetimes are converted to local time; None is now.
+  """
+  if value is None:
+    return _now()
+  if value.tzinfo is not None:
+    value = value.astimezone().replace(tzinfo=None)
+  return value.isoformat(timespec='microseconds')
+
+
+class SqliteDatabase:
+  """Connections of this process to the chat database file."""
+
+  def __init__(self, path: str):
+    """Initialize without connecting; call open() before use."""
+    self.path = path
+    self._writer: Optional[aiosqlite.Connection] = None
+    self._reader: Optional[aiosqlite.Connection] = None
+    self._write_lock = asyncio.Lock()
+
+  async def _connect(self) -> aiosqlite.Connection:
+    # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = await aiosqlite.connect(
+      self.path, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    for pragma in _PRAGMAS:
+      await conn.execute(pragma)
+    return conn
+
+  async def open(self):
+    """Create the file and schema if needed and open the connections."""
+    if self.path != ':memory:':
+      Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+    self._writer = await self._connect()
+    await self._writer.executescript(_SCHEMA)
+    await self._upgrade()
+    self._reader = await self._connect()
+    logger.info(f'SQLite chat storage at {self.path} (WAL)')
+
+  async def _upgrade(self):
+    """Bring a file created by an older version up to the current schema."""
+    # BEGIN IMMEDIATE: when several workers start at once, one upgrades and the others wait
+    await self._writer.execute('BEGIN IMMEDIATE')
+    try:
+      async with self._writer.execute('PRAGMA table_info(chats)') as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+      if 'message_count' not in columns:
+        for sql in _ADD_MESSAGE_SUMMARY:
+          await self._writer.execute(sql)
+        logger.info('SQLite chat storage: added message counts and previews to chats')
+      async with self._writer.execute('PRAGMA user_version') as cursor:
+        version = (await cursor.fetchone())[0]
+      if version < 1:
+        await self._naive_timestamps()
+        await self._writer.execute('PRAGMA user_version = 1')
+      await self._writer.execute('COMMIT')
+    except Exception:
+      await self._writer.execute('ROLLBACK')
+      raise
+
+  async def _naive_timestamps(self):
+    """Convert message timestamps stored with a UTC offset to naive local time.
+
+    Older versions stored aware timestamps as given, which do not compare
+    with the naive ones as strings. Naive values have exactly 26 characters.
+    """
+    fixed = 0
+    for table, column in (('messages', 'timestamp'), ('chats', 'last_message_at')):
+      async with self._writer.execute(
+        f'SELECT rowid, {column} FROM {table} WHERE length({column}) > 26'
+      ) as cursor:
+        rows = await cursor.fetchall()
+      await self._writer.executemany(
+        f'UPDATE {table} SET {column} = ? WHERE rowid = ?',
+        [(_timestamp(datetime.fromisoformat(value)), rowid) for rowid, value in rows],
+      )
+      fixed += len(rows)
+    if fixed:
+      logger.info(f'SQLite chat storage: converted {fixed} timestamps to local time')
+
+  async def close(self):
+    """Close the connections."""
+    for conn in (self._reader, self._writer):
+      if conn is not None:
+        await conn.close()
+    self._reader = self._writer = None
+
+  async def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+    """Rows of a read-only statement."""
+    async with self._reader.execute(sql, params) as cursor:
+      return list(await cursor.fetchall())
+
+  async def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+    """First row of a read-only statement, or None."""
+    async with self._reader.execute(sql, params) as cursor:
+      return await cursor.fetchone()
+
+  async def write(self, statements: Sequence[tuple]) -> List[int]:
+    """Run (sql, params) statements in one transaction and return their row counts.
+
+    A statement given as (sql, params, True) is required to change a row:
+    when it does not, the transaction is rolled back and the remaining
+    statements are skipped (e.g. adding a message to a chat of another user).
+    """
+    async with self._write_lock:
+      conn = self._writer
+      await conn.execute('BEGIN IMMEDIATE')
+      counts = []
+      try:
+        for sql, params, *required in statements:
+          cursor = await conn.execute(sql, params)
+          counts.append(cursor.rowcount)
+          if required and required[0] and cursor.rowcount == 0:
+            await conn.execute('ROLLBACK')
+            return counts
+        await conn.execute('COMMIT')
+      except BaseException:
+        await conn.execute('ROLLBACK')
+        raise
+      return counts
+
+
+def _page_query(
+  sql: str,
+  column: str,
+  params: List[Any],
+  limit: int,
+  before: Optional[Cursor],
+  after: Optional[Cursor],
+) -> tuple:
+  """Keyset page of a _PAGE_* query: newest first, or closest first after a cursor."""
+  if before is not None:
+    sql += f' AND ({column}, id) < (?, ?)'
+    params.extend((_timestamp(before[0]), before[1]))
+  if after is not None:
+    sql += f' AND ({column}, id) > (?, ?) ORDER BY {column}, id'
+    params.extend((_timestamp(after[0]), after[1]))
+  else:
+    sql += f' ORDER BY {column} DESC, id DESC'
+  params.append(limit)
+  return sql + ' LIMIT ?', params
+
+
+def _chat_record(user_email: str, row: Sequence[Any]) -> ChatRecord:
+  """Chat of a row starting with _CHAT_COLUMNS."""
+  chat = ChatRecord(
+    id=row[0],
+    user_email=user_email,
+    title=row[1],
+    agent_id=row[2],
+    created_at=datetime.fromisoformat(row[3]),
+  )
+  chat.updated_at = datetime.fromisoformat(row[4])
+  chat.message_count = row[5]
+  chat.last_message_at = datetime.fromisoformat(row[6]) if row[6] else None
+  chat.last_message_preview = row[7]
+  return chat
+
+
+def _message_record(chat_id: str, row: Sequence[Any]) -> MessageRecord:
+  return MessageRecord(
+    id=row[0],
+    chat_id=chat_id,
+    role=row[1],
+    content=row[2],
+    timestamp=datetime.fromisoformat(row[3]),
+    trace_id=row[4],
+    trace_summary=json.loads(row[5]) if row[5] else None,
+    is_error=bool(row[6]),
+  )
+
+
+class SqliteChatStorage(BaseChatStorage):
+  """Async SQLite storage for chat sessions for a single user.
+
+  Features:
+  - Persistent storage in a local SQLite file, shared by all workers
+  - Stores up to max_chats (default 10)
+  - Automatically deletes oldest chat when limit reached
+  """
+
+  def __init__(self, db: SqliteDatabase, user_email: str, max_chats: int = 10):
+    """Initialize storage with the database, user email and max chat limit."""
+    self.db = db
+    self.user_email = user_email
+    self.max_chats = max_chats
+
+  async def get_all(self) -> List[ChatRecord]:
+    """Get all chats sorted by updated_at (newest first), without messages."""
+    rows = await self.db.fetch_all(_LIST_CHATS, (self.user_email,))
+    return [_chat_record(self.user_email, row) for row in rows]
+
+  async def get_page(
+    self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None
+  ) -> List[ChatRecord]:
+    """Get a page of chats, newest first (from the covering index)."""
+    sql, params = _page_query(_PAGE_CHATS, 'updated_at', [self.user_email], limit, before, after)
+    rows = await self.db.fetch_all(sql, params)
+    chats = [_chat_record(self.user_email, row) for row in rows]
+    return chats[::-1] if after is not None else chats
+
+  async def get_summary(self, chat_id: str) -> Optional[ChatRecord]:
+    """Get specific chat by ID without loading its messages."""
+    row = await self.db.fetch_one(_GET_CHAT, (chat_id, self.user_email))
+    if row is None:
+      return None
+    chat = _chat_record(self.user_email, row)
+    chat.genie_conversation_id = row[8]
+    return chat
+
+  async def get_messages(
+    self,
+    chat_id: str,
+    limit: int,
+    before: Optional[Cursor] = None,
+    after: Optional[Cursor] = None,
+  ) -> Optional[List[MessageRecord]]:
+    """Get a page of a chat's messages in chronological order (latest by default)."""
+    if await self.db.fetch_one(_CHAT_EXISTS, (chat_id, self.user_email)) is None:
+      return None
+    sql, params = _page_query(_PAGE_MESSAGES, 'timestamp', [chat_id], limit, before, after)
+    rows = await self.db.fetch_all(sql, params)
+    messages = [_message_record(chat_id, row) for row in rows]
+    return messages if after is not None else messages[::-1]
+
+  async def get(self, chat_id: str) -> Optional[ChatRecord]:
+    """Get specific chat by ID, with its messages."""
+    row = await self.db.fetch_one(_GET_CHAT, (chat_id, self.user_email))
+    if row is None:
+      return None
+    chat = _chat_record(self.user_email, row)
+    chat.genie_conversation_id = row[8]
+    rows = await self.db.fetch_all(_GET_MESSAGES, (chat_id,))
+    chat.messages = [_message_record(chat_id, message) for message in rows]
+    return chat
+
+  async def create(self, title: str = 'New Chat', agent_id: Optional[str] = None) -> ChatRecord:
+    """Create new chat.
+
+    If max_chats limit reached, deletes the oldest chats.
+    """
+    chat = ChatRecord(
+      id=new_id('chat'),
+      user_email=self.user_email,
+      title=title,
+      agent_id=agent_id,
+      created_at=datetime.now(),
+    )
+    created_at = _timestamp(chat.created_at)
+    await self.db.write(
+      [
+        (_DELETE_OLDEST_CHATS, (self.user_email, max(self.max_chats - 1, 0))),
+        (_INSERT_CHAT, (chat.id, self.user_email, title, agent_id, created_at, created_at)),
+      ]
+    )
+    return chat
+
+  async def add_message(self, chat_id: str, msg: MessageModel) -> bool:
+    """Add message to existing chat."""
+    return await self.add_messages(chat_id, [msg])
+
+  async def add_messages(self, chat_id: str, msgs: List[MessageModel]) -> bool:
+    """Add messages to existing chat in one transaction."""
+    if not msgs:
+      return await self.db.fetch_one(_CHAT_EXISTS, (chat_id, self.user_email)) is not None
+    # Auto-generate title from first user message (set while the chat has no messages)
+    title = None
+    if msgs[0].role == 'user':
+      content = msgs[0].content or ''
+      title = content[:50] + ('...' if len(content) > 50 else '')
+    timestamps = [_timestamp(msg.timestamp) for msg in msgs]
+    touch = (
+      _now(),
+      len(msgs),
+      timestamps[-1],
+      message_preview(msgs[-1].content),
+      title,
+      chat_id,
+      self.user_email,
+    )
+    statements: List[tuple] = [(_TOUCH_CHAT, touch, True)]
+    for msg, timestamp in zip(msgs, timestamps):
+      statements.append(
+        (
+          _INSERT_MESSAGE,
+          (
+            msg.id,
+            chat_id,
+            msg.role,
+            msg.content or '',
+            timestamp,
+            msg.trace_id,
+            json.dumps(msg.trace_summary, default=str) if msg.trace_summary else None,
+            int(bool(msg.is_error)),
+          ),
+        )
+      )
+    counts = await self.db.write(statements)
+    return counts[0] > 0
+
+  async def update_title(self, chat_id: str, title: str) -> bool:
+    """Update chat title."""
+    counts = await self.db.write([(_UPDATE_TITLE, (title, _now(), chat_id, self.user_email))])
+    return counts[0] > 0
+
+  async def delete(self, chat_id: str) -> bool:
+    """Delete chat by ID."""
+    counts = await self.db.write([(_DELETE_CHAT, (chat_id, self.user_email))])
+    return counts[0] > 0
+
+  async def get_genie_conversation(self, chat_id: str) -> Optional[str]:
+    """Get the Genie conversation ID linked to a chat."""
+    row = await self.db.fetch_one(_GET_GENIE_CONVERSATION, (chat_id, self.user_email))
+    return row[0] if row else None
+
+  async def set_genie_conversation(self, chat_id: str, conversation_id: str) -> bool:
+    """Link a chat to a Genie conversation (keeps updated_at)."""
+    counts = await self.db.write(
+      [(_SET_GENIE_CONVERSATION, (conversation_id, chat_id, self.user_email))]
+    )
+    return counts[0] > 0
+
+  async def clear_all(self) -> int:
+    """Delete all chats."""
+    counts = await self.db.write([(_DELETE_USER_CHATS, (self.user_email,))])
+    return counts[0]
+
+
+class SqliteUserScopedChatStorage(BaseUserScopedChatStorage):
+  """User-scoped SQLite chat storage manager.
+
+  Creates SqliteChatStorage instances per user (by email), all sharing the
+  connections of one SqliteDatabase. Call open() before use.
+  """
+
+  def __init__(self, max_chats_per_user: int = 10, path: Optional[str] = None):
+    """Initialize user-scoped storage.
+
+    Args:
+      max_chats_per_user: Chats kept per user
+      path: Database file (default from CHAT_SQLITE_PATH)
+    """
+    self._max_chats_per_user = max_chats_per_user
+    self.db = SqliteDatabase(path or sqlite_path())
+    self._user_storages: dict[str, SqliteChatStorage] = {}
+
+  async def open(self):
+    """Open the database, creating it if needed."""
+    await self.db.open()
+
+  async def close(self):
+    """Close the database connections."""
+    await self.db.close()
+
+  def get_storage_for_user(self, user_email: str) -> BaseChatStorage:
+    """Get or create SqliteChatStorage for a specific user."""
+    if user_email not in self._user_storages:
+      self._user_storages[user_email] = SqliteChatStorage(
+        self.db,
+        user_email=user_email,
+        max_chats=self._max_chats_per_user,
+      )
+    return self._user_storages[user_email]
+
+  async def get_all_users(self) -> List[str]:
+    """Get list of all users with chat storage."""
+    return [row[0] for row in await self.db.fetch_all(_LIST_USERS)]
+
+  async def clear_user_storage(self, user_email: str) -> bool:
+    """Clear all storage for a specific user."""
+    counts = await self.db.write([(_DELETE_USER_CHATS, (user_email,))])
+    self._user_storages.pop(user_email, None)
+    return counts[0] > 0
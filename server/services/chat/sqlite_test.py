@@ -0,0 +1,126 @@
+"""Tests for the SQLite chat storage."""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from server.db import MessageModel
+
+from .base import new_id
+from .sqlite import SqliteChatStorage, SqliteDatabase
+
+
+def _message(content: str, timestamp: datetime) -> MessageModel:
+  return MessageModel(id=new_id('msg'), role='user', content=content, timestamp=timestamp)
+
+
+def test_timestamps_are_stored_as_naive_local_time(tmp_path):
+  path = str(tmp_path / 'chats.db')
+  now = datetime.now()
+  # Given in UTC, one second after `now`
+  later = (now + timedelta(seconds=1)).astimezone(timezone.utc)
+
+  async def run():
+    db = SqliteDatabase(path)
+    await db.open()
+    try:
+      storage = SqliteChatStorage(db, 'user@example.com')
+      chat = await storage.create()
+      await storage.add_messages(chat.id, [_message('later', later), _message('first', now)])
+      await storage.add_messages(chat.id, [_message('last', now + timedelta(seconds=2))])
+
+      stored = await storage.get(chat.id)
+      assert [m.content for m in stored.messages] == ['first', 'later', 'last']
+      assert all(m.timestamp.tzinfo is None for m in stored.messages)
+      assert stored.messages[1].timestamp == later.astimezone().replace(tzinfo=None)
+
+      page = await storage.get_messages(chat.id, limit=1, before=(now + timedelta(seconds=2), ''))
+      assert [m.content for m in page] == ['later']
+    finally:
+      await db.close()
+
+  asyncio.run(run())
+  with sqlite3.connect(path) as conn:
+    lengths = {row[0] for row in conn.execute('SELECT length(timestamp) FROM messages')}
+  assert lengths == {26}
+
+
+def test_open_converts_timestamps_with_offset(tmp_path):
+  path = str(tmp_path / 'chats.db')
+  aware = datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+
+  async def create():
+    db = SqliteDatabase(path)
+    await db.open()
+    storage = SqliteChatStorage(db, 'user@example.com')
+    chat = await storage.create()
+    await storage.add_messages(chat.id, [_message('old', datetime.now())])
+    await db.close()
+    return chat.id
+
+  chat_id = asyncio.run(create())
+  # As stored by an older version, and before it was upgraded
+  with sqlite3.connect(path) as conn:
+    conn.execute('UPDATE messages SET timestamp = ?', (aware.isoformat(),))
+    conn.execute('UPDATE chats SET last_message_at = ?', (aware.isoformat(),))
+    conn.execute('PRAGMA user_version = 0')
+
+  async def reopen():
+    db = SqliteDatabase(path)
+    await db.open()
+    try:
+      chat = await SqliteChatStorage(db, 'user@example.com').get(chat_id)
+      return chat.messages[0].timestamp, chat.last_message_at
+    finally:
+      await db.close()
+
+  local = aware.astimezone().replace(tzinfo=None)
+  assert asyncio.run(reopen()) == (local, local)
+
+
+def test_chats_with_equal_updated_at_are_ordered_by_id(tmp_path):
+  path = str(tmp_path / 'chats.db')
+
+  async def run():
+    db = SqliteDatabase(path)
+    await db.open()
+    try:
+      storage = SqliteChatStorage(db, 'user@example.com')
+      for _ in range(5):
+        await storage.create()
+      with sqlite3.connect(path) as conn:
+        conn.execute('UPDATE chats SET updated_at = ?', ('2026-01-02T03:04:05.000000',))
+      listed = [chat.id for chat in await storage.get_all()]
+
+      seen, cursor = [], None
+      while page := await storage.get_page(2, before=cursor):
+        seen.extend(chat.id for chat in page)
+        cursor = (page[-1].updated_at, page[-1].id)
+      newer = await storage.get_page(2, after=cursor)
+      return listed, seen, [chat.id for chat in newer]
+    finally:
+      await db.close()
+
+  listed, seen, newer = asyncio.run(run())
+  assert listed == sorted(listed, reverse=True)
+  assert seen == listed
+  assert newer == listed[-3:-1]
+
+
+def test_add_no_messages_checks_the_chat(tmp_path):
+  async def run():
+    db = SqliteDatabase(str(tmp_path / 'chats.db'))
+    await db.open()
+    try:
+      storage = SqliteChatStorage(db, 'user@example.com')
+      chat = await storage.create()
+      other = SqliteChatStorage(db, 'other@example.com')
+      return (
+        await storage.add_messages(chat.id, []),
+        await other.add_messages(chat.id, []),
+        await storage.add_messages('chat_missing', []),
+      )
+    finally:
+      await db.close()
+
+  assert asyncio.run(run()) == (True, False, False)
@@ -0,0 +1,25 @@
+"""Genie space services: async REST client and helpers used by the Genie handler."""
+
+from .cache import GenieResultCache, normalize_sql, result_cache
+from .client import TERMINAL_STATUSES, GenieAPIError, GenieClient
+from .conversations import GenieConversationRegistry, conversation_registry
+from .results import GenieResult, GenieResultStore, ResultData, result_store
+from .scheduler import GenieScheduler, TokenBucket, genie_scheduler
+
+__all__ = [
+  'GenieAPIError',
+  'GenieClient',
+  'GenieConversationRegistry',
+  'GenieResult',
+  'GenieResultCache',
+  'GenieResultStore',
+  'GenieScheduler',
+  'ResultData',
+  'TERMINAL_STATUSES',
+  'TokenBucket',
+  'conversation_registry',
+  'genie_scheduler',
+  'normalize_sql',
+  'result_cache',
+  'result_store',
+]
@@ -0,0 +1,155 @@
+"""Cache of Genie query results keyed by space and normalized SQL.
+
+Dashboards and recurring questions make Genie generate the same SQL again and
+again. Once the generated SQL of a message is known, the handler looks it up
+here and, on a hit, answers from the cached rows instead of waiting for the
+warehouse and downloading the result again.
+
+Only fully loaded results are cached: after a miss the handler hands the
+result over with put(), which adds a single-chunk result right away and any
+other result once a user asks for the full result and its remaining chunks
+have been fetched. Nothing is downloaded just to fill the cache. Entries
+expire after the TTL of their space and the least recently used ones are
+evicted beyond the byte budget.
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from .results import ResultData
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for all cached results, and the largest result that is cached
+RESULT_CACHE_MAX_BYTES = 128 * 1024 * 1024
+RESULT_CACHE_MAX_ENTRY_BYTES = 32 * 1024 * 1024
+
+# Comments, quoted literals/identifiers and whitespace runs
+_SQL_TOKEN = re.compile(
+  r"""(?P<comment>--[^\n]*|/\*.*?\*/)"""
+  r"""|(?P<quoted>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)"""
+  r"""|(?P<space>\s+)""",
+  re.DOTALL,
+)
+
+
+def normalize_sql(sql: str) -> str:
+  """Normalize SQL so formatting differences map to the same cache key.
+
+  Drops comments, collapses whitespace, lowercases everything outside quoted
+  literals and identifiers, and strips trailing semicolons.
+
+  Example:
+    >>> normalize_sql("SELECT  Region  FROM sales /* by region */ WHERE x = 'EU';")
+    "select region from sales where x = 'EU'"
+  """
+  parts = ['']
+  pos = 0
+  for match in _SQL_TOKEN.finditer(sql):
+    if match.start() > pos:
+      parts.append(sql[pos : match.start()].lower())
+    if match.lastgroup == 'quoted':
+      parts.append(match.group())
+    elif parts[-1] != ' ':
+      # Whitespace is collapsed outside quotes only: 'a  b' and 'a b' differ
+      parts.append(' ')
+    pos = match.end()
+  parts.append(sql[pos:].lower())
+  return ''.join(parts).strip().rstrip('; ')
+
+
+class GenieResultCache:
+  """In-process LRU cache of loaded Genie results with a byte budget."""
+
+  def __init__(
+    self,
+    max_bytes: int = RESULT_CACHE_MAX_BYTES,
+    max_entry_bytes: int = RESULT_CACHE_MAX_ENTRY_BYTES,
+    clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initialize an empty cache.
+
+    Args:
+      max_bytes: Memory budget; least recently used results are evicted beyond it
+      max_entry_bytes: Results larger than this are not cached
+      clock: Monotonic time in seconds, for expiry
+    """
+    self.max_bytes = max_bytes
+    self.max_entry_bytes = max_entry_bytes
+    self._clock = clock
+    # (space_id, normalized sql) -> (data, expires_at)
+    self._entries: OrderedDict[Tuple[str, str], Tuple[ResultData, float]] = OrderedDict()
+    self._nbytes = 0
+
+  @property
+  def nbytes(self) -> int:
+    """Memory held by cached results."""
+    return self._nbytes
+
+  def get(self, space_id: str, sql: str) -> Optional[ResultData]:
+    """Get the cached result of `sql` in a space, if present and not expired."""
+    key = (space_id, normalize_sql(sql))
+    entry = self._entries.get(key)
+    if entry is None:
+      return None
+    data, expires_at = entry
+    if expires_at <= self._clock():
+      self._remove(key)
+      return None
+    self._entries.move_to_end(key)
+    return data
+
+  def put(self, space_id: str, sql: str, data: ResultData, ttl_seconds: float):
+    """Cache a result once it is fully loaded.
+
+    A result with more chunks is added when ResultData.load() has fetched
+    them for a user who requested the full result; results that are never
+    requested in full are not cached. Truncated and oversized results are
+    skipped.
+    """
+    if ttl_seconds <= 0:
+      return
+    key = (space_id, normalize_sql(sql))
+    if data.table is not None:
+      self._add(key, data, ttl_seconds)
+      return
+
+    data.on_loaded.append(lambda loaded: self._add(key, loaded, ttl_seconds))
+
+  def clear(self):
+    """Drop all cached results."""
+    self._entries.clear()
+    self._nbytes = 0
+
+  def _add(self, key: Tuple[str, str], data: ResultData, ttl_seconds: float):
+    if data.truncated or data.nbytes > self.max_entry_bytes:
+      logger.debug(f'Not caching Genie result of {data.nbytes} bytes (truncated={data.truncated})')
+      return
+    self._remove(key)
+    self._entries[key] = (data, self._clock() + ttl_seconds)
+    self._nbytes += data.nbytes
+    self._evict()
+    logger.info(
+      f'Cached Genie result for space {key[0]}: {data.fetched_rows} rows, '
+      f'{self._nbytes / 1024:.0f} KiB in {len(self._entries)} entries'
+    )
+
+  def _remove(self, key: Tuple[str, str]):
+    entry = self._entries.pop(key, None)
+    if entry is not None:
+      self._nbytes -= entry[0].nbytes
+
+  def _evict(self):
+    """Drop expired results, then least recently used ones beyond the byte budget."""
+    now = self._clock()
+    for key in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+      self._remove(key)
+    while self._nbytes > self.max_bytes and self._entries:
+      self._remove(next(iter(self._entries)))
+
+
+# Global cache shared by all Genie handlers
+result_cache = GenieResultCache()
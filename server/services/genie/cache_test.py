@@ -0,0 +1,131 @@
+"""Tests for the Genie result cache."""
+
+import asyncio
+
+from . import results
+from .cache import GenieResultCache, normalize_sql
+from .results import ResultData
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 100.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+def _data(rows=10, next_link=None, truncated=False) -> ResultData:
+  return ResultData.from_statement_response(
+    {
+      'manifest': {
+        'schema': {'columns': [{'name': 'n', 'type_name': 'LONG'}]},
+        'total_row_count': rows * 2 if next_link else rows,
+        'truncated': truncated,
+      },
+      'result': {
+        'data_array': [[str(i)] for i in range(rows)],
+        'next_chunk_internal_link': next_link,
+      },
+    }
+  )
+
+
+def test_normalize_sql_ignores_formatting():
+  canonical = normalize_sql("SELECT region, SUM(x) FROM sales WHERE r = 'EU' GROUP BY region")
+  for sql in (
+    "select  region,\n  sum(x)\nfrom SALES where r = 'EU' group by REGION;",
+    "SELECT region, SUM(x) -- total\nFROM sales /* all\nrows */ WHERE r = 'EU' GROUP BY region ;;",
+    "\tSELECT region, SUM(x)\r\nFROM sales WHERE r = 'EU' GROUP BY region  ",
+  ):
+    assert normalize_sql(sql) == canonical, sql
+  assert canonical == "select region, sum(x) from sales where r = 'EU' group by region"
+
+
+def test_normalize_sql_keeps_quoted_text():
+  assert normalize_sql("SELECT * FROM t WHERE r = 'EU'") != normalize_sql(
+    "SELECT * FROM t WHERE r = 'eu'"
+  )
+  assert normalize_sql('SELECT "Region" FROM t') == 'select "Region" from t'
+  assert normalize_sql("SELECT '--  Not  a comment' FROM t") == (
+    "select '--  Not  a comment' from t"
+  )
+  assert normalize_sql("SELECT 'it''s' FROM `My  Table`") == "select 'it''s' from `My  Table`"
+  assert normalize_sql("SELECT * FROM t WHERE r = 'a  b'") != normalize_sql(
+    "SELECT * FROM t WHERE r = 'a b'"
+  )
+
+
+def test_hit_for_equivalent_sql_in_the_same_space():
+  cache = GenieResultCache()
+  data = _data()
+  cache.put('space', 'SELECT n FROM t', data, ttl_seconds=60)
+  assert cache.get('space', 'select n\nfrom T;') is data
+  assert cache.get('other', 'SELECT n FROM t') is None
+  assert cache.get('space', 'SELECT n FROM u') is None
+
+
+def test_entries_expire_after_the_ttl_of_their_space():
+  clock = _Clock()
+  cache = GenieResultCache(clock=clock)
+  cache.put('short', 'SELECT n FROM t', _data(), ttl_seconds=10)
+  cache.put('long', 'SELECT n FROM t', _data(), ttl_seconds=60)
+  cache.put('off', 'SELECT n FROM t', _data(), ttl_seconds=0)
+  assert cache.get('off', 'SELECT n FROM t') is None
+
+  clock.now += 30
+  assert cache.get('short', 'SELECT n FROM t') is None
+  assert cache.get('long', 'SELECT n FROM t') is not None
+  clock.now += 30
+  assert cache.get('long', 'SELECT n FROM t') is None
+  assert cache.nbytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_budget():
+  size = _data().nbytes
+  cache = GenieResultCache(max_bytes=size * 2 + size // 2)
+  for name in ('a', 'b'):
+    cache.put('space', f'SELECT n FROM {name}', _data(), ttl_seconds=60)
+  # Using `a` makes `b` the least recently used
+  assert cache.get('space', 'SELECT n FROM a') is not None
+  cache.put('space', 'SELECT n FROM c', _data(), ttl_seconds=60)
+
+  assert cache.get('space', 'SELECT n FROM b') is None
+  assert cache.get('space', 'SELECT n FROM a') is not None
+  assert cache.get('space', 'SELECT n FROM c') is not None
+  assert cache.nbytes == size * 2
+
+
+def test_oversized_and_truncated_results_are_not_cached():
+  large = _data(rows=1000)
+  cache = GenieResultCache(max_entry_bytes=large.nbytes - 1)
+  cache.put('space', 'SELECT n FROM large', large, ttl_seconds=60)
+  cache.put('space', 'SELECT n FROM cut', _data(truncated=True), ttl_seconds=60)
+  cache.put('space', 'SELECT n FROM small', _data(), ttl_seconds=60)
+  assert cache.get('space', 'SELECT n FROM large') is None
+  assert cache.get('space', 'SELECT n FROM cut') is None
+  assert cache.get('space', 'SELECT n FROM small') is not None
+
+
+def test_multi_chunk_result_is_cached_once_loaded(monkeypatch):
+  class FakeClient:
+    async def __aenter__(self):
+      return self
+
+    async def __aexit__(self, *exc):
+      return False
+
+    async def get_result_chunk(self, link):
+      return {'data_array': [['10'], ['11']]}
+
+  monkeypatch.setattr(results, 'GenieClient', FakeClient)
+  cache = GenieResultCache()
+  data = _data(rows=2, next_link='/chunks/1')
+  cache.put('space', 'SELECT n FROM t', data, ttl_seconds=60)
+  assert cache.get('space', 'SELECT n FROM t') is None
+
+  table = asyncio.run(data.load())
+  assert table.column('n').to_pylist() == [0, 1, 10, 11]
+  assert cache.get('space', 'SELECT n FROM t') is data
+  assert cache.nbytes == data.nbytes
+  assert data.on_loaded == []
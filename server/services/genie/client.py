@@ -0,0 +1,167 @@
+"""Async client for the Genie conversation REST API.
+
+Uses the non-waiting endpoints so callers can poll message status themselves
+instead of blocking a thread inside the SDK's *_and_wait helpers. Requests go
+through the shared workspace connection pool with cached auth headers.
+
+Usage:
+    async with GenieClient() as genie:
+      started = await genie.start_conversation(space_id, 'Revenue by region?')
+      message = await genie.get_message(space_id, started['conversation_id'], started['message_id'])
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+from databricks.sdk import WorkspaceClient
+
+from ..workspace import workspace
+
+logger = logging.getLogger(__name__)
+
+# Message statuses after which polling stops
+TERMINAL_STATUSES = frozenset({'COMPLETED', 'FAILED', 'CANCELLED', 'QUERY_RESULT_EXPIRED'})
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+  """Seconds from a numeric Retry-After header, if present."""
+  try:
+    return max(float(response.headers['retry-after']), 0.0)
+  except (KeyError, ValueError):
+    return None
+
+
+class GenieAPIError(Exception):
+  """Raised when a Genie API call returns an error response."""
+
+  def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+    """Initialize with the error message, HTTP status code and Retry-After seconds."""
+    super().__init__(message)
+    self.status_code = status_code
+    self.retry_after = retry_after
+
+  @property
+  def throttled(self) -> bool:
+    """Whether the workspace rejected the call for exceeding a rate limit."""
+    return self.status_code == 429 or 'RESOURCE_EXHAUSTED' in str(self)
+
+
+class GenieClient:
+  """Thin async wrapper around the Genie REST endpoints.
+
+  Must be used as an async context manager, which holds an HTTP client from
+  the shared workspace pool for the duration of the block.
+  """
+
+  def __init__(self, w: Optional[WorkspaceClient] = None, timeout: float = 30.0):
+    """Initialize client.
+
+    Args:
+      w: WorkspaceClient used for host and authentication. If None, uses the
+        shared workspace client and its cached auth headers.
+      timeout: Per-request timeout in seconds
+    """
+    self.w = w
+    self._timeout = timeout
+    self._http: Optional[httpx.AsyncClient] = None
+    self._session = None
+
+  async def __aenter__(self) -> 'GenieClient':
+    """Get an HTTP client from the shared pool."""
+    self._session = workspace.http_session()
+    self._http = await self._session.__aenter__()
+    return self
+
+  async def __aexit__(self, *exc_info):
+    """Release the HTTP client."""
+    if self._session:
+      session, self._session, self._http = self._session, None, None
+      await session.__aexit__(*exc_info)
+
+  # ---------- HTTP helpers ----------
+
+  async def _request(
+    self, method: str, path: str, json_body: Optional[Dict[str, Any]] = None
+  ) -> Dict[str, Any]:
+    """Send a request and return the decoded JSON body."""
+    if self._http is None:
+      raise RuntimeError('GenieClient must be used as an async context manager')
+
+    if self.w is not None:
+      host, headers = self.w.config.host.rstrip('/'), self.w.config.authenticate()
+    else:
+      host, headers = workspace.host, workspace.auth_headers()
+
+    response = await self._http.request(
+      method, f'{host}{path}', json=json_body, headers=headers, timeout=self._timeout
+    )
+    if response.status_code >= 400:
+      try:
+        error_data = response.json()
+        error_msg = error_data.get('message', error_data.get('error', str(error_data)))
+      except ValueError:
+        error_msg = response.text
+      raise GenieAPIError(
+        f'{method} {path} failed: {error_msg}',
+        response.status_code,
+        retry_after=_retry_after(response),
+      )
+    return response.json()
+
+  @staticmethod
+  def _space_path(space_id: str) -> str:
+    return f'/api/2.0/genie/spaces/{space_id}'
+
+  # ---------- Conversations ----------
+
+  async def start_conversation(self, space_id: str, content: str) -> Dict[str, Any]:
+    """Start a conversation. Returns conversation_id and message_id without waiting."""
+    return await self._request(
+      'POST', f'{self._space_path(space_id)}/start-conversation', {'content': content}
+    )
+
+  async def create_message(
+    self, space_id: str, conversation_id: str, content: str
+  ) -> Dict[str, Any]:
+    """Send a follow-up message. Returns the (not yet completed) message."""
+    return await self._request(
+      'POST',
+      f'{self._space_path(space_id)}/conversations/{conversation_id}/messages',
+      {'content': content},
+    )
+
+  async def get_message(
+    self, space_id: str, conversation_id: str, message_id: str
+  ) -> Dict[str, Any]:
+    """Get the current state of a message (status, attachments, error)."""
+    return await self._request(
+      'GET',
+      f'{self._space_path(space_id)}/conversations/{conversation_id}/messages/{message_id}',
+    )
+
+  # ---------- Query results ----------
+
+  async def get_attachment_query_result(
+    self, space_id: str, conversation_id: str, message_id: str, attachment_id: str
+  ) -> Dict[str, Any]:
+    """Get the query result of a message attachment."""
+    return await self._request(
+      'GET',
+      f'{self._space_path(space_id)}/conversations/{conversation_id}/messages/{message_id}'
+      f'/attachments/{attachment_id}/query-result',
+    )
+
+  async def get_message_query_result(
+    self, space_id: str, conversation_id: str, message_id: str
+  ) -> Dict[str, Any]:
+    """Get the query result of a message (legacy API, used when there is no attachment id)."""
+    return await self._request(
+      'GET',
+      f'{self._space_path(space_id)}/conversations/{conversation_id}/messages/{message_id}'
+      '/query-result',
+    )
+
+  async def get_result_chunk(self, chunk_link: str) -> Dict[str, Any]:
+    """Get a statement result chunk from a next_chunk_internal_link path."""
+    return await self._request('GET', chunk_link)
@@ -0,0 +1,89 @@
+"""Chat to Genie conversation registry.
+
+The chat_id -> Genie conversation_id mapping is stored with the chat in chat
+storage, so follow-ups keep their Genie context across restarts and across
+uvicorn workers. A small LRU cache with TTL sits in front of storage so
+consecutive turns on the same worker don't need a lookup.
+
+The TTL bounds how long a worker can keep using a conversation that another
+worker has since replaced (e.g. after the old one expired on the Genie side).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..chat.base import BaseChatStorage
+
+logger = logging.getLogger(__name__)
+
+# Cache bounds: entries are tiny, so the limit is mainly a guard against growth
+CACHE_MAX_ENTRIES = 10_000
+CACHE_TTL_SECONDS = 300
+
+
+class GenieConversationRegistry:
+  """LRU/TTL cache over the conversation ids stored in chat storage."""
+
+  def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+    """Initialize an empty registry.
+
+    Args:
+      max_entries: Maximum number of cached mappings (least recently used are evicted)
+      ttl_seconds: How long a cached mapping is trusted before re-reading storage
+    """
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    # chat_id -> (conversation_id, user_email, expires_at)
+    self._entries: OrderedDict[str, Tuple[str, str, float]] = OrderedDict()
+
+  def _cache(self, chat_id: str, conversation_id: str, user_email: str):
+    self._entries[chat_id] = (conversation_id, user_email, time.monotonic() + self.ttl_seconds)
+    self._entries.move_to_end(chat_id)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  async def get(self, chat_storage: Optional[BaseChatStorage], chat_id: str) -> Optional[str]:
+    """Get the Genie conversation id for a chat, or None if it has none yet."""
+    entry = self._entries.get(chat_id)
+    if entry and entry[2] > time.monotonic():
+      self._entries.move_to_end(chat_id)
+      return entry[0]
+
+    if chat_storage is None:
+      return entry[0] if entry else None
+
+    conversation_id = await chat_storage.get_genie_conversation(chat_id)
+    if conversation_id:
+      self._cache(chat_id, conversation_id, chat_storage.user_email)
+    else:
+      self._entries.pop(chat_id, None)
+    return conversation_id
+
+  async def set(
+    self, chat_storage: Optional[BaseChatStorage], chat_id: str, conversation_id: str
+  ):
+    """Record the Genie conversation used by a chat."""
+    entry = self._entries.get(chat_id)
+    if entry and entry[0] == conversation_id and entry[2] > time.monotonic():
+      return
+
+    user_email = chat_storage.user_email if chat_storage is not None else ''
+    if chat_storage is not None:
+      await chat_storage.set_genie_conversation(chat_id, conversation_id)
+    self._cache(chat_id, conversation_id, user_email)
+    logger.debug(f'Genie conversation for chat {chat_id}: {conversation_id}')
+
+  def discard(self, chat_id: str):
+    """Forget the cached mapping of a deleted chat."""
+    self._entries.pop(chat_id, None)
+
+  def discard_user(self, user_email: str):
+    """Forget all cached mappings of a user (e.g. after clearing their chats)."""
+    for chat_id in [k for k, v in self._entries.items() if v[1] == user_email]:
+      del self._entries[chat_id]
+
+
+# Global registry shared by all Genie handlers in this process
+conversation_registry = GenieConversationRegistry()
@@ -0,0 +1,332 @@
+"""Full Genie query results, fetched in chunks and kept in columnar form.
+
+The Genie handler only needs the first chunk of a result to answer (it shows a
+preview). It wraps that chunk in a ResultData and adds it to the store, which
+hands out a result id; the rest of the chunks are fetched from the statement
+result chunk links the first time the full result is requested, and the whole
+result is kept as a typed Arrow table.
+
+Results live in process memory, bounded by a byte budget (least recently used
+are evicted first) and a TTL. A result is only served to the user who asked
+the question. With several uvicorn workers, a result is only available on the
+worker that produced it; other workers answer 404 like for an expired result.
+"""
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .client import GenieClient
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for all stored results and how long a result is kept
+RESULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+RESULT_TTL_SECONDS = 3600
+# Stop following chunk links after this many rows
+RESULT_MAX_ROWS = 1_000_000
+
+# SQL statement API type_name -> Arrow type (anything else stays a string)
+_ARROW_TYPES = {
+  'BOOLEAN': pa.bool_(),
+  'BYTE': pa.int8(),
+  'SHORT': pa.int16(),
+  'INT': pa.int32(),
+  'LONG': pa.int64(),
+  'FLOAT': pa.float32(),
+  'DOUBLE': pa.float64(),
+  'DATE': pa.date32(),
+  'TIMESTAMP': pa.timestamp('us', tz='UTC'),
+  'TIMESTAMP_NTZ': pa.timestamp('us'),
+}
+
+
+def _decode_int(value: Any) -> Any:
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return value
+
+
+def _decode_float(value: Any) -> Any:
+  """Decode a float, mapping NaN and infinities to None since JSON cannot represent them."""
+  try:
+    number = float(value)
+  except (TypeError, ValueError):
+    return value
+  return number if math.isfinite(number) else None
+
+
+# SQL statement API type_name -> decoder of JSON_ARRAY string values
+_JSON_DECODERS = {
+  'BYTE': _decode_int,
+  'SHORT': _decode_int,
+  'INT': _decode_int,
+  'LONG': _decode_int,
+  'FLOAT': _decode_float,
+  'DOUBLE': _decode_float,
+  'DECIMAL': _decode_float,
+}
+
+
+def _arrow_type(column: Dict[str, Any]) -> pa.DataType:
+  """Arrow type for a column of a statement result manifest."""
+  type_name = (column.get('type_name') or 'STRING').upper()
+  if type_name == 'DECIMAL':
+    precision = column.get('type_precision')
+    scale = column.get('type_scale')
+    if precision:
+      return pa.decimal128(int(precision), int(scale or 0))
+    return pa.float64()
+  return _ARROW_TYPES.get(type_name, pa.string())
+
+
+def _string_batch(names: List[str], data_array: List[List[Any]]) -> pa.RecordBatch:
+  """Build a batch of string columns from a JSON_ARRAY chunk."""
+  if data_array:
+    arrays = [pa.array(col, type=pa.string()) for col in zip(*data_array)]
+  else:
+    arrays = [pa.array([], type=pa.string()) for _ in names]
+  return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def _cast_column(array: pa.ChunkedArray, target: pa.DataType) -> pa.ChunkedArray:
+  """Cast a string column to its SQL type, keeping strings if the values don't parse."""
+  if target == pa.string():
+    return array
+  try:
+    if pa.types.is_timestamp(target):
+      # Values look like 2024-01-31T10:00:00.000Z; parse as UTC, then drop tz if needed
+      parsed = pc.cast(pc.replace_substring(array, 'Z', ''), pa.timestamp('us'))
+      return pc.assume_timezone(parsed, 'UTC') if target.tz else parsed
+    return pc.cast(array, target)
+  except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+    logger.debug(f'Keeping column as string, cast to {target} failed: {e}')
+    return array
+
+
+@dataclass
+class ResultData:
+  """Rows of one query result, fetched chunk by chunk into a typed Arrow table.
+
+  Shared between the results handed out to users and the result cache.
+  """
+
+  columns: List[Dict[str, Any]]
+  total_rows: Optional[int]
+  next_link: Optional[str]
+  batches: List[pa.RecordBatch]
+  # First rows as returned by the API, for answer previews
+  preview: List[List[Any]]
+  table: Optional[pa.Table] = None
+  truncated: bool = False
+  lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+  # Called once with this result when load() has fetched the remaining chunks
+  on_loaded: List[Callable[['ResultData'], None]] = field(default_factory=list)
+
+  @classmethod
+  def from_statement_response(
+    cls, statement_response: Dict[str, Any], preview_rows: int = 100
+  ) -> Optional['ResultData']:
+    """Build from the first statement response chunk, or None if it has no columns."""
+    manifest = statement_response.get('manifest') or {}
+    columns = (manifest.get('schema') or {}).get('columns') or []
+    if not columns:
+      return None
+
+    first_chunk = statement_response.get('result') or {}
+    data_array = first_chunk.get('data_array') or []
+    data = cls(
+      columns=columns,
+      total_rows=manifest.get('total_row_count'),
+      next_link=first_chunk.get('next_chunk_internal_link'),
+      batches=[],
+      preview=data_array[:preview_rows],
+      truncated=bool(manifest.get('truncated')),
+    )
+    data.batches.append(_string_batch(data.column_names, data_array))
+    if not data.next_link:
+      data._finalize()
+    return data
+
+  @property
+  def column_names(self) -> List[str]:
+    """Column names from the result manifest."""
+    return [col.get('name', f'col_{i}') for i, col in enumerate(self.columns)]
+
+  @property
+  def nbytes(self) -> int:
+    """Memory held by the fetched rows."""
+    if self.table is not None:
+      return self.table.nbytes
+    return sum(batch.nbytes for batch in self.batches)
+
+  @property
+  def fetched_rows(self) -> int:
+    """Number of rows fetched so far."""
+    if self.table is not None:
+      return self.table.num_rows
+    return sum(batch.num_rows for batch in self.batches)
+
+  @property
+  def row_count(self) -> int:
+    """Row count of the full result."""
+    return self.total_rows if self.total_rows is not None else self.fetched_rows
+
+  def typed_preview(self) -> List[List[Any]]:
+    """Preview rows with numeric values decoded, ready for a JSON event.
+
+    Other values stay as the strings returned by the API. Previews are small,
+    so values are decoded in Python rather than through Arrow casts.
+    """
+    rows = [list(row) for row in self.preview]
+    for i, col in enumerate(self.columns):
+      decode = _JSON_DECODERS.get((col.get('type_name') or 'STRING').upper())
+      if decode is not None:
+        for row in rows:
+          row[i] = decode(row[i])
+    return rows
+
+  def fetched_table(self) -> pa.Table:
+    """Typed table of the rows fetched so far (the full table once loaded)."""
+    if self.table is not None:
+      return self.table
+    return self._typed(pa.Table.from_batches(self.batches))
+
+  async def load(self) -> pa.Table:
+    """Fetch any remaining chunks and return the full typed table."""
+    async with self.lock:
+      if self.table is None:
+        async with GenieClient() as genie:
+          while self.next_link and self.fetched_rows < RESULT_MAX_ROWS:
+            chunk = await genie.get_result_chunk(self.next_link)
+            self.batches.append(_string_batch(self.column_names, chunk.get('data_array') or []))
+            self.next_link = chunk.get('next_chunk_internal_link')
+        if self.next_link:
+          logger.warning(f'Genie result stopped at {RESULT_MAX_ROWS} rows')
+          self.truncated = True
+        self._finalize()
+        logger.info(
+          f'Loaded Genie result: {self.table.num_rows} rows, {self.table.nbytes / 1024:.0f} KiB'
+        )
+        callbacks, self.on_loaded = self.on_loaded, []
+        for callback in callbacks:
+          callback(self)
+    return self.table
+
+  def _typed(self, strings: pa.Table) -> pa.Table:
+    """Cast a table of string columns to the SQL types of the result."""
+    return pa.Table.from_arrays(
+      [_cast_column(strings.column(i), _arrow_type(col)) for i, col in enumerate(self.columns)],
+      names=self.column_names,
+    )
+
+  def _finalize(self):
+    """Combine string batches into one table with SQL types."""
+    self.table = self._typed(pa.Table.from_batches(self.batches))
+    self.batches = []
+    self.next_link = None
+
+
+@dataclass
+class GenieResult:
+  """A query result handed out to one user."""
+
+  result_id: str
+  owner: str
+  data: ResultData
+  expires_at: float
+
+  def handle(self) -> Dict[str, Any]:
+    """Reference to this result for SSE events and clients."""
+    return {
+      'result_id': self.result_id,
+      'columns': [
+        {'name': name, 'type': (col.get('type_name') or 'STRING').upper()}
+        for name, col in zip(self.data.column_names, self.data.columns)
+      ],
+      'row_count': self.data.row_count,
+      'url': f'/api/genie/results/{self.result_id}',
+    }
+
+
+class GenieResultStore:
+  """Bounded in-process store of Genie results."""
+
+  def __init__(
+    self, max_bytes: int = RESULT_STORE_MAX_BYTES, ttl_seconds: float = RESULT_TTL_SECONDS
+  ):
+    """Initialize an empty store.
+
+    Args:
+      max_bytes: Memory budget; least recently used results are evicted beyond it
+      ttl_seconds: How long a result stays available after it was produced
+    """
+    self.max_bytes = max_bytes
+    self.ttl_seconds = ttl_seconds
+    self._results: OrderedDict[str, GenieResult] = OrderedDict()
+
+  def add(self, owner: str, data: ResultData) -> GenieResult:
+    """Hand out a result to `owner` and return it with its new id."""
+    result = GenieResult(
+      result_id=f'res_{uuid.uuid4().hex[:16]}',
+      owner=owner,
+      data=data,
+      expires_at=time.monotonic() + self.ttl_seconds,
+    )
+    self._results[result.result_id] = result
+    self._evict()
+    return result
+
+  def get(self, result_id: str, owner: str) -> Optional[GenieResult]:
+    """Get a result if it exists, has not expired and belongs to `owner`."""
+    result = self._results.get(result_id)
+    if result is None:
+      return None
+    if result.expires_at <= time.monotonic():
+      del self._results[result_id]
+      return None
+    if result.owner != owner:
+      return None
+    self._results.move_to_end(result_id)
+    return result
+
+  async def load(self, result: GenieResult) -> pa.Table:
+    """Fetch the remaining chunks of a result and return the full table."""
+    table = await result.data.load()
+    self._evict(keep=result.result_id)
+    return table
+
+  def _evict(self, keep: Optional[str] = None):
+    """Drop expired results, then least recently used ones beyond the byte budget."""
+    now = time.monotonic()
+    for result_id in [k for k, r in self._results.items() if r.expires_at <= now]:
+      del self._results[result_id]
+
+    # Results can share data (same cached query), count each once
+    refs: Dict[int, int] = {}
+    for result in self._results.values():
+      refs[id(result.data)] = refs.get(id(result.data), 0) + 1
+    total = sum({id(r.data): r.data.nbytes for r in self._results.values()}.values())
+
+    for result_id in list(self._results):
+      if total <= self.max_bytes:
+        break
+      if result_id == keep:
+        continue
+      data = self._results.pop(result_id).data
+      refs[id(data)] -= 1
+      if refs[id(data)] == 0:
+        total -= data.nbytes
+
+
+# Global store shared by the Genie handler and the results router
+result_store = GenieResultStore()
@@ -0,0 +1,308 @@
+"""Rate-limit-aware scheduling of Genie questions per space.
+
+Genie spaces accept a limited number of questions per minute. Instead of
+letting the workspace reject or silently queue requests under load, every
+question waits for its turn here before it is sent:
+
+- each space has a token bucket (`genie_rate_limit_per_minute` and
+  `genie_rate_limit_burst` in the agent config; no limit by default);
+- waiting questions are served round-robin across users, so one user asking
+  many questions does not delay everyone else;
+- a 429 / RESOURCE_EXHAUSTED answer pauses the space with exponential backoff
+  (or for the Retry-After the workspace sent), whatever the configured rate.
+
+Only sending a question takes a token; polling and result fetches do not.
+State is per process: with several uvicorn workers each worker has its own
+buckets, so configure the rate per worker.
+
+Usage:
+    async with contextlib.aclosing(genie_scheduler.wait_turn(space_id, user)) as turns:
+      async for position in turns:
+        ...  # still waiting, `position` questions ahead
+    # send the question
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Backoff after the workspace throttles a space
+BACKOFF_INITIAL_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Waiting questions get their queue position at least this often (doubles as a heartbeat)
+QUEUE_UPDATE_SECONDS = 5.0
+
+
+class TokenBucket:
+  """Token bucket refilled continuously at `rate` tokens per second."""
+
+  def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+    """Initialize a full bucket.
+
+    Args:
+      rate: Tokens added per second; 0 or less means unlimited
+      burst: Bucket capacity
+      now: Current monotonic time (defaults to time.monotonic())
+    """
+    self.rate = rate
+    self.burst = max(burst, 1.0)
+    self.tokens = self.burst
+    self._updated = time.monotonic() if now is None else now
+
+  @property
+  def unlimited(self) -> bool:
+    """Whether the bucket never runs out."""
+    return self.rate <= 0
+
+  def _refill(self, now: float):
+    self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+  def wait_time(self, now: float) -> float:
+    """Seconds until a token is available (0 if one is available now)."""
+    if self.unlimited:
+      return 0.0
+    self._refill(now)
+    return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+  def take(self, now: float):
+    """Consume a token; call only when wait_time() is 0."""
+    if not self.unlimited:
+      self._refill(now)
+      self.tokens -= 1
+
+  def drain(self, now: float):
+    """Empty the bucket, e.g. after the workspace throttled us."""
+    self._refill(now)
+    self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass(eq=False)
+class _Ticket:
+  """A question waiting for its turn."""
+
+  user: str
+  enqueued_at: float
+  granted: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class _SpaceState:
+  """Bucket, queue and counters of one Genie space."""
+
+  bucket: TokenBucket
+  # user -> that user's waiting tickets; iteration order is the round-robin order
+  queues: 'OrderedDict[str, Deque[_Ticket]]' = field(default_factory=OrderedDict)
+  changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+  dispatcher: Optional[asyncio.Task] = None
+  paused_until: float = 0.0
+  backoff: float = 0.0
+  granted_total: int = 0
+  throttled_total: int = 0
+  wait_seconds_total: float = 0.0
+  max_wait_seconds: float = 0.0
+
+  @property
+  def queued(self) -> int:
+    return sum(len(q) for q in self.queues.values())
+
+
+class GenieScheduler:
+  """Per-space token buckets with a fair (round-robin per user) waiting queue."""
+
+  def __init__(
+    self,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+  ):
+    """Initialize with no spaces; spaces are added by configure() or on first use.
+
+    Args:
+      clock: Monotonic time in seconds
+      sleep: Waits the given seconds of `clock` time
+    """
+    self._clock = clock
+    self._sleep = sleep
+    self._spaces: Dict[str, _SpaceState] = {}
+
+  def configure(self, space_id: str, rate_per_minute: float = 0, burst: Optional[float] = None):
+    """Set the rate limit of a space (0 disables it). Keeps the current queue."""
+    rate = max(rate_per_minute, 0) / 60.0
+    burst = burst if burst else max(rate_per_minute, 1)
+    state = self._spaces.get(space_id)
+    if state is None:
+      self._spaces[space_id] = _SpaceState(bucket=TokenBucket(rate, burst, self._clock()))
+    elif state.bucket.rate != rate or state.bucket.burst != max(burst, 1.0):
+      logger.info(f'Genie space {space_id} rate limit: {rate_per_minute}/min, burst {burst}')
+      state.bucket = TokenBucket(rate, burst, self._clock())
+
+  def _space(self, space_id: str) -> _SpaceState:
+    if space_id not in self._spaces:
+      self.configure(space_id)
+    return self._spaces[space_id]
+
+  async def wait_turn(self, space_id: str, user: str, priority: bool = False) -> AsyncIterator[int]:
+    """Wait until a question of `user` may be sent to the space.
+
+    Yields the number of questions ahead whenever it changes (and every
+    QUEUE_UPDATE_SECONDS); returns when it is this question's turn. Closing
+    the generator early gives up the place in the queue.
+
+    Args:
+      space_id: Genie space the question goes to
+      user: User asking, for fair ordering
+      priority: Put the question first in its user's queue (e.g. a retry)
+    """
+    state = self._space(space_id)
+    now = self._clock()
+
+    # Fast path: nobody waiting, not paused and a token available
+    if not state.queues and now >= state.paused_until and state.bucket.wait_time(now) == 0:
+      state.bucket.take(now)
+      state.granted_total += 1
+      return
+
+    ticket = _Ticket(user=user, enqueued_at=now)
+    queue = state.queues.setdefault(user, deque())
+    if priority:
+      queue.appendleft(ticket)
+    else:
+      queue.append(ticket)
+    self._ensure_dispatcher(space_id, state)
+
+    try:
+      # Questions behind this one in the rotation may have moved back
+      await self._notify(state)
+      last_position = None
+      while not ticket.granted.is_set():
+        position = self._position(state, ticket)
+        if position != last_position:
+          last_position = position
+          yield position
+        async with state.changed:
+          if ticket.granted.is_set():
+            break
+          try:
+            await asyncio.wait_for(state.changed.wait(), QUEUE_UPDATE_SECONDS)
+          except asyncio.TimeoutError:
+            last_position = None  # send the position again as a heartbeat
+    finally:
+      if not ticket.granted.is_set():
+        self._remove(state, ticket)
+
+  def report_throttled(self, space_id: str, retry_after: Optional[float] = None):
+    """Pause a space after the workspace answered 429 / RESOURCE_EXHAUSTED."""
+    state = self._space(space_id)
+    now = self._clock()
+    state.backoff = min(max(state.backoff * 2, BACKOFF_INITIAL_SECONDS), BACKOFF_MAX_SECONDS)
+    delay = retry_after if retry_after else state.backoff
+    state.paused_until = max(state.paused_until, now + delay)
+    state.bucket.drain(now)
+    state.throttled_total += 1
+    logger.warning(f'Genie space {space_id} throttled, pausing for {delay:.1f}s')
+
+  def report_success(self, space_id: str):
+    """Reset the backoff of a space after a question was accepted."""
+    state = self._spaces.get(space_id)
+    if state is not None:
+      state.backoff = 0.0
+
+  def stats(self) -> Dict[str, Dict[str, Any]]:
+    """Queue and rate limit statistics per space."""
+    now = self._clock()
+    result = {}
+    for space_id, state in self._spaces.items():
+      bucket = state.bucket
+      bucket.wait_time(now)  # refill so `tokens` is current
+      granted = state.granted_total
+      result[space_id] = {
+        'rate_per_minute': bucket.rate * 60,
+        'burst': bucket.burst,
+        'tokens': None if bucket.unlimited else round(bucket.tokens, 2),
+        'queued': state.queued,
+        'queued_users': len(state.queues),
+        'paused_seconds': round(max(state.paused_until - now, 0.0), 2),
+        'granted_total': granted,
+        'throttled_total': state.throttled_total,
+        'avg_wait_seconds': round(state.wait_seconds_total / granted, 3) if granted else 0.0,
+        'max_wait_seconds': round(state.max_wait_seconds, 3),
+      }
+    return result
+
+  # ---------- Queue internals ----------
+
+  @staticmethod
+  def _position(state: _SpaceState, ticket: _Ticket) -> int:
+    """Questions served before `ticket` under round-robin across users."""
+    queue = state.queues.get(ticket.user)
+    if not queue:
+      return 0
+    index = queue.index(ticket)
+    ahead = index
+    before_user = True
+    for user, other in state.queues.items():
+      if user == ticket.user:
+        before_user = False
+        continue
+      # Users earlier in the rotation get one more turn before ours comes
+      ahead += min(len(other), index + 1 if before_user else index)
+    return ahead
+
+  def _remove(self, state: _SpaceState, ticket: _Ticket):
+    queue = state.queues.get(ticket.user)
+    if queue is None:
+      return
+    try:
+      queue.remove(ticket)
+    except ValueError:
+      return
+    if not queue:
+      del state.queues[ticket.user]
+    asyncio.ensure_future(self._notify(state))
+
+  @staticmethod
+  async def _notify(state: _SpaceState):
+    async with state.changed:
+      state.changed.notify_all()
+
+  def _ensure_dispatcher(self, space_id: str, state: _SpaceState):
+    if state.dispatcher is None or state.dispatcher.done():
+      state.dispatcher = asyncio.create_task(self._dispatch(space_id, state))
+
+  async def _dispatch(self, space_id: str, state: _SpaceState):
+    """Grant waiting questions in round-robin order as tokens become available."""
+    while state.queues:
+      now = self._clock()
+      wait = max(state.paused_until - now, state.bucket.wait_time(now))
+      if wait > 0:
+        await self._sleep(wait)
+        continue
+
+      # Next user in the rotation goes to the back of it
+      user, queue = next(iter(state.queues.items()))
+      ticket = queue.popleft()
+      if queue:
+        state.queues.move_to_end(user)
+      else:
+        del state.queues[user]
+
+      state.bucket.take(now)
+      waited = now - ticket.enqueued_at
+      state.granted_total += 1
+      state.wait_seconds_total += waited
+      state.max_wait_seconds = max(state.max_wait_seconds, waited)
+      ticket.granted.set()
+      logger.debug(f'Genie space {space_id}: granted {user} after {waited:.2f}s')
+      await self._notify(state)
+
+    state.dispatcher = None
+
+
+# Global scheduler shared by all Genie handlers
+genie_scheduler = GenieScheduler()
@@ -0,0 +1,182 @@
+"""Tests for the Genie rate-limit scheduler."""
+
+import asyncio
+import contextlib
+
+from .scheduler import BACKOFF_INITIAL_SECONDS, BACKOFF_MAX_SECONDS, GenieScheduler, TokenBucket
+
+SPACE = 'space'
+
+
+class _Clock:
+  """Fake monotonic clock; sleeping lets woken tasks run, then advances it at once."""
+
+  def __init__(self):
+    self.now = 100.0
+    self.slept = []
+
+  def __call__(self) -> float:
+    return self.now
+
+  async def sleep(self, seconds: float):
+    self.slept.append(seconds)
+    for _ in range(10):
+      await asyncio.sleep(0)
+    self.now += seconds
+
+
+def _scheduler(clock: _Clock, rate_per_minute: float = 60, burst: float = 1) -> GenieScheduler:
+  scheduler = GenieScheduler(clock=clock, sleep=clock.sleep)
+  scheduler.configure(SPACE, rate_per_minute, burst)
+  return scheduler
+
+
+async def _turn(scheduler: GenieScheduler, user: str, priority: bool = False) -> list:
+  """Positions yielded while `user` waits for a turn."""
+  turns = scheduler.wait_turn(SPACE, user, priority=priority)
+  async with contextlib.aclosing(turns):
+    return [position async for position in turns]
+
+
+async def _grant_order(scheduler: GenieScheduler, clock: _Clock, questions) -> list:
+  """(label, time) of questions in the order they got their turn; all enqueued at once."""
+  order = []
+
+  async def ask(label: str, user: str, priority: bool = False):
+    await _turn(scheduler, user, priority)
+    order.append((label, clock.now))
+
+  await asyncio.gather(*(ask(*question) for question in questions))
+  return order
+
+
+def test_token_bucket_refills_up_to_burst():
+  bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+  for _ in range(3):
+    assert bucket.wait_time(0.0) == 0
+    bucket.take(0.0)
+  assert bucket.wait_time(0.0) == 0.5
+  assert bucket.wait_time(0.25) == 0.25
+  assert bucket.wait_time(0.5) == 0
+  bucket.wait_time(100.0)
+  assert bucket.tokens == 3
+
+
+def test_token_bucket_drain_and_unlimited():
+  bucket = TokenBucket(rate=1.0, burst=5, now=0.0)
+  bucket.drain(0.0)
+  assert bucket.wait_time(0.0) == 1.0
+  unlimited = TokenBucket(rate=0, burst=1, now=0.0)
+  for _ in range(10):
+    unlimited.take(0.0)
+  assert unlimited.wait_time(0.0) == 0
+
+
+def test_first_question_goes_through_without_waiting():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+  assert asyncio.run(_turn(scheduler, 'a')) == []
+  stats = scheduler.stats()[SPACE]
+  assert (stats['granted_total'], stats['tokens'], stats['queued']) == (1, 0, 0)
+
+
+def test_waiting_questions_are_served_round_robin_across_users():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+
+  async def run():
+    await _turn(scheduler, 'x')  # takes the only token
+    return await _grant_order(
+      scheduler,
+      clock,
+      [('a1', 'a'), ('a2', 'a'), ('a3', 'a'), ('b1', 'b'), ('c1', 'c')],
+    )
+
+  order = asyncio.run(run())
+  # One token per second, one question per user in turn
+  assert order == [('a1', 101.0), ('b1', 102.0), ('c1', 103.0), ('a2', 104.0), ('a3', 105.0)]
+  stats = scheduler.stats()[SPACE]
+  assert (stats['granted_total'], stats['queued'], stats['max_wait_seconds']) == (6, 0, 5.0)
+
+
+def test_queue_positions_count_round_robin_turns():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+  positions = {}
+
+  async def run():
+    await _turn(scheduler, 'x')
+
+    async def ask(label: str, user: str):
+      positions[label] = await _turn(scheduler, user)
+
+    await asyncio.gather(ask('a1', 'a'), ask('a2', 'a'), ask('b1', 'b'))
+
+  asyncio.run(run())
+  # a2 waits for a1 and, since b is next in the rotation, for b1 too
+  assert positions == {'a1': [0], 'a2': [1, 2, 1, 0], 'b1': [1, 0]}
+
+
+def test_retry_goes_first_in_its_users_queue():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+
+  async def run():
+    await _turn(scheduler, 'x')
+    return await _grant_order(
+      scheduler, clock, [('a1', 'a'), ('a2', 'a'), ('retry', 'a', True)]
+    )
+
+  assert [label for label, _ in asyncio.run(run())] == ['retry', 'a1', 'a2']
+
+
+def test_closing_the_wait_gives_up_the_place():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+
+  async def run():
+    await _turn(scheduler, 'x')
+    turns = scheduler.wait_turn(SPACE, 'a')
+    assert await turns.__anext__() == 0
+    assert scheduler.stats()[SPACE]['queued'] == 1
+    await turns.aclose()
+    await asyncio.sleep(0)
+    return scheduler.stats()[SPACE]['queued']
+
+  assert asyncio.run(run()) == 0
+
+
+def test_throttling_backs_off_exponentially():
+  clock = _Clock()
+  scheduler = _scheduler(clock, rate_per_minute=0)
+  paused = []
+  for _ in range(7):
+    scheduler.report_throttled(SPACE)
+    paused.append(scheduler.stats()[SPACE]['paused_seconds'])
+    clock.now += BACKOFF_MAX_SECONDS
+  assert paused == [2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0]
+
+  scheduler.report_success(SPACE)
+  scheduler.report_throttled(SPACE)
+  assert scheduler.stats()[SPACE]['paused_seconds'] == BACKOFF_INITIAL_SECONDS
+  assert scheduler.stats()[SPACE]['throttled_total'] == 8
+
+
+def test_retry_after_pauses_an_unlimited_space():
+  clock = _Clock()
+  scheduler = _scheduler(clock, rate_per_minute=0)
+  scheduler.report_throttled(SPACE, retry_after=7.0)
+  assert scheduler.stats()[SPACE]['paused_seconds'] == 7.0
+
+  order = asyncio.run(_grant_order(scheduler, clock, [('a1', 'a'), ('b1', 'b')]))
+  assert sorted(order) == [('a1', 107.0), ('b1', 107.0)]
+  assert clock.slept == [7.0]
+
+
+def test_throttling_drains_the_bucket():
+  clock = _Clock()
+  scheduler = _scheduler(clock, rate_per_minute=60, burst=10)
+  scheduler.report_throttled(SPACE, retry_after=1.0)
+  # Paused for a second, then the bucket has refilled a single token
+  order = asyncio.run(_grant_order(scheduler, clock, [('a1', 'a'), ('a2', 'a')]))
+  assert order == [('a1', 101.0), ('a2', 102.0)]
@@ -10,9 +10,10 @@ import logging
 import os
 from typing import Optional
 
-from databricks.sdk import WorkspaceClient
 from fastapi import Request
 
+from .workspace import workspace
+
 logger = logging.getLogger(__name__)
 
 # Cache for dev user to avoid repeated API calls
@@ -79,9 +80,8 @@ async def _get_dev_user() -> str:
 def _fetch_user_from_workspace() -> str:
   """Synchronous helper to fetch user from WorkspaceClient."""
   try:
-    # WorkspaceClient will use DATABRICKS_HOST and DATABRICKS_TOKEN from env
-    client = WorkspaceClient()
-    me = client.current_user.me()
+    # The shared WorkspaceClient uses DATABRICKS_HOST and DATABRICKS_TOKEN from env
+    me = workspace.client.current_user.me()
 
     if not me.user_name:
       raise ValueError('WorkspaceClient returned user without email/user_name')
@@ -114,10 +114,9 @@ def get_workspace_url() -> str:
     logger.debug(f'Got workspace URL from env: {_workspace_url_cache}')
     return _workspace_url_cache
 
-  # Fall back to WorkspaceClient config (just reads from config, not a network call)
+  # Fall back to the shared WorkspaceClient config
   try:
-    client = WorkspaceClient()
-    _workspace_url_cache = client.config.host.rstrip('/')
+    _workspace_url_cache = workspace.host
     logger.debug(f'Got workspace URL from WorkspaceClient: {_workspace_url_cache}')
     return _workspace_url_cache
   except Exception as e:
@@ -0,0 +1,142 @@
+"""Process-wide Databricks workspace client, auth headers and HTTP connection pool.
+
+Constructing a WorkspaceClient resolves config and credentials again and
+fetches the host metadata (/.well-known/databricks-config), so doing it per
+request adds a network round trip before the actual call. The registry builds
+one client lazily and shares it.
+
+Auth headers are cached: with OAuth they are reused until shortly before the
+token expires, PAT headers never change, and for other credential providers
+(whose expiry is not exposed) they are refreshed every AUTH_HEADERS_TTL_SECONDS.
+
+REST calls made with httpx share one connection pool, bound to the event loop
+of the app. Code that runs its own loop (asyncio.run in a background thread)
+gets a short-lived client instead, since httpx pools cannot cross loops.
+
+Usage:
+    from server.services.workspace import workspace
+
+    w = workspace.client  # WorkspaceClient
+    async with workspace.http_session() as http:
+      response = await http.get(f'{workspace.host}/api/2.0/...', headers=workspace.auth_headers())
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Refresh OAuth headers this long before the token expires
+AUTH_REFRESH_MARGIN_SECONDS = 60
+# Header lifetime when the credential provider does not expose an expiry
+AUTH_HEADERS_TTL_SECONDS = 60
+
+# Shared pool limits and the default per-request timeout
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_TIMEOUT_SECONDS = 30.0
+
+
+def _headers_ttl(config: Config) -> float:
+  """How long headers just returned by config.authenticate() can be reused."""
+  if config.auth_type == 'pat':
+    return math.inf
+  try:
+    token = config.oauth_token()
+  except Exception:
+    # Not an OAuth provider (e.g. Azure CLI); expiry unknown
+    return AUTH_HEADERS_TTL_SECONDS
+  if token.expiry is None:
+    return AUTH_HEADERS_TTL_SECONDS
+  remaining = (token.expiry - datetime.now(token.expiry.tzinfo)).total_seconds()
+  return max(remaining - AUTH_REFRESH_MARGIN_SECONDS, 0.0)
+
+
+class WorkspaceClientRegistry:
+  """Lazily created WorkspaceClient with cached auth headers and a shared HTTP pool."""
+
+  def __init__(self):
+    """Initialize an empty registry; nothing is resolved until first use."""
+    self._lock = threading.RLock()
+    self._client: Optional[WorkspaceClient] = None
+    self._headers: Optional[Dict[str, str]] = None
+    self._headers_expire_at = 0.0
+    self._http: Optional[httpx.AsyncClient] = None
+    self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+  @property
+  def client(self) -> WorkspaceClient:
+    """The shared WorkspaceClient, created from env vars on first use."""
+    if self._client is None:
+      with self._lock:
+        if self._client is None:
+          logger.info('Creating shared WorkspaceClient')
+          self._client = WorkspaceClient()
+    return self._client
+
+  @property
+  def host(self) -> str:
+    """Workspace URL without trailing slash."""
+    return self.client.config.host.rstrip('/')
+
+  def auth_headers(self) -> Dict[str, str]:
+    """Authentication headers, refreshed before the underlying token expires."""
+    now = time.monotonic()
+    with self._lock:
+      if self._headers is None or now >= self._headers_expire_at:
+        config = self.client.config
+        self._headers = config.authenticate()
+        self._headers_expire_at = now + _headers_ttl(config)
+        logger.debug(f'Refreshed workspace auth headers ({config.auth_type})')
+      return dict(self._headers)
+
+  @asynccontextmanager
+  async def http_session(self) -> AsyncIterator[httpx.AsyncClient]:
+    """HTTP client for the running event loop.
+
+    Yields the shared pool when called from the loop that owns it (the first
+    loop that used it), otherwise a client closed at the end of the block.
+    Requests must pass absolute URLs and auth_headers().
+    """
+    loop = asyncio.get_running_loop()
+    if self._http is None or self._http.is_closed or self._http_loop.is_closed():
+      self._http = self._new_http_client()
+      self._http_loop = loop
+
+    if self._http_loop is loop:
+      yield self._http
+      return
+
+    async with self._new_http_client() as http:
+      yield http
+
+  async def aclose(self):
+    """Close the shared HTTP pool (called on app shutdown)."""
+    if self._http is not None and not self._http.is_closed:
+      await self._http.aclose()
+    self._http = None
+    self._http_loop = None
+
+  @staticmethod
+  def _new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+      timeout=HTTP_TIMEOUT_SECONDS,
+      limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+      ),
+    )
+
+
+# Global registry shared by all services
+workspace = WorkspaceClientRegistry()